@@ -1,3 +1,5 @@
+import os
+import sys
 from logging.config import fileConfig
 
 from sqlalchemy import engine_from_config
@@ -5,8 +7,14 @@ from sqlalchemy import pool
 
 from alembic import context
 
-from backend.database import Base
-from backend.models.orm_models import User, TestSession, BloodTest
+# Backend modules import each other top-level style (as when run from backend/), so the
+# models register on `database.Base`; importing them as `backend.*` would give a second,
+# empty Base and an autogenerate that sees no tables
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
+
+from database import Base  # noqa: E402
+from models import orm_models  # noqa: E402,F401  (registers the tables on Base.metadata)
+
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
 config = context.config
@@ -16,6 +24,10 @@ config = context.config
 if config.config_file_name is not None:
     fileConfig(config.config_file_name)
 
+# DATABASE_URL (the app's own setting) wins over sqlalchemy.url in alembic.ini
+if os.getenv("DATABASE_URL"):
+    config.set_main_option("sqlalchemy.url", os.environ["DATABASE_URL"].replace("%", "%%"))
+
 # add your model's MetaData object here
 # for 'autogenerate' support
 # from myapp import mymodel
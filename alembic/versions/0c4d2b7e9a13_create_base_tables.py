@@ -0,0 +1,61 @@
+"""Create users, test_sessions and blood_tests
+
+Revision ID: 0c4d2b7e9a13
+Revises: 
+Create Date: 2025-03-21 20:41:07.512904
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0c4d2b7e9a13'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # The tables as the app first created them with Base.metadata.create_all
+    op.create_table('users',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('height', sa.Float(), nullable=True),
+        sa.PrimaryKeyConstraint('user_id')
+    )
+    op.create_index(op.f('ix_users_user_id'), 'users', ['user_id'], unique=False)
+    op.create_table('test_sessions',
+        sa.Column('session_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('test_date', sa.DateTime(), nullable=False),
+        sa.Column('location', sa.String(), nullable=True),
+        sa.Column('weight', sa.Float(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.user_id'], ),
+        sa.PrimaryKeyConstraint('session_id')
+    )
+    op.create_index(op.f('ix_test_sessions_session_id'), 'test_sessions', ['session_id'], unique=False)
+    op.create_table('blood_tests',
+        sa.Column('test_id', sa.Integer(), nullable=False),
+        sa.Column('session_id', sa.Integer(), nullable=False),
+        sa.Column('test_name', sa.String(), nullable=False),
+        sa.Column('value', sa.Float(), nullable=False),
+        sa.Column('unit', sa.String(), nullable=False),
+        sa.Column('normal_range', sa.String(), nullable=True),
+        sa.ForeignKeyConstraint(['session_id'], ['test_sessions.session_id'], ),
+        sa.PrimaryKeyConstraint('test_id')
+    )
+    op.create_index(op.f('ix_blood_tests_test_id'), 'blood_tests', ['test_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_blood_tests_test_id'), table_name='blood_tests')
+    op.drop_table('blood_tests')
+    op.drop_index(op.f('ix_test_sessions_session_id'), table_name='test_sessions')
+    op.drop_table('test_sessions')
+    op.drop_index(op.f('ix_users_user_id'), table_name='users')
+    op.drop_table('users')
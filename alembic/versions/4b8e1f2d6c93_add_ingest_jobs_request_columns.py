@@ -0,0 +1,33 @@
+"""Add file_hash, use_cache and request_id to ingest_jobs
+
+Revision ID: 4b8e1f2d6c93
+Revises: d3f8c1a6e297
+Create Date: 2026-10-18 18:21:09.614870
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4b8e1f2d6c93'
+down_revision: Union[str, None] = 'd3f8c1a6e297'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('ingest_jobs', sa.Column('file_hash', sa.String(), nullable=True))
+    op.add_column('ingest_jobs', sa.Column('use_cache', sa.Boolean(), server_default='1', nullable=False))
+    op.add_column('ingest_jobs', sa.Column('request_id', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('ingest_jobs') as batch_op:
+        batch_op.drop_column('request_id')
+        batch_op.drop_column('use_cache')
+        batch_op.drop_column('file_hash')
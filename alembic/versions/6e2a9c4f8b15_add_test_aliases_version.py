@@ -0,0 +1,29 @@
+"""Add version column to test_aliases
+
+Revision ID: 6e2a9c4f8b15
+Revises: 4b8e1f2d6c93
+Create Date: 2026-10-18 19:42:17.308214
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6e2a9c4f8b15'
+down_revision: Union[str, None] = '4b8e1f2d6c93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('test_aliases', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('test_aliases') as batch_op:
+        batch_op.drop_column('version')
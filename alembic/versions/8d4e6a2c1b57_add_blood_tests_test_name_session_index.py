@@ -0,0 +1,28 @@
+"""Add composite index on blood_tests (test_name, session_id)
+
+Revision ID: 8d4e6a2c1b57
+Revises: 3f1c2d9b7e10
+Create Date: 2026-10-18 11:40:03.117842
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d4e6a2c1b57'
+down_revision: Union[str, None] = '3f1c2d9b7e10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_blood_tests_test_name_session_id', 'blood_tests', ['test_name', 'session_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_blood_tests_test_name_session_id', table_name='blood_tests')
@@ -1,7 +1,7 @@
 """Make value in blood_tests nullable
 
 Revision ID: a5bba191d621
-Revises: 
+Revises: 0c4d2b7e9a13
 Create Date: 2025-03-21 20:59:33.328225
 
 """
@@ -13,30 +13,21 @@ import sqlalchemy as sa
 
 # revision identifiers, used by Alembic.
 revision: str = 'a5bba191d621'
-down_revision: Union[str, None] = None
+down_revision: Union[str, None] = '0c4d2b7e9a13'
 branch_labels: Union[str, Sequence[str], None] = None
 depends_on: Union[str, Sequence[str], None] = None
 
 
 def upgrade() -> None:
     """Upgrade schema."""
-    # ### commands auto generated by Alembic - please adjust! ###
-    op.alter_column('blood_tests', 'value',
-               existing_type=sa.DOUBLE_PRECISION(precision=53),
-               nullable=True)
-    op.alter_column('blood_tests', 'unit',
-               existing_type=sa.VARCHAR(),
-               nullable=True)
-    # ### end Alembic commands ###
+    # Batch mode, so SQLite (which can't ALTER COLUMN) recreates the table instead
+    with op.batch_alter_table('blood_tests') as batch_op:
+        batch_op.alter_column('value', existing_type=sa.Float(), nullable=True)
+        batch_op.alter_column('unit', existing_type=sa.VARCHAR(), nullable=True)
 
 
 def downgrade() -> None:
     """Downgrade schema."""
-    # ### commands auto generated by Alembic - please adjust! ###
-    op.alter_column('blood_tests', 'unit',
-               existing_type=sa.VARCHAR(),
-               nullable=False)
-    op.alter_column('blood_tests', 'value',
-               existing_type=sa.DOUBLE_PRECISION(precision=53),
-               nullable=False)
-    # ### end Alembic commands ###
+    with op.batch_alter_table('blood_tests') as batch_op:
+        batch_op.alter_column('unit', existing_type=sa.VARCHAR(), nullable=False)
+        batch_op.alter_column('value', existing_type=sa.Float(), nullable=False)
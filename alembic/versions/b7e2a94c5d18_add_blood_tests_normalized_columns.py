@@ -0,0 +1,43 @@
+"""Add normalized range and unit columns to blood_tests
+
+Revision ID: b7e2a94c5d18
+Revises: f9b3c6d2a471
+Create Date: 2026-10-18 15:52:10.418236
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e2a94c5d18'
+down_revision: Union[str, None] = 'f9b3c6d2a471'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('blood_tests', sa.Column('range_low', sa.Float(), nullable=True))
+    op.add_column('blood_tests', sa.Column('range_high', sa.Float(), nullable=True))
+    op.add_column('blood_tests', sa.Column('value_canonical', sa.Float(), nullable=True))
+    op.add_column('blood_tests', sa.Column('unit_canonical', sa.String(), nullable=True))
+    op.add_column('blood_tests', sa.Column('is_out_of_range', sa.Boolean(), nullable=True))
+    op.create_index('ix_blood_tests_is_out_of_range_session_id', 'blood_tests',
+                    ['is_out_of_range', 'session_id'], unique=False)
+    op.create_index('ix_blood_tests_canonical_id_unit_canonical_value_canonical', 'blood_tests',
+                    ['canonical_id', 'unit_canonical', 'value_canonical'], unique=False)
+    # Existing rows are filled afterwards with `python -m utils.normalization` (run from backend/)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_blood_tests_canonical_id_unit_canonical_value_canonical', table_name='blood_tests')
+    op.drop_index('ix_blood_tests_is_out_of_range_session_id', table_name='blood_tests')
+    op.drop_column('blood_tests', 'is_out_of_range')
+    op.drop_column('blood_tests', 'unit_canonical')
+    op.drop_column('blood_tests', 'value_canonical')
+    op.drop_column('blood_tests', 'range_high')
+    op.drop_column('blood_tests', 'range_low')
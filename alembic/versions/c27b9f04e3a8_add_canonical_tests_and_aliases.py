@@ -0,0 +1,57 @@
+"""Add canonical_tests, test_aliases and blood_tests.canonical_id
+
+Revision ID: c27b9f04e3a8
+Revises: 8d4e6a2c1b57
+Create Date: 2026-10-18 12:25:51.640214
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c27b9f04e3a8'
+down_revision: Union[str, None] = '8d4e6a2c1b57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('canonical_tests',
+        sa.Column('canonical_id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.PrimaryKeyConstraint('canonical_id'),
+        sa.UniqueConstraint('name')
+    )
+    op.create_index(op.f('ix_canonical_tests_canonical_id'), 'canonical_tests', ['canonical_id'], unique=False)
+    op.create_table('test_aliases',
+        sa.Column('alias_id', sa.Integer(), nullable=False),
+        sa.Column('canonical_id', sa.Integer(), nullable=False),
+        sa.Column('alias', sa.String(), nullable=False),
+        sa.Column('normalized', sa.String(), nullable=False),
+        sa.ForeignKeyConstraint(['canonical_id'], ['canonical_tests.canonical_id'], ),
+        sa.PrimaryKeyConstraint('alias_id'),
+        sa.UniqueConstraint('normalized')
+    )
+    op.create_index(op.f('ix_test_aliases_alias_id'), 'test_aliases', ['alias_id'], unique=False)
+    # Batch mode, so SQLite (which can't ALTER constraints) recreates the table instead
+    with op.batch_alter_table('blood_tests') as batch_op:
+        batch_op.add_column(sa.Column('canonical_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_blood_tests_canonical_id', 'canonical_tests', ['canonical_id'], ['canonical_id'])
+    op.create_index('ix_blood_tests_canonical_id_session_id', 'blood_tests', ['canonical_id', 'session_id'], unique=False)
+    # Existing rows are tagged afterwards with `python -m utils.canonical` (run from backend/)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_blood_tests_canonical_id_session_id', table_name='blood_tests')
+    with op.batch_alter_table('blood_tests') as batch_op:
+        batch_op.drop_constraint('fk_blood_tests_canonical_id', type_='foreignkey')
+        batch_op.drop_column('canonical_id')
+    op.drop_index(op.f('ix_test_aliases_alias_id'), table_name='test_aliases')
+    op.drop_table('test_aliases')
+    op.drop_index(op.f('ix_canonical_tests_canonical_id'), table_name='canonical_tests')
+    op.drop_table('canonical_tests')
@@ -0,0 +1,28 @@
+"""Add (session_id, test_id) index to blood_tests
+
+Revision ID: d3f8c1a6e297
+Revises: b7e2a94c5d18
+Create Date: 2026-10-18 16:05:41.207583
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd3f8c1a6e297'
+down_revision: Union[str, None] = 'b7e2a94c5d18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_blood_tests_session_id_test_id', 'blood_tests', ['session_id', 'test_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_blood_tests_session_id_test_id', table_name='blood_tests')
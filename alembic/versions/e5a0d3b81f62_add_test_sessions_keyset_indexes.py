@@ -0,0 +1,30 @@
+"""Add keyset pagination indexes on test_sessions
+
+Revision ID: e5a0d3b81f62
+Revises: c27b9f04e3a8
+Create Date: 2026-10-18 13:02:17.385920
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5a0d3b81f62'
+down_revision: Union[str, None] = 'c27b9f04e3a8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_test_sessions_test_date_session_id', 'test_sessions', ['test_date', 'session_id'], unique=False)
+    op.create_index('ix_test_sessions_user_id_test_date_session_id', 'test_sessions', ['user_id', 'test_date', 'session_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_test_sessions_user_id_test_date_session_id', table_name='test_sessions')
+    op.drop_index('ix_test_sessions_test_date_session_id', table_name='test_sessions')
@@ -0,0 +1,28 @@
+"""Add version column to test_sessions
+
+Revision ID: f9b3c6d2a471
+Revises: e5a0d3b81f62
+Create Date: 2026-10-18 13:48:36.902157
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f9b3c6d2a471'
+down_revision: Union[str, None] = 'e5a0d3b81f62'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('test_sessions', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('test_sessions', 'version')
@@ -1,22 +1,72 @@
 # database.py
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 import os
-from dotenv import load_dotenv
+from settings import get_settings
 
-load_dotenv()
+# Engines connect lazily, so importing this module never touches the database
+DATABASE_URL = get_settings().database_url
 
-DATABASE_URL = os.getenv("DATABASE_URL")
+# Connection pool tuning, shared by the sync and async engines
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # seconds
 
-engine = create_engine(DATABASE_URL)
+def pool_options(url) -> dict:
+    options = {"pool_pre_ping": DB_POOL_PRE_PING}
+    # SQLite picks its own pool class; the sizing knobs only apply to server databases
+    if make_url(url).get_backend_name() != "sqlite":
+        options.update(pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW, pool_recycle=DB_POOL_RECYCLE)
+    return options
+
+def async_url(url):
+    """Maps a sync DATABASE_URL to its async driver (asyncpg / aiosqlite)."""
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend == "postgresql":
+        return url.set(drivername="postgresql+asyncpg")
+    if backend == "sqlite":
+        return url.set(drivername="sqlite+aiosqlite")
+    return url
+
+# Sync engine: background ingestion workers, CLI scripts and Alembic
+engine = create_engine(DATABASE_URL, **pool_options(DATABASE_URL))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine: request handlers, so DB waits never block the event loop
+async_engine = create_async_engine(async_url(DATABASE_URL), **pool_options(DATABASE_URL))
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
-# Create DB session for each request
-def get_db():
-    db = SessionLocal()
+
+def _fetch_tuples(connection, statement) -> list:
+    compiled = statement.compile(dialect=connection.dialect)
+    params = compiled.construct_params()
+    if compiled.positional:
+        params = tuple(params[name] for name in compiled.positiontup)
+    cursor = connection.connection.dbapi_connection.cursor()
     try:
-        yield db
+        cursor.execute(str(compiled), params)
+        return cursor.fetchall()
     finally:
-        db.close()
\ No newline at end of file
+        cursor.close()
+
+
+async def fetch_tuples(db, statement) -> list:
+    """
+    Runs a select on the session's connection and returns the driver's plain row
+    tuples, skipping SQLAlchemy's per-row result processing (Row objects, type
+    conversion), which dominates reads of tens of thousands of rows. Only for
+    columns whose driver values are usable as is (numbers, strings).
+    """
+    connection = await db.connection()
+    return await connection.run_sync(_fetch_tuples, statement)
+
+# Create an async DB session for each request
+async def get_db():
+    async with AsyncSessionLocal() as db:
+        yield db
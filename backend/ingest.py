@@ -0,0 +1,107 @@
+"""
+Offline backfill: ingests every PDF (and every PDF inside ZIP archives) under a
+directory through the same batch pipeline as POST /upload/batch.
+
+    python -m backend.ingest <dir> [--workers N] [--no-cache] [--manifest out.json]
+
+With --openai-batch NAME, text is extracted locally, documents a lab template
+parses are stored directly and the structuring calls for the rest (chunked like
+the pipeline's, for long reports) go through the OpenAI Batch API. Re-running the same command resumes the job
+(add --no-wait to submit and return; run again later to collect and persist).
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+# Backend modules import each other top-level style (as when run from backend/)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from utils.batch import BATCH_WORKERS, ingest_documents, iter_archive  # noqa: E402
+from utils.cache import hash_file  # noqa: E402
+from utils.openai_batch import BatchStructuringJob  # noqa: E402
+from utils.openai_client import get_openai_client  # noqa: E402
+from utils.pipeline import extract_raw_text  # noqa: E402
+from models.data_models import BatchFileResult  # noqa: E402
+from settings import get_settings  # noqa: E402
+from utils.telemetry import configure_logging  # noqa: E402
+
+
+def iter_directory(root: str, spool_dir: str):
+    """PDFs are read in place; ZIP entries are spooled to `spool_dir` one at a time."""
+    for dirpath, _, filenames in os.walk(root):
+        for filename in sorted(filenames):
+            path = os.path.join(dirpath, filename)
+            name = os.path.relpath(path, root)
+            if filename.lower().endswith(".pdf"):
+                yield BatchFileResult(filename=name, sha256=hash_file(path)), path
+            elif filename.lower().endswith(".zip"):
+                with open(path, "rb") as archive:
+                    yield from iter_archive(archive, name, spool_dir)
+
+
+def run_openai_batch(args, spool_dir: str) -> int:
+    job = BatchStructuringJob(args.openai_batch, get_openai_client(get_settings().openai_api_key))
+    documents = []
+    if job.state["status"] == "new":
+        # Extract stage only, in parallel; custom ids are content hashes so repeats collapse. The
+        # job tries the lab templates on each document (hence the path) before batching it
+        def extract(doc):
+            result, path = doc
+            if path is None:
+                return None
+            try:
+                return result.sha256, extract_raw_text(path, not args.no_cache, result.sha256), path
+            except Exception as e:
+                print(f"failed     {result.filename} {e}")
+                return None
+
+        with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+            documents = [doc for doc in pool.map(extract, iter_directory(args.directory, spool_dir)) if doc]
+
+    state = job.run(documents, wait=not args.no_wait)
+    print(f"Batch job {args.openai_batch}: {state['status']} {job.summary()}")
+    return 1 if job.summary().get("failed") else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("directory")
+    parser.add_argument("--workers", type=int, default=BATCH_WORKERS)
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the extraction cache")
+    parser.add_argument("--manifest", help="Write the per-file manifest as JSON to this path")
+    parser.add_argument("--openai-batch", metavar="NAME", help="Structure through the OpenAI Batch API as job NAME")
+    parser.add_argument("--no-wait", action="store_true", help="With --openai-batch, submit and return without polling")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.directory):
+        parser.error(f"{args.directory} is not a directory")
+
+    if args.openai_batch:
+        # Batch progress is logged while polling
+        configure_logging(getattr(logging, get_settings().log_level, logging.INFO))
+        with tempfile.TemporaryDirectory() as spool_dir:
+            return run_openai_batch(args, spool_dir)
+
+    with tempfile.TemporaryDirectory() as spool_dir:
+        documents = iter_directory(args.directory, spool_dir)
+        # Only spooled ZIP entries may be deleted; PDFs in the source directory are left alone
+        result = ingest_documents(documents, workers=args.workers, use_cache=not args.no_cache,
+                                  remove_duplicates=False)
+
+    for entry in result.files:
+        detail = entry.error or (f"session {entry.session_id}" if entry.session_id else "")
+        print(f"{entry.status:<10} {entry.filename} {detail}")
+    print(f"Ingested {result.ingested}, duplicates {result.duplicates}, failed {result.failed}")
+
+    if args.manifest:
+        with open(args.manifest, "w", encoding="utf-8") as f:
+            f.write(result.model_dump_json(indent=2))
+
+    return 1 if result.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,27 +1,77 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+import logging
+import os
+from fastapi import FastAPI, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from database import engine
-from models import orm_models
-from routers import upload, sessions
+from database import engine, async_engine, SessionLocal
+from routers import upload, sessions, jobs, cache, metrics, canonical, templates, users, export
+from settings import get_settings
+from utils.jobs import ingest_queue
+from utils.canonical import canonical_index
+from utils.openai_client import close_openai_client
+from utils.extraction_pool import extraction_pool
+from utils.telemetry import TelemetryMiddleware, configure_logging, instrument_engine, metrics_response
+from utils.uploads import UploadSizeLimitMiddleware
 
-# Initialize FastAPI app
-app = FastAPI()
+# Importing this module has no side effects: no DB access, no files created and no
+# OpenAI / PDF libraries loaded. The schema is managed by Alembic (`alembic upgrade head`);
+# startup work happens in the lifespan and the extraction stack loads on first use.
+settings = get_settings()
+
+def load_canonical_index():
+    db = SessionLocal()
+    try:
+        canonical_index.load(db)
+    finally:
+        db.close()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    configure_logging(getattr(logging, settings.log_level, logging.INFO))
+    instrument_engine(engine)
+    instrument_engine(async_engine.sync_engine)
+    os.makedirs(settings.upload_dir, exist_ok=True)
+    await run_in_threadpool(load_canonical_index)
+    # The pooled OpenAI client (keep-alive, HTTP/2) is created by the first pipeline call that needs it
+    # Start the upload ingestion workers and stop them on shutdown
+    await ingest_queue.start()
+    yield
+    await ingest_queue.stop()
+    await run_in_threadpool(extraction_pool.shutdown)
+    close_openai_client()
 
-origins = [
-    "http://localhost:3000",  # React frontend URL
-]
+# Initialize FastAPI app
+app = FastAPI(lifespan=lifespan)
 
+# Oversized uploads are refused from Content-Length before the body is read (inside CORS so the
+# browser can see the 413)
+app.add_middleware(UploadSizeLimitMiddleware)
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=origins,  # Allows CORS for frontend
+    allow_origins=list(settings.cors_origins),  # Allows CORS for frontend
     allow_credentials=True,
     allow_methods=["*"],  # Allows all HTTP methods (GET, POST etc.)
     allow_headers=["*"],  # Allows all headers
+    expose_headers=["X-Request-ID"],
 )
-
-# Create tables
-orm_models.Base.metadata.create_all(bind=engine)
+# Request ids, HTTP latency and per-request DB time
+app.add_middleware(TelemetryMiddleware)
 
 # Include API routers
 app.include_router(upload.router)
-app.include_router(sessions.router)
\ No newline at end of file
+app.include_router(sessions.router)
+app.include_router(jobs.router)
+app.include_router(cache.router)
+app.include_router(metrics.router)
+app.include_router(canonical.router)
+app.include_router(templates.router)
+app.include_router(users.router)
+app.include_router(export.router)
+
+# Prometheus scrape endpoint. An exact route rather than a mount, so it doesn't
+# shadow /metrics/{canonical_name}/series
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    body, content_type = metrics_response()
+    return Response(content=body, media_type=content_type)
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from typing import List, Optional
 from datetime import datetime
 
@@ -29,4 +29,126 @@ class BloodTestResults(BaseModel):
 class BloodTestUpdate(BaseModel):
     value: str
     unit: str
-    test_name: str
\ No newline at end of file
+    test_name: str
+
+# Session detail, returned by GET /sessions/{session_id}
+class BloodTestOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    test_id: int
+    test_name: str
+    value: Optional[float] = None
+    unit: Optional[str] = None
+    normal_range: Optional[str] = None
+    range_low: Optional[float] = None
+    range_high: Optional[float] = None
+    value_canonical: Optional[float] = None
+    unit_canonical: Optional[str] = None
+    is_out_of_range: Optional[bool] = None
+
+class SessionDetail(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    session_id: int
+    test_date: datetime
+    location: Optional[str] = None
+    weight: Optional[float] = None
+    blood_tests: List[BloodTestOut]
+
+# Session list page, returned by GET /sessions
+class SessionSummary(BaseModel):
+    session_id: int
+    user_id: int
+    test_date: datetime
+    location: Optional[str] = None
+
+class SessionPage(BaseModel):
+    items: List[SessionSummary]
+    next_cursor: Optional[str] = None
+
+# Canonical test dictionary
+class CanonicalTestOut(BaseModel):
+    canonical_id: int
+    name: str
+    aliases: List[str]
+
+class AliasCreate(BaseModel):
+    alias: str
+
+# Time series of a single metric, returned by GET /metrics/{canonical_name}/series
+class MetricPoint(BaseModel):
+    date: datetime
+    value: Optional[float]
+    unit: Optional[str] = None
+    normal_range: Optional[str] = None
+    value_canonical: Optional[float] = None
+    unit_canonical: Optional[str] = None
+    is_out_of_range: Optional[bool] = None
+
+class MetricSeries(BaseModel):
+    test_name: str
+    points: List[MetricPoint]
+
+# Per-test summary of a user's history, returned by GET /users/{user_id}/analytics
+class TestAnalytics(BaseModel):
+    test_name: str  # canonical name when the test is canonicalized
+    canonical_id: Optional[int] = None
+    count: int
+    latest_value: float
+    latest_date: datetime
+    # Values are value_canonical, in this unit; only measurements in it are summarized
+    unit_canonical: Optional[str] = None
+    normal_range: Optional[str] = None  # as printed on the latest report, in its reported unit
+    latest_out_of_range: bool = False
+    previous_value: Optional[float] = None
+    delta: Optional[float] = None  # latest minus previous measurement
+    rolling_mean: float  # over the last `window` measurements
+    rolling_min: float
+    rolling_max: float
+    slope_per_year: Optional[float] = None  # least-squares trend, in units per year
+    out_of_range_count: int = 0
+
+class UserAnalytics(BaseModel):
+    user_id: int
+    sessions: int
+    window: int
+    tests: List[TestAnalytics]
+
+# Batch upload manifest, returned by POST /upload/batch and printed by `python -m backend.ingest`
+class BatchFileResult(BaseModel):
+    filename: str
+    sha256: Optional[str] = None
+    status: str = "pending"  # queued (POST /upload/batch) | ingested (CLI) | duplicate | failed
+    job_id: Optional[str] = None  # poll GET /jobs/{job_id} for queued files
+    session_id: Optional[int] = None
+    duplicate_of: Optional[str] = None
+    tests: int = 0
+    error: Optional[str] = None
+
+class BatchUploadResult(BaseModel):
+    queued: int = 0
+    ingested: int
+    duplicates: int
+    failed: int
+    files: List[BatchFileResult]
+
+# Ingestion job status, returned by POST /upload and GET /jobs/{job_id}
+class JobStage(BaseModel):
+    name: str
+    status: str = "pending"  # pending | running | done | failed
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+class JobStatus(BaseModel):
+    job_id: str
+    filename: str
+    file_path: str
+    file_hash: Optional[str] = None  # SHA-256 computed while the upload was saved
+    use_cache: bool = True
+    request_id: Optional[str] = None  # id of the upload request, for log correlation
+    status: str = "queued"  # queued | running | done | failed
+    stages: List[JobStage]
+    session_id: Optional[int] = None
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from database import Base # fix in case of alembic revision to backend.database
 
@@ -19,9 +19,18 @@ class TestSession(Base):
     test_date = Column(DateTime, nullable=False)
     location = Column(String, nullable=True)
     weight = Column(Float, nullable=True)
+    # Bumped whenever the session or its tests change; used as the detail endpoint's ETag
+    version = Column(Integer, nullable=False, default=1, server_default="1")
 
     user = relationship("User", back_populates="sessions")
-    blood_tests = relationship("BloodTest", back_populates="session", cascade="all, delete-orphan")
+    blood_tests = relationship("BloodTest", back_populates="session", cascade="all, delete-orphan",
+                               order_by="BloodTest.test_id")
+
+    __table_args__ = (
+        # Keyset pagination of the session list, newest first (optionally per user)
+        Index("ix_test_sessions_test_date_session_id", "test_date", "session_id"),
+        Index("ix_test_sessions_user_id_test_date_session_id", "user_id", "test_date", "session_id"),
+    )
 
 class BloodTest(Base):
     __tablename__ = "blood_tests"
@@ -32,5 +41,67 @@ class BloodTest(Base):
     value = Column(Float, nullable=True)
     unit = Column(String, nullable=True)
     normal_range = Column(String, nullable=True)
+    canonical_id = Column(Integer, ForeignKey("canonical_tests.canonical_id"), nullable=True)
+    # Filled at ingest by utils.normalization. Range bounds are in the reported unit, like `value`;
+    # value_canonical/unit_canonical are the value in the test's standard unit
+    range_low = Column(Float, nullable=True)
+    range_high = Column(Float, nullable=True)
+    value_canonical = Column(Float, nullable=True)
+    unit_canonical = Column(String, nullable=True)
+    is_out_of_range = Column(Boolean, nullable=True)
 
     session = relationship("TestSession", back_populates="blood_tests")
+    canonical_test = relationship("CanonicalTest")
+
+    __table_args__ = (
+        # Serves per-metric time series lookups (test_name equality, then join on session)
+        Index("ix_blood_tests_test_name_session_id", "test_name", "session_id"),
+        Index("ix_blood_tests_canonical_id_session_id", "canonical_id", "session_id"),
+        # A session's tests in order: exports and per-user reads driven from test_sessions
+        Index("ix_blood_tests_session_id_test_id", "session_id", "test_id"),
+        # "Out-of-range results" and "values of a test in a unit/within bounds" as index range scans
+        Index("ix_blood_tests_is_out_of_range_session_id", "is_out_of_range", "session_id"),
+        Index("ix_blood_tests_canonical_id_unit_canonical_value_canonical",
+              "canonical_id", "unit_canonical", "value_canonical"),
+    )
+
+class CanonicalTest(Base):
+    """A single lab metric (e.g. `HDL`), shared by every spelling the LLM produces for it."""
+    __tablename__ = "canonical_tests"
+
+    canonical_id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, nullable=False, unique=True)
+
+    aliases = relationship("TestAlias", back_populates="canonical_test", cascade="all, delete-orphan")
+
+class TestAlias(Base):
+    """Maps a normalized test name (see utils.canonical.normalize_name) to its canonical test."""
+    __tablename__ = "test_aliases"
+
+    alias_id = Column(Integer, primary_key=True, index=True)
+    canonical_id = Column(Integer, ForeignKey("canonical_tests.canonical_id"), nullable=False)
+    alias = Column(String, nullable=False)
+    normalized = Column(String, nullable=False, unique=True)
+    # Set to one above the table's highest when the alias is re-pointed, so other
+    # processes see the change and reload their alias maps (utils.canonical)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+
+    canonical_test = relationship("CanonicalTest", back_populates="aliases")
+
+class IngestJob(Base):
+    """Durable copy of an upload ingestion job, written only when JOB_PERSIST is enabled."""
+    __tablename__ = "ingest_jobs"
+
+    job_id = Column(String, primary_key=True)
+    filename = Column(String, nullable=False)
+    file_path = Column(String, nullable=False)
+    # Kept so a re-queued job reuses the upload's hash and cache setting and logs under its request
+    file_hash = Column(String, nullable=True)
+    use_cache = Column(Boolean, nullable=False, default=True, server_default="1")
+    request_id = Column(String, nullable=True)
+    status = Column(String, nullable=False, index=True)
+    stage = Column(String, nullable=True)
+    session_id = Column(Integer, nullable=True)
+    error = Column(String, nullable=True)
+    created_at = Column(DateTime, nullable=False)
+    updated_at = Column(DateTime, nullable=False)
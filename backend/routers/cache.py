@@ -0,0 +1,8 @@
+from fastapi import APIRouter
+from utils.cache import extraction_cache
+
+router = APIRouter(prefix="/cache", tags=["cache"])
+
+@router.get("/stats")
+def get_cache_stats():
+    return extraction_cache.stats()
@@ -0,0 +1,40 @@
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from database import get_db
+from models import orm_models
+from models.data_models import AliasCreate, CanonicalTestOut
+from utils.canonical import canonical_index
+from utils.analytics import analytics_cache
+
+router = APIRouter(prefix="/canonical-tests", tags=["canonical-tests"])
+
+def _to_out(canonical: orm_models.CanonicalTest) -> CanonicalTestOut:
+    return CanonicalTestOut(
+        canonical_id=canonical.canonical_id,
+        name=canonical.name,
+        aliases=sorted(alias.alias for alias in canonical.aliases)
+    )
+
+@router.get("/", response_model=List[CanonicalTestOut])
+async def list_canonical_tests(db: AsyncSession = Depends(get_db)):
+    tests = (await db.scalars(
+        select(orm_models.CanonicalTest)
+        .options(selectinload(orm_models.CanonicalTest.aliases))
+        .order_by(orm_models.CanonicalTest.name)
+    )).all()
+    return [_to_out(test) for test in tests]
+
+@router.post("/{canonical_id}/aliases", response_model=CanonicalTestOut)
+async def add_alias(canonical_id: int, alias_data: AliasCreate, db: AsyncSession = Depends(get_db)):
+    canonical = await db.get(orm_models.CanonicalTest, canonical_id)
+    if not canonical:
+        raise HTTPException(status_code=404, detail=f"Canonical test {canonical_id} not found")
+    # The alias index works on sync sessions; run_sync hands it one bound to this connection
+    await db.run_sync(lambda sync_db: canonical_index.add_alias(sync_db, canonical_id, alias_data.alias))
+    # Existing rows may have moved to this canonical test, regrouping any user's analytics
+    analytics_cache.clear()
+    await db.refresh(canonical, ["aliases"])
+    return _to_out(canonical)
@@ -0,0 +1,31 @@
+from datetime import date, datetime
+from typing import Literal, Optional
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from utils.export import EXPORT_FORMATS, STREAMERS, export_query, iter_batches, parquet_available
+
+router = APIRouter(prefix="/export", tags=["export"])
+
+@router.get("")
+def export_results(
+    format: Literal["csv", "parquet", "ndjson"] = "csv",
+    user_id: Optional[int] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+):
+    """
+    Streams every test result (optionally one user's, within a date range) as CSV,
+    NDJSON or Parquet. Rows are read from a server-side cursor in batches and
+    written out batch by batch, so memory stays flat however long the history is.
+    """
+    if format == "parquet" and not parquet_available():
+        raise HTTPException(status_code=501, detail="Parquet export needs pyarrow installed on the server")
+
+    media_type, extension = EXPORT_FORMATS[format]
+    filename = f"bloodpanel-{f'user{user_id}-' if user_id is not None else ''}{datetime.now():%Y%m%d}.{extension}"
+    # A sync generator: Starlette iterates it in the threadpool, keeping the DB cursor and encoding off the event loop
+    return StreamingResponse(
+        STREAMERS[format](iter_batches(export_query(user_id, start, end))),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
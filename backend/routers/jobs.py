@@ -0,0 +1,12 @@
+from fastapi import APIRouter, HTTPException
+from models.data_models import JobStatus
+from utils.jobs import ingest_queue
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+@router.get("/{job_id}", response_model=JobStatus)
+def get_job_status(job_id: str):
+    job = ingest_queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
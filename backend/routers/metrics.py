@@ -0,0 +1,80 @@
+from datetime import date, datetime, time
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_db
+from models import orm_models
+from models.data_models import MetricPoint, MetricSeries
+from utils.canonical import canonical_index
+
+router = APIRouter(prefix="/metrics", tags=["metrics"])
+
+def downsample(points: List[MetricPoint], max_points: int) -> List[MetricPoint]:
+    """
+    Reduces a series to at most `max_points` by averaging consecutive, equally sized
+    buckets. Each bucket keeps its last point's date, unit and normal range, and is
+    out of range if any of its points is.
+    """
+    if max_points <= 0 or len(points) <= max_points:
+        return points
+
+    bucket_size = len(points) / max_points
+    reduced = []
+    for i in range(max_points):
+        bucket = points[int(i * bucket_size):int((i + 1) * bucket_size)]
+        values = [p.value for p in bucket if p.value is not None]
+        canonical_values = [p.value_canonical for p in bucket if p.value_canonical is not None]
+        flags = [p.is_out_of_range for p in bucket if p.is_out_of_range is not None]
+        last = bucket[-1]
+        reduced.append(MetricPoint(
+            date=last.date,
+            value=sum(values) / len(values) if values else None,
+            unit=last.unit,
+            normal_range=last.normal_range,
+            value_canonical=sum(canonical_values) / len(canonical_values) if canonical_values else None,
+            unit_canonical=last.unit_canonical,
+            is_out_of_range=any(flags) if flags else None
+        ))
+    return reduced
+
+@router.get("/{canonical_name}/series", response_model=MetricSeries)
+async def get_metric_series(
+    canonical_name: str,
+    user_id: Optional[int] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    max_points: int = Query(0, ge=0, description="Downsample to at most this many points (0 = all)"),
+    out_of_range: Optional[bool] = Query(None, description="Only results outside (true) or inside (false) their range"),
+    db: AsyncSession = Depends(get_db)
+):
+    BloodTest, TestSession = orm_models.BloodTest, orm_models.TestSession
+    query = (
+        select(TestSession.test_date, BloodTest.value, BloodTest.unit, BloodTest.normal_range,
+               BloodTest.value_canonical, BloodTest.unit_canonical, BloodTest.is_out_of_range)
+        .join(TestSession, TestSession.session_id == BloodTest.session_id)
+    )
+    # Any known spelling resolves to its canonical test; unknown names match literally
+    await db.run_sync(canonical_index.refresh)
+    canonical_id = canonical_index.lookup(canonical_name)
+    if canonical_id is not None:
+        query = query.where(BloodTest.canonical_id == canonical_id)
+    else:
+        query = query.where(BloodTest.test_name == canonical_name)
+    if user_id is not None:
+        query = query.where(TestSession.user_id == user_id)
+    if start is not None:
+        query = query.where(TestSession.test_date >= datetime.combine(start, time.min))
+    if end is not None:
+        query = query.where(TestSession.test_date <= datetime.combine(end, time.max))
+    if out_of_range is not None:
+        query = query.where(BloodTest.is_out_of_range.is_(out_of_range))
+
+    rows = (await db.execute(query.order_by(TestSession.test_date))).all()
+    points = [
+        MetricPoint(date=row.test_date, value=row.value, unit=row.unit, normal_range=row.normal_range,
+                    value_canonical=row.value_canonical, unit_canonical=row.unit_canonical,
+                    is_out_of_range=row.is_out_of_range)
+        for row in rows
+    ]
+    return MetricSeries(test_name=canonical_name, points=downsample(points, max_points))
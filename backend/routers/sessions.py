@@ -1,48 +1,125 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+import base64
+from datetime import datetime
+from typing import Optional, Tuple
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import and_, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 from database import get_db
 from models import orm_models
-from models.data_models import BloodTestUpdate
+from models.data_models import BloodTestUpdate, SessionDetail, SessionPage, SessionSummary
+from utils.analytics import analytics_cache
+from utils.canonical import canonical_index
+from utils.normalization import analyte_units, normalized_columns
 
 router = APIRouter(prefix="/sessions", tags=["sessions"])
 
-@router.get("/")
-def get_sessions(db: Session = Depends(get_db)):
-    return db.query(orm_models.TestSession).order_by(orm_models.TestSession.test_date.desc()).all()
+def encode_cursor(test_date: datetime, session_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{test_date.isoformat()}|{session_id}".encode()).decode()
 
-@router.get("/{session_id}")
-def get_session_details(session_id: int, db: Session = Depends(get_db)):
-    session = db.query(orm_models.TestSession).filter_by(session_id=session_id).first()
-    tests = db.query(orm_models.BloodTest).filter_by(session_id=session_id).all()
-    return {
-        "session_id": session.session_id,
-        "test_date": session.test_date,
-        "location": session.location,
-        "weight": session.weight,
-        "blood_tests": tests
-    }
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        test_date, session_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(test_date), int(session_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+@router.get("/", response_model=SessionPage)
+async def get_sessions(
+    user_id: Optional[int] = None,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Lists sessions newest first, one page at a time. Pass the returned
+    `next_cursor` to get the following page; it is null on the last page.
+    """
+    TestSession = orm_models.TestSession
+    query = select(TestSession.session_id, TestSession.user_id, TestSession.test_date, TestSession.location)
+    if user_id is not None:
+        query = query.where(TestSession.user_id == user_id)
+    if cursor:
+        # Keyset pagination: continue strictly after the last (test_date, session_id) seen
+        last_date, last_id = decode_cursor(cursor)
+        query = query.where(or_(
+            TestSession.test_date < last_date,
+            and_(TestSession.test_date == last_date, TestSession.session_id < last_id)
+        ))
+
+    query = query.order_by(TestSession.test_date.desc(), TestSession.session_id.desc()).limit(limit + 1)
+    rows = (await db.execute(query)).all()
+    items = [SessionSummary.model_validate(row, from_attributes=True) for row in rows[:limit]]
+    next_cursor = encode_cursor(rows[limit - 1].test_date, rows[limit - 1].session_id) if len(rows) > limit else None
+    return SessionPage(items=items, next_cursor=next_cursor)
+
+def session_etag(session_id: int, version: int) -> str:
+    return f'"{session_id}-{version}"'
+
+@router.get("/{session_id}", response_model=SessionDetail)
+async def get_session_details(session_id: int, request: Request, response: Response,
+                              db: AsyncSession = Depends(get_db)):
+    TestSession = orm_models.TestSession
+
+    # Conditional request: compare against the version column before loading any tests
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        version = await db.scalar(select(TestSession.version).where(TestSession.session_id == session_id))
+        if version is None:
+            raise HTTPException(status_code=404, detail=f"Session {session_id} not found")
+        etag = session_etag(session_id, version)
+        if etag in [tag.strip() for tag in if_none_match.split(",")]:
+            return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+    session = await db.get(TestSession, session_id, options=[selectinload(TestSession.blood_tests)])
+    if not session:
+        raise HTTPException(status_code=404, detail=f"Session {session_id} not found")
+
+    # no-cache: browsers keep the body but revalidate with If-None-Match every time
+    response.headers["ETag"] = session_etag(session.session_id, session.version)
+    response.headers["Cache-Control"] = "no-cache"
+    return SessionDetail.model_validate(session)
 
 @router.delete("/{session_id}")
-def delete_session(session_id: int, db: Session = Depends(get_db)):
-    session = db.query(orm_models.TestSession).filter_by(session_id=session_id).first()
+async def delete_session(session_id: int, db: AsyncSession = Depends(get_db)):
+    # Tests are loaded up front so the delete-orphan cascade doesn't lazy-load them
+    session = await db.get(orm_models.TestSession, session_id,
+                           options=[selectinload(orm_models.TestSession.blood_tests)])
     if not session:
         raise HTTPException(status_code=404, detail=f"Session {session_id} not found")
-    db.delete(session)
-    db.commit()
+    user_id = session.user_id
+    await db.delete(session)
+    await db.commit()
+    analytics_cache.invalidate(user_id)
     return {"message": f"Session {session_id} deleted"}
 
 @router.put("/{session_id}/tests/{test_id}")
-def update_blood_test(session_id: int, test_id: int, test_data: BloodTestUpdate, db: Session = Depends(get_db)):
-    blood_test = db.query(orm_models.BloodTest).filter_by(test_id=test_id, session_id=session_id).first()
+async def update_blood_test(session_id: int, test_id: int, test_data: BloodTestUpdate,
+                            db: AsyncSession = Depends(get_db)):
+    # Renaming can move the test to another canonical test (and so another canonical unit);
+    # resolved first, since an unseen name is committed in its own short transaction
+    canonical_ids = await run_in_threadpool(canonical_index.resolve_many, [test_data.test_name])
+
+    blood_test = await db.scalar(
+        select(orm_models.BloodTest)
+        .options(selectinload(orm_models.BloodTest.session))
+        .where(orm_models.BloodTest.test_id == test_id, orm_models.BloodTest.session_id == session_id)
+    )
     if not blood_test:
         raise HTTPException(status_code=404, detail=f"Test {test_id} not found")
 
     blood_test.value = float(test_data.value)
     blood_test.unit = test_data.unit
     blood_test.test_name = test_data.test_name
+    blood_test.canonical_id = canonical_ids[test_data.test_name]
+    for column, value in normalized_columns(blood_test.value, blood_test.unit, blood_test.normal_range,
+                                            analyte_units().get(blood_test.canonical_id)).items():
+        setattr(blood_test, column, value)
+    blood_test.session.version += 1
 
-    db.commit()
-    db.refresh(blood_test)
+    await db.commit()
+    analytics_cache.invalidate(blood_test.session.user_id)
 
     return {
         "message": "Test updated",
@@ -51,6 +128,9 @@ def update_blood_test(session_id: int, test_id: int, test_data: BloodTestUpdate,
             "test_name": blood_test.test_name,
             "value": blood_test.value,
             "unit": blood_test.unit,
-            "normal_range": blood_test.normal_range
+            "normal_range": blood_test.normal_range,
+            "value_canonical": blood_test.value_canonical,
+            "unit_canonical": blood_test.unit_canonical,
+            "is_out_of_range": blood_test.is_out_of_range
         }
     }
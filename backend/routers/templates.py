@@ -0,0 +1,8 @@
+from fastapi import APIRouter
+from utils.templates import template_registry
+
+router = APIRouter(prefix="/templates", tags=["templates"])
+
+@router.get("/stats")
+def get_template_stats():
+    return template_registry.stats()
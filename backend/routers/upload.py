@@ -1,82 +1,66 @@
-from fastapi import APIRouter, File, UploadFile, Depends
-from sqlalchemy.orm import Session
-from database import get_db
-from utils.text_processors import extract_text_from_pdf, process_pdf_with_openai, standardize_date
-from models import orm_models
-from models.data_models import BloodTestResults
+from typing import List
+from fastapi import APIRouter, File, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from utils.jobs import ingest_queue, QueueFull
+from utils.batch import enqueue_documents, iter_uploads
+from utils.telemetry import span
+from utils.uploads import UPLOAD_DIR, UploadRejected, save_upload
+from models.data_models import BatchUploadResult
 from fastapi.responses import JSONResponse
-from datetime import datetime
-import shutil, os, json
-from dotenv import load_dotenv
-
-load_dotenv()
-api_key = os.getenv("OPENAI_API_KEY")
-if not api_key:
-    raise RuntimeError("OpenAI api key environment variable not set!")
-UPLOAD_DIR = "../uploads"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
+import os
 
 router = APIRouter(prefix="/upload", tags=["upload"])
 
-@router.post("/")
-async def upload_file(file: UploadFile = File(...), db: Session = Depends(get_db)):
-    if not file.filename.endswith('.pdf'):
+@router.post("/", status_code=202)
+async def upload_file(file: UploadFile = File(...), no_cache: bool = False):
+    if not (file.filename or "").lower().endswith('.pdf'):
         return JSONResponse(content={"error": "Only PDF files are allowed"}, status_code=400)
 
-    file_name = file.filename.replace(".pdf", "")
-    timestamp = datetime.now().strftime("%d-%m-%Y_%H-%M-%S")
-    file_path = f"{UPLOAD_DIR}/{file_name}_{timestamp}.pdf"
-
-    with open(file_path, 'wb') as buffer:
-        shutil.copyfileobj(file.file, buffer)
-
-    raw_text = extract_text_from_pdf(file_path, api_key)
-    if not raw_text:
-        return JSONResponse(content={"error": "Failed to extract text"}, status_code=500)
-
-    with open(f'responses/raw/raw_text_{file_name}.json', "w", encoding="utf-8") as f:
-        f.write(raw_text)
-
-    structured_data: BloodTestResults = process_pdf_with_openai(raw_text, api_key)
-    if not structured_data:
-        return JSONResponse(content={"error": "LLM failed"}, status_code=500)
+    # Reject before touching the disk when the ingestion queue is already full
+    if ingest_queue.queued() >= ingest_queue.maxsize:
+        return JSONResponse(content={"error": "Too many uploads in progress, try again later"},
+                            status_code=429, headers={"Retry-After": "30"})
 
-    with open(f'responses/openai/openai_api_response_{file_name}.json', "w", encoding="utf-8") as f:
-        f.write(structured_data.model_dump_json(indent=2))
+    # Streamed to disk in chunks; wrong magic bytes or an oversized body stop the copy early
+    try:
+        with span("upload_save"):
+            stored = await save_upload(file, UPLOAD_DIR)
+    except UploadRejected as e:
+        return JSONResponse(content={"error": str(e)}, status_code=e.status_code)
 
-    metadata = structured_data.personal_info
-    user = db.query(orm_models.User).filter(orm_models.User.name == metadata.name).first()
-    if not user:
-        user = orm_models.User(name=metadata.name, height=metadata.height)
-        db.add(user)
-        db.commit()
-        db.refresh(user)
+    try:
+        with span("upload_enqueue"):
+            job = await ingest_queue.submit(stored.path, file.filename, use_cache=not no_cache,
+                                            file_hash=stored.sha256)
+    except QueueFull:
+        os.remove(stored.path)
+        return JSONResponse(content={"error": "Too many uploads in progress, try again later"},
+                            status_code=429, headers={"Retry-After": "30"})
 
-    standardized_date_string = standardize_date(metadata.test_date)
-    session = orm_models.TestSession(
-        user_id=user.user_id,
-        test_date=datetime.strptime(standardized_date_string, "%d-%m-%Y"),
-        location=metadata.location,
-        weight=metadata.weight
-    )
-    db.add(session)
-    db.commit()
-    db.refresh(session)
+    return {
+        "filename": file.filename,
+        "path": stored.path,
+        "sha256": stored.sha256,
+        "job_id": job.job_id,
+        "status": job.status
+    }
 
-    for test in structured_data.test_results:
-        blood_test = orm_models.BloodTest(
-            session_id=session.session_id,
-            test_name=test.test_name,
-            value=test.value,
-            unit=test.unit,
-            normal_range=test.normal_range
-        )
-        db.add(blood_test)
 
-    db.commit()
+@router.post("/batch", response_model=BatchUploadResult, status_code=202)
+async def upload_batch(files: List[UploadFile] = File(...), no_cache: bool = False):
+    """
+    Accepts many PDFs and/or ZIP archives of PDFs in one request. Each PDF is
+    spooled to disk, deduplicated by content hash within the batch and submitted
+    to the ingestion queue as its own job; the response lists the job id (or the
+    reason it was rejected) for every file. Poll GET /jobs/{job_id} for results.
+    """
+    if ingest_queue.queued() >= ingest_queue.maxsize:
+        return JSONResponse(content={"error": "Too many uploads in progress, try again later"},
+                            status_code=429, headers={"Retry-After": "30"})
 
-    return {
-        "filename": file.filename, 
-        "path": file_path,
-        "structured_data": structured_data.dict()
-    }
+    uploads = [(file.filename, file.file) for file in files]
+    # Reading the spooled uploads (and ZIP entries) is blocking; keep it off the event loop
+    with span("upload_save"):
+        documents = await run_in_threadpool(lambda: list(iter_uploads(uploads, UPLOAD_DIR)))
+    with span("upload_enqueue"):
+        return await enqueue_documents(documents, ingest_queue, use_cache=not no_cache)
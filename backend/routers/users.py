@@ -0,0 +1,59 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import case, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import fetch_tuples, get_db
+from models import orm_models
+from models.data_models import UserAnalytics
+from utils.analytics import analytics_cache, build_analytics
+from utils.canonical import canonical_index
+
+router = APIRouter(prefix="/users", tags=["users"])
+
+@router.get("/{user_id}/analytics", response_model=UserAnalytics)
+async def get_user_analytics(user_id: int, db: AsyncSession = Depends(get_db)):
+    """
+    Per-test summary of a user's whole history: latest value, change since the
+    previous session, rolling mean/min/max, trend slope and out-of-range count,
+    in each test's standard unit (value_canonical / unit_canonical).
+    Cached per user until their sessions or tests change.
+    """
+    cached = analytics_cache.get(user_id)
+    if cached is not None:
+        return cached
+
+    generation = analytics_cache.generation()
+    if await db.get(orm_models.User, user_id) is None:
+        raise HTTPException(status_code=404, detail=f"User {user_id} not found")
+
+    BloodTest, TestSession, CanonicalTest = orm_models.BloodTest, orm_models.TestSession, orm_models.CanonicalTest
+    # Dates are read once per session (SESSION_COLUMNS), not once per test row
+    sessions = (await db.execute(
+        select(TestSession.session_id, TestSession.test_date).where(TestSession.user_id == user_id)
+    )).all()
+    # Only the columns the statistics need (TEST_COLUMNS), as the driver's plain tuples; names only
+    # for rows without a canonical id, the others are grouped under their canonical name
+    tests = await fetch_tuples(db, (
+        select(BloodTest.session_id, BloodTest.test_id, BloodTest.canonical_id,
+               case((BloodTest.canonical_id.is_(None), BloodTest.test_name)),
+               BloodTest.value_canonical, BloodTest.unit_canonical, BloodTest.is_out_of_range)
+        .join(TestSession, TestSession.session_id == BloodTest.session_id)
+        .where(TestSession.user_id == user_id, BloodTest.value_canonical.is_not(None))
+    ))
+    canonical_names = canonical_index.names()
+    # Canonical tests created by another process since this one loaded the index
+    unknown = {row[2] for row in tests if row[2] is not None} - canonical_names.keys()
+    if unknown:
+        canonical_names = {**canonical_names, **dict((await db.execute(
+            select(CanonicalTest.canonical_id, CanonicalTest.name).where(CanonicalTest.canonical_id.in_(unknown))
+        )).all())}
+
+    analytics, latest_test_ids = await run_in_threadpool(build_analytics, user_id, sessions, tests, canonical_names)
+    if latest_test_ids:
+        normal_ranges = dict((await db.execute(
+            select(BloodTest.test_id, BloodTest.normal_range).where(BloodTest.test_id.in_(latest_test_ids))
+        )).all())
+        for test, test_id in zip(analytics.tests, latest_test_ids):
+            test.normal_range = normal_ranges.get(test_id)
+    analytics_cache.put(user_id, analytics, generation)
+    return analytics
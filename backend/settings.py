@@ -0,0 +1,36 @@
+# settings.py
+import os
+from functools import lru_cache
+from typing import NamedTuple, Optional, Tuple
+from dotenv import load_dotenv
+
+
+class Settings(NamedTuple):
+    """Process-wide configuration, read once from the environment (and .env)."""
+    database_url: Optional[str]
+    openai_api_key: Optional[str]
+    upload_dir: str
+    log_level: str
+    cors_origins: Tuple[str, ...]
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        return cls(
+            database_url=os.getenv("DATABASE_URL"),
+            openai_api_key=os.getenv("OPENAI_API_KEY") or None,
+            upload_dir=os.getenv("UPLOAD_DIR", "../uploads"),
+            log_level=os.getenv("LOG_LEVEL", "INFO").upper(),
+            # Comma-separated; the React dev server by default
+            cors_origins=tuple(origin.strip() for origin in os.getenv("CORS_ORIGINS", "http://localhost:3000").split(",")
+                               if origin.strip()),
+        )
+
+
+@lru_cache(maxsize=None)
+def get_settings() -> Settings:
+    """
+    The settings, loaded on first call. Nothing is required at this point: a missing
+    OPENAI_API_KEY only fails the pipeline stages that actually call OpenAI.
+    """
+    load_dotenv()
+    return Settings.from_env()
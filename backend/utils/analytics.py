@@ -0,0 +1,210 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Dict, Iterable, Optional, Tuple
+from models.data_models import TestAnalytics, UserAnalytics
+
+# Number of most recent measurements the rolling mean/min/max cover
+ANALYTICS_WINDOW = int(os.getenv("ANALYTICS_WINDOW", "5"))
+ANALYTICS_CACHE_SIZE = int(os.getenv("ANALYTICS_CACHE_SIZE", "256"))
+# Bounds staleness after writes from other processes (e.g. the batch CLI), which can't invalidate this cache
+ANALYTICS_CACHE_TTL = float(os.getenv("ANALYTICS_CACHE_TTL", "300"))
+
+# numpy/pandas are imported when analytics are first computed; the cache below is
+# imported by every write path and must stay cheap to load
+if TYPE_CHECKING:
+    import numpy as np
+
+SESSION_COLUMNS = ["session_id", "test_date"]
+# A user's test rows as selected by routers/users.py: `test_name` only for rows without a
+# canonical id, `value`/`unit` are value_canonical/unit_canonical
+TEST_COLUMNS = ["session_id", "test_id", "canonical_id", "test_name", "value", "unit", "is_out_of_range"]
+
+
+def compute_analytics(columns: Dict[str, "np.ndarray"], window: int = ANALYTICS_WINDOW) -> Tuple[list, list]:
+    """
+    Per-test summary of a user's measurements, computed column-wise over all rows
+    rather than per test. `columns` holds equal-length arrays: `key` (the name
+    tests are grouped by, the canonical name when known), `test_date` (int64 ns),
+    `session_id`, `test_id`, `canonical_id`, `value`, `unit` and `is_out_of_range`.
+    Returns TestAnalytics sorted by key, without normal_range, and the test_id of
+    each one's latest row.
+
+    Rows are sorted once by (key, date, session) so every test is a contiguous
+    segment; each statistic is then a NumPy segment reduction (reduceat)
+    instead of a Python loop or a per-group pandas apply. Values are in the
+    test's standard unit; a test's statistics only use the measurements in the
+    unit of its latest one, so a series is never mixed across unconvertible units.
+    """
+    import numpy as np
+    import pandas as pd
+
+    present = ~np.isnan(columns["value"])
+    if not present.any():
+        return [], []
+    columns = {name: column[present] for name, column in columns.items()}
+    key_codes, keys = pd.factorize(columns["key"], sort=True)
+    units, unit_names = pd.factorize(columns["unit"])  # None is -1
+    sessions = columns["session_id"]
+    # test_id last, so a metric reported twice in one session counts once: its last row
+    order = np.lexsort((columns["test_id"], sessions, columns["test_date"], key_codes))
+    codes, sessions = key_codes[order], sessions[order]
+    keep = np.ones(len(order), dtype=bool)
+    keep[:-1] = (codes[:-1] != codes[1:]) | (sessions[:-1] != sessions[1:])
+    order, codes = order[keep], codes[keep]
+
+    # Only the measurements in the unit of each test's latest one
+    ends = np.r_[np.flatnonzero(codes[1:] != codes[:-1]) + 1, len(codes)]
+    order = order[units[order] == np.repeat(units[order[ends - 1]], np.diff(np.r_[0, ends]))]
+
+    codes, dates, values = key_codes[order], columns["test_date"][order], columns["value"][order]
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    ends = np.r_[starts[1:], len(codes)]
+    counts = ends - starts
+    latest = ends - 1
+    has_previous = counts > 1
+    previous = np.where(has_previous, values[np.maximum(latest - 1, 0)], np.nan)
+
+    # Flag parsed from the normal range at ingest (utils.normalization); unknown counts as in range
+    out_of_range = columns["is_out_of_range"][order] == 1
+
+    # Rolling window = the last `window` measurements of each segment; bounds interleaved for reduceat
+    window_starts = np.maximum(starts, ends - window)
+    segments = np.column_stack([window_starts, ends]).ravel()[:-1]
+    rolling_mean = np.add.reduceat(values, segments)[::2] / (ends - window_starts)
+    rolling_min = np.minimum.reduceat(values, segments)[::2]
+    rolling_max = np.maximum.reduceat(values, segments)[::2]
+
+    # Least-squares slope of value over time, from per-segment sums: (nΣxy - ΣxΣy) / (nΣx² - (Σx)²)
+    days = (dates - dates.min()) / 86400e9
+    n, sx, sy = counts.astype("float64"), np.add.reduceat(days, starts), np.add.reduceat(values, starts)
+    sxy, sxx = np.add.reduceat(days * values, starts), np.add.reduceat(days * days, starts)
+    spread = n * sxx - sx * sx
+    with np.errstate(divide="ignore", invalid="ignore"):
+        slope = np.where(spread > 1e-9, (n * sxy - sx * sy) / spread, np.nan) * 365.25
+    out_of_range_counts = np.add.reduceat(out_of_range.astype("int64"), starts)
+
+    def optional(number):
+        return None if np.isnan(number) else float(number)
+
+    last = order[latest]
+    tests = [
+        TestAnalytics(
+            test_name=keys[codes[position]],
+            canonical_id=columns["canonical_id"][row],
+            count=int(counts[segment]),
+            latest_value=float(values[position]),
+            latest_date=pd.Timestamp(dates[position]).to_pydatetime(),
+            unit_canonical=unit_names[units[row]] if units[row] >= 0 else None,
+            latest_out_of_range=bool(out_of_range[position]),
+            previous_value=optional(previous[segment]),
+            delta=optional(values[position] - previous[segment]),
+            rolling_mean=float(rolling_mean[segment]),
+            rolling_min=float(rolling_min[segment]),
+            rolling_max=float(rolling_max[segment]),
+            slope_per_year=optional(slope[segment]),
+            out_of_range_count=int(out_of_range_counts[segment]),
+        )
+        for segment, (position, row) in enumerate(zip(latest, last))
+    ]
+    return tests, [int(test_id) for test_id in columns["test_id"][last]]
+
+
+def build_analytics(user_id: int, sessions: Iterable, tests: Iterable, canonical_names: Dict[int, str],
+                    window: int = ANALYTICS_WINDOW) -> Tuple[UserAnalytics, list]:
+    """
+    Builds the analytics response from a user's (SESSION_COLUMNS) session rows and
+    their (TEST_COLUMNS) test rows. Dates come per session rather than per test
+    row, so only one value per session has to be converted. Tests are grouped
+    under their canonical name from `canonical_names`, else their own name.
+    Returns the analytics (normal_range left unset) and the test_id of each
+    test's latest row.
+    """
+    import numpy as np
+    import pandas as pd
+
+    sessions, tests = list(sessions), list(tests)
+    if not tests:
+        return UserAnalytics(user_id=user_id, sessions=len(sessions), window=window, tests=[]), []
+    # One 2-D object array sliced into columns; much cheaper than a DataFrame over tens of thousands of rows
+    rows = np.array(tests, dtype=object)
+    columns = {name: rows[:, index] for index, name in enumerate(TEST_COLUMNS)}
+    session_ids, dates = (np.array(column) for column in zip(*sessions))
+    by_session = np.argsort(session_ids)
+    session_ids = session_ids[by_session].astype("int64")
+    dates = pd.DatetimeIndex(dates[by_session]).as_unit("ns").asi8
+    row_sessions = columns["session_id"].astype("int64")
+    # Names are looked up once per distinct canonical id; rows without one keep their own name
+    canonical_codes, canonical_ids = pd.factorize(columns["canonical_id"])
+    key = np.array([canonical_names.get(canonical_id) for canonical_id in canonical_ids] + [None],
+                   dtype=object)[canonical_codes]
+    uncanonicalized = canonical_codes == -1
+    key[uncanonicalized] = columns.pop("test_name")[uncanonicalized]
+    columns.update(
+        session_id=row_sessions,
+        test_id=columns["test_id"].astype("int64"),
+        test_date=dates[np.searchsorted(session_ids, row_sessions)],
+        value=columns["value"].astype("float64"),  # None becomes NaN
+        is_out_of_range=columns["is_out_of_range"].astype("float64"),
+        key=key,
+    )
+    results, latest_test_ids = compute_analytics(columns, window)
+    return UserAnalytics(user_id=user_id, sessions=len(sessions), window=window, tests=results), latest_test_ids
+
+
+class AnalyticsCache:
+    """
+    Per-user LRU cache of computed analytics. Writers call `invalidate(user_id)`
+    after committing a change to that user's sessions or tests; entries also
+    expire after `ttl` seconds to pick up writes made by other processes.
+
+    Readers take `generation()` before querying and pass it to `put`, so a result
+    computed from data that was invalidated meanwhile is not stored.
+    """
+
+    def __init__(self, max_users: int = ANALYTICS_CACHE_SIZE, ttl: float = ANALYTICS_CACHE_TTL):
+        self.max_users = max_users
+        self.ttl = ttl
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def generation(self) -> int:
+        with self._lock:
+            return self._generation
+
+    def get(self, user_id: int) -> Optional[UserAnalytics]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            stored_at, analytics = entry
+            if self.ttl and time.monotonic() - stored_at > self.ttl:
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return analytics
+
+    def put(self, user_id: int, analytics: UserAnalytics, generation: int):
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._entries[user_id] = (time.monotonic(), analytics)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, *user_ids: int):
+        with self._lock:
+            self._generation += 1
+            for user_id in user_ids:
+                self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+# Shared cache used by the users router; invalidated by the sessions router and persistence
+analytics_cache = AnalyticsCache()
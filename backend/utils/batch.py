@@ -0,0 +1,166 @@
+import os
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Iterable, Iterator, List, Optional, Tuple
+from database import SessionLocal
+from models.data_models import BatchFileResult, BatchUploadResult, BloodTestResults
+from utils.persistence import persist_many, persist_results
+from utils.pipeline import PipelineError, extract_and_structure
+from utils.jobs import JobQueue, QueueFull
+from utils.uploads import UploadRejected, store_pdf
+
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", "4"))
+# Parsed reports are persisted this many at a time, each chunk in one transaction
+BATCH_PERSIST_CHUNK = int(os.getenv("BATCH_PERSIST_CHUNK", "50"))
+
+# A document ready for the pipeline: its manifest entry and where its bytes live on disk
+Document = Tuple[BatchFileResult, Optional[str]]
+
+
+def iter_archive(fileobj: BinaryIO, archive_name: str, directory: str) -> Iterator[Document]:
+    """
+    Yields the PDFs inside a ZIP archive one entry at a time, spooling each to
+    `directory` only when it is reached rather than extracting the whole archive.
+    """
+    try:
+        archive = zipfile.ZipFile(fileobj)
+    except zipfile.BadZipFile:
+        yield BatchFileResult(filename=archive_name, status="failed", error="Not a valid ZIP archive"), None
+        return
+
+    with archive:
+        for info in archive.infolist():
+            if info.is_dir() or info.filename.startswith("__MACOSX/") or not info.filename.lower().endswith(".pdf"):
+                continue
+            name = f"{archive_name}/{info.filename}"
+            with archive.open(info) as entry:
+                yield from _spool(entry, name, directory)
+
+
+def iter_uploads(files: Iterable[Tuple[str, BinaryIO]], directory: str) -> Iterator[Document]:
+    """Yields documents from (filename, stream) pairs; ZIP archives are expanded entry by entry."""
+    for filename, stream in files:
+        if filename.lower().endswith(".zip"):
+            yield from iter_archive(stream, filename, directory)
+        else:
+            yield from _spool(stream, filename, directory)
+
+
+def _spool(stream: BinaryIO, name: str, directory: str) -> Iterator[Document]:
+    try:
+        stored = store_pdf(stream, name, directory)
+    except UploadRejected as e:
+        yield BatchFileResult(filename=name, status="failed", error=str(e)), None
+        return
+    yield BatchFileResult(filename=name, sha256=stored.sha256), stored.path
+
+
+async def enqueue_documents(documents: Iterable[Document], queue: JobQueue,
+                            use_cache: bool = True) -> BatchUploadResult:
+    """
+    Submits each document to the ingestion queue as its own job, skipping content
+    already seen in this batch. Returns the per-file manifest with the job ids;
+    files that don't fit in the queue are removed and reported as failed.
+    """
+    manifest: List[BatchFileResult] = []
+    seen = {}
+    for result, path in documents:
+        manifest.append(result)
+        if path is None:
+            continue
+        if result.sha256 in seen:
+            result.status, result.duplicate_of = "duplicate", seen[result.sha256].filename
+            result.job_id = seen[result.sha256].job_id
+            os.remove(path)
+            continue
+        try:
+            job = await queue.submit(path, result.filename, use_cache=use_cache, file_hash=result.sha256)
+        except QueueFull:
+            os.remove(path)
+            result.status, result.error = "failed", "Too many uploads in progress, try again later"
+            continue
+        seen[result.sha256] = result
+        result.status, result.job_id = "queued", job.job_id
+
+    return BatchUploadResult(
+        queued=sum(r.status == "queued" for r in manifest),
+        ingested=0,
+        duplicates=sum(r.status == "duplicate" for r in manifest),
+        failed=sum(r.status == "failed" for r in manifest),
+        files=manifest,
+    )
+
+
+def ingest_documents(documents: Iterable[Document], workers: int = BATCH_WORKERS,
+                     use_cache: bool = True, remove_duplicates: bool = True) -> BatchUploadResult:
+    """
+    Sends documents through extract + structure on a pool of `workers` threads as
+    they arrive, skipping content already seen in this batch, then persists the
+    parsed reports in bulk. Returns a per-file manifest in input order.
+    """
+    manifest: List[BatchFileResult] = []
+    seen = {}
+    pending = []
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for result, path in documents:
+            manifest.append(result)
+            if path is None:
+                continue
+            if result.sha256 in seen:
+                result.status = "duplicate"
+                result.duplicate_of = seen[result.sha256].filename
+                if remove_duplicates:
+                    os.remove(path)
+                continue
+            seen[result.sha256] = result
+            pending.append((result, pool.submit(extract_and_structure, path, None, use_cache, result.sha256)))
+
+        parsed: List[Tuple[BatchFileResult, BloodTestResults]] = []
+        for result, future in pending:
+            try:
+                parsed.append((result, future.result()))
+            except PipelineError as e:
+                result.status, result.error = "failed", f"{e.stage}: {e}"
+            except Exception as e:
+                result.status, result.error = "failed", str(e)
+
+    for start in range(0, len(parsed), BATCH_PERSIST_CHUNK):
+        _persist_chunk(parsed[start:start + BATCH_PERSIST_CHUNK])
+
+    # Duplicates share the outcome of the first copy
+    for result in manifest:
+        if result.status == "duplicate":
+            original = seen[result.sha256]
+            result.session_id, result.tests = original.session_id, original.tests
+
+    return BatchUploadResult(
+        ingested=sum(r.status == "ingested" for r in manifest),
+        duplicates=sum(r.status == "duplicate" for r in manifest),
+        failed=sum(r.status == "failed" for r in manifest),
+        files=manifest,
+    )
+
+
+def _persist_chunk(chunk: List[Tuple[BatchFileResult, BloodTestResults]]):
+    db = SessionLocal()
+    try:
+        try:
+            session_ids = persist_many(db, [report for _, report in chunk])
+            for (result, report), session_id in zip(chunk, session_ids):
+                _mark_ingested(result, report, session_id)
+        except Exception:
+            # One bad report rolls back the chunk; retry one by one to isolate it
+            for result, report in chunk:
+                try:
+                    _mark_ingested(result, report, persist_results(db, report))
+                except Exception as e:
+                    result.status, result.error = "failed", f"persist: {e}"
+    finally:
+        db.close()
+
+
+def _mark_ingested(result: BatchFileResult, report: BloodTestResults, session_id: int):
+    result.status = "ingested"
+    result.session_id = session_id
+    result.tests = len(report.test_results)
@@ -0,0 +1,175 @@
+import hashlib
+import os
+import threading
+import time
+from typing import Optional
+from models.data_models import BloodTestResults
+
+CACHE_DIR = os.getenv("CACHE_DIR", "responses/cache")
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+CACHE_MAX_AGE_DAYS = float(os.getenv("CACHE_MAX_AGE_DAYS", "90"))
+CACHE_BYPASS = os.getenv("CACHE_BYPASS", "false").lower() in ("1", "true", "yes")
+# Writes keep a running size total and only scan the directory when it goes over max_bytes
+# or this long after the last scan (to drop expired entries and pick up other processes' writes)
+CACHE_SWEEP_SECONDS = float(os.getenv("CACHE_SWEEP_SECONDS", "3600"))
+
+
+def hash_file(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """SHA-256 of a file's bytes, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ExtractionCache:
+    """
+    Content-addressed, two-layer cache for the ingestion pipeline, stored on disk:
+
+    - `text/<sha256 of pdf bytes>.txt` holds the extracted raw text, so a re-uploaded
+      PDF skips pdfplumber and Vision OCR.
+    - `structured/<sha256 of model + prompt + raw text>.json` holds the parsed
+      BloodTestResults, so identical text skips the structuring call. Changing the
+      prompt or model changes the key, so stale results are never served.
+
+    Entries older than `max_age_days` are ignored and deleted; once the cache grows
+    past `max_bytes` the least recently used entries are evicted.
+    """
+
+    def __init__(self, root: str = CACHE_DIR, max_bytes: int = CACHE_MAX_BYTES,
+                 max_age_days: float = CACHE_MAX_AGE_DAYS, bypass: bool = CACHE_BYPASS,
+                 sweep_seconds: float = CACHE_SWEEP_SECONDS):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_days * 24 * 3600
+        self.bypass = bypass
+        self.sweep_seconds = sweep_seconds
+        self.counters = {"text_hits": 0, "text_misses": 0, "structured_hits": 0, "structured_misses": 0}
+        self._lock = threading.Lock()
+        self._size: Optional[int] = None  # bytes on disk as of the last scan plus later writes; None until scanned
+        self._swept = 0.0
+
+    @staticmethod
+    def structured_key(raw_text: str, model: str, prompt: str) -> str:
+        digest = hashlib.sha256()
+        for part in (model, prompt, raw_text):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def get_text(self, file_hash: str) -> Optional[str]:
+        data = self._read("text", f"{file_hash}.txt")
+        self._count("text", data is not None)
+        return data
+
+    def put_text(self, file_hash: str, raw_text: str):
+        self._write("text", f"{file_hash}.txt", raw_text)
+
+    def get_results(self, key: str) -> Optional[BloodTestResults]:
+        data = self._read("structured", f"{key}.json")
+        self._count("structured", data is not None)
+        return BloodTestResults.model_validate_json(data) if data is not None else None
+
+    def put_results(self, key: str, results: BloodTestResults):
+        self._write("structured", f"{key}.json", results.model_dump_json(indent=2))
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self.counters)
+        stats["entries"], stats["bytes"] = 0, 0
+        for entry in self._entries():
+            stats["entries"] += 1
+            stats["bytes"] += entry.stat().st_size
+        stats["bypass"] = self.bypass
+        return stats
+
+    def evict(self):
+        """
+        Drops expired entries, then, once over max_bytes, least recently used ones
+        until 10% under it, so the writes that follow don't each trigger a scan.
+        """
+        now = time.time()
+        entries = []
+        for entry in self._entries():
+            st = entry.stat()
+            if now - st.st_mtime > self.max_age_seconds:
+                self._remove(entry.path)
+            else:
+                entries.append((st.st_mtime, st.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * 0.9 if total > self.max_bytes else total
+        for _, size, path in sorted(entries):
+            if total <= target:
+                break
+            self._remove(path)
+            total -= size
+        with self._lock:
+            self._size, self._swept = total, now
+
+    def _count(self, layer: str, hit: bool):
+        with self._lock:
+            self.counters[f"{layer}_{'hits' if hit else 'misses'}"] += 1
+
+    def _read(self, layer: str, name: str) -> Optional[str]:
+        if self.bypass:
+            return None
+        path = os.path.join(self.root, layer, name)
+        try:
+            if time.time() - os.path.getmtime(path) > self.max_age_seconds:
+                self._remove(path)
+                return None
+            with open(path, "r", encoding="utf-8") as f:
+                data = f.read()
+            # Bump mtime so eviction keeps recently used entries
+            os.utime(path)
+        except OSError:
+            # Missing, or evicted by another thread or process between the read and the utime
+            return None
+        return data
+
+    def _write(self, layer: str, name: str, data: str):
+        directory = os.path.join(self.root, layer)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, name)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(data)
+        size = os.path.getsize(tmp_path)
+        try:
+            replaced = os.path.getsize(path)
+        except OSError:
+            replaced = 0
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            if self._size is not None:
+                self._size += size - replaced
+            sweep = (self._size is None or self._size > self.max_bytes
+                     or time.time() - self._swept > self.sweep_seconds)
+        if sweep:
+            self.evict()
+
+    def _entries(self):
+        for layer in ("text", "structured"):
+            directory = os.path.join(self.root, layer)
+            if not os.path.isdir(directory):
+                continue
+            for entry in os.scandir(directory):
+                if entry.is_file() and not entry.name.endswith(".tmp"):
+                    yield entry
+
+    def _remove(self, path: str):
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except OSError:
+            return
+        with self._lock:
+            if self._size is not None:
+                self._size -= size
+
+
+# Shared cache used by the ingestion pipeline
+extraction_cache = ExtractionCache()
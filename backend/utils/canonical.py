@@ -0,0 +1,284 @@
+import os
+import re
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+from database import SessionLocal
+from models import orm_models
+
+# Seed dictionary: canonical name -> known spellings. Mirrors the naming rules in
+# the structuring prompt; anything else gets its own canonical entry on first sight.
+DEFAULT_CANONICAL_TESTS = {
+    "HDL": ["HDL Cholesterol", "Cholesterol HDL", "HDL-C"],
+    "LDL": ["LDL Cholesterol", "Cholesterol LDL", "LDL-C"],
+    "Total Cholesterol": ["Cholesterol", "Cholesterol Total"],
+    "Triglycerides": ["TG"],
+    "Glucose": ["Blood Glucose", "Fasting Glucose"],
+    "HbA1c": ["Hemoglobin A1c", "Glycated Hemoglobin"],
+    "HbA1": ["Hemoglobin A1", "Hemoglobin A1 Total"],
+    "Vitamin D": ["25-OH Vitamin D", "25-OH D3", "Vitamin D3"],
+    "T4": ["Thyroxine", "T4 Thyroxine"],
+    "TSH": ["Thyroid Stimulating Hormone"],
+}
+
+# How often a process checks test_aliases for changes made by other processes (API
+# workers, the backfill CLIs) before trusting its in-memory maps
+ALIAS_REFRESH_SECONDS = float(os.getenv("ALIAS_REFRESH_SECONDS", "5"))
+
+_NON_WORD = re.compile(r"[^\w\s]")
+
+
+def normalize_name(name: str) -> str:
+    """
+    Case-, punctuation- and word-order-insensitive key for a test name, so
+    "Cholesterol HDL" and "HDL-Cholesterol" share a key. "HbA1c" and "HbA1" stay distinct.
+    """
+    words = _NON_WORD.sub(" ", name.lower()).split()
+    return " ".join(sorted(words))
+
+
+def _insert_ignoring_conflicts(model, db: Session):
+    """INSERT that skips rows violating a unique constraint (ON CONFLICT DO NOTHING)."""
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(model).on_conflict_do_nothing()
+
+
+class CanonicalIndex:
+    """
+    In-memory alias -> canonical_id and canonical_id -> name maps, loaded at startup
+    and kept in sync whenever entries are added through this object. Changes made
+    by other processes are picked up by `refresh`, which reloads the maps when the
+    stamp of test_aliases (row count, highest alias_id and version) has changed.
+    """
+
+    def __init__(self, refresh_seconds: float = ALIAS_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self._aliases: Dict[str, int] = {}
+        self._names: Dict[int, str] = {}
+        self._stamp: Optional[Tuple] = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+
+    def load(self, db: Session):
+        """Seeds the default dictionary if missing and (re)builds the alias and name maps."""
+        self._seed(db)
+        self._load_maps(db)
+
+    def refresh(self, db: Optional[Session] = None):
+        """
+        Reloads the maps if test_aliases changed since they were loaded. Checks at
+        most every `refresh_seconds` and returns immediately otherwise, so it can
+        be called before every lookup; opens its own session if `db` is None.
+        """
+        now = time.monotonic()
+        if now - self._checked < self.refresh_seconds:
+            return
+        self._checked = now
+        own_session = db is None
+        db = SessionLocal() if own_session else db
+        try:
+            if self._alias_stamp(db) != self._stamp:
+                self._load_maps(db)
+        finally:
+            if own_session:
+                db.close()
+
+    def lookup(self, test_name: str) -> Optional[int]:
+        return self._aliases.get(normalize_name(test_name))
+
+    def names(self) -> Dict[int, str]:
+        """canonical_id -> canonical name. A snapshot: don't modify it."""
+        return self._names
+
+    def resolve_many(self, test_names: Iterable[str]) -> Dict[str, int]:
+        """
+        Returns canonical ids for the given names, creating a canonical entry for
+        unseen names. New entries are committed in their own short transaction, so
+        callers should resolve before opening the transaction that uses the ids.
+        """
+        self.refresh()
+        resolved = {}
+        missing = []
+        for name in set(test_names):
+            canonical_id = self.lookup(name)
+            if canonical_id is None:
+                missing.append(name)
+            else:
+                resolved[name] = canonical_id
+        if missing:
+            resolved.update(self._create(missing))
+        return resolved
+
+    def add_alias(self, db: Session, canonical_id: int, alias: str) -> orm_models.TestAlias:
+        """
+        Points `alias` at `canonical_id`, moving it off any previous target and
+        re-tagging existing rows that were filed under the old target by that alias
+        (bumping their sessions' versions in the same transaction). The alias gets
+        the next alias version, so other processes reload their maps.
+        """
+        TestAlias, BloodTest, TestSession = orm_models.TestAlias, orm_models.BloodTest, orm_models.TestSession
+        key = normalize_name(alias)
+        row = db.query(TestAlias).filter_by(normalized=key).first()
+        previous_id = row.canonical_id if row else None
+        if row is None:
+            row = TestAlias(canonical_id=canonical_id, alias=alias, normalized=key)
+            db.add(row)
+        else:
+            row.canonical_id = canonical_id
+            row.alias = alias
+        row.version = (db.query(func.max(TestAlias.version)).scalar() or 0) + 1
+
+        if previous_id is not None and previous_id != canonical_id:
+            moved = [
+                test_id for test_id, test_name in
+                db.query(BloodTest.test_id, BloodTest.test_name)
+                .filter(BloodTest.canonical_id == previous_id)
+                if normalize_name(test_name) == key
+            ]
+            if moved:
+                db.execute(
+                    update(TestSession)
+                    .where(TestSession.session_id.in_(
+                        select(BloodTest.session_id).where(BloodTest.test_id.in_(moved))
+                    ))
+                    .values(version=TestSession.version + 1)
+                )
+                db.execute(
+                    update(BloodTest)
+                    .where(BloodTest.test_id.in_(moved))
+                    .values(canonical_id=canonical_id)
+                )
+        db.commit()
+        db.refresh(row)
+
+        with self._lock:
+            self._aliases[key] = canonical_id
+        return row
+
+    def _create(self, names: List[str]) -> Dict[str, int]:
+        created = {}
+        db = SessionLocal()
+        try:
+            with self._lock:
+                new_keys: Dict[str, int] = {}
+                new_names: Dict[int, str] = {}
+                for name in names:
+                    key = normalize_name(name)
+                    # Already known, created by another thread meanwhile, or a variant of an earlier name
+                    canonical_id = self._aliases.get(key) or new_keys.get(key)
+                    if canonical_id is None:
+                        canonical_id = new_keys[key] = self._insert_alias(db, name, key)
+                        if canonical_id not in self._names:
+                            new_names[canonical_id] = db.query(orm_models.CanonicalTest.name).filter_by(
+                                canonical_id=canonical_id).scalar()
+                    created[name] = canonical_id
+                db.commit()
+                self._aliases.update(new_keys)
+                # Copy-on-write, so readers holding the previous snapshot never see it change
+                if new_names:
+                    self._names = {**self._names, **new_names}
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        return created
+
+    @staticmethod
+    def _alias_stamp(db: Session) -> Tuple:
+        # Inserts raise the count and highest id, add_alias raises the highest version
+        TestAlias = orm_models.TestAlias
+        return tuple(db.query(func.count(TestAlias.alias_id), func.max(TestAlias.alias_id),
+                              func.max(TestAlias.version)).one())
+
+    def _load_maps(self, db: Session):
+        # Stamped before reading, so a change committed meanwhile is seen by the next refresh
+        stamp = self._alias_stamp(db)
+        rows = db.query(orm_models.TestAlias.normalized, orm_models.TestAlias.canonical_id).all()
+        names = db.query(orm_models.CanonicalTest.canonical_id, orm_models.CanonicalTest.name).all()
+        with self._lock:
+            self._aliases = {row.normalized: row.canonical_id for row in rows}
+            self._names = dict(names)
+            self._stamp = stamp
+        self._checked = time.monotonic()
+
+    @staticmethod
+    def _insert_alias(db: Session, name: str, key: str) -> int:
+        """
+        Files `name` under a canonical test of the same name and returns the id the
+        database ends up with for `key`. Another process (a second API worker, the
+        backfill CLI) may have added the same name or alias since this index was
+        loaded, so both inserts skip existing rows and the ids are re-selected.
+        """
+        canonical_id = db.query(orm_models.TestAlias.canonical_id).filter_by(normalized=key).scalar()
+        if canonical_id is not None:
+            return canonical_id
+        db.execute(_insert_ignoring_conflicts(orm_models.CanonicalTest, db).values(name=name))
+        canonical_id = db.query(orm_models.CanonicalTest.canonical_id).filter_by(name=name).scalar()
+        db.execute(_insert_ignoring_conflicts(orm_models.TestAlias, db)
+                   .values(canonical_id=canonical_id, alias=name, normalized=key))
+        return db.query(orm_models.TestAlias.canonical_id).filter_by(normalized=key).scalar()
+
+    def _seed(self, db: Session):
+        # Skips existing rows, so API workers starting together on an empty database don't collide
+        for name, aliases in DEFAULT_CANONICAL_TESTS.items():
+            db.execute(_insert_ignoring_conflicts(orm_models.CanonicalTest, db).values(name=name))
+            canonical_id = db.query(orm_models.CanonicalTest.canonical_id).filter_by(name=name).scalar()
+            for alias in [name] + aliases:
+                db.execute(_insert_ignoring_conflicts(orm_models.TestAlias, db)
+                           .values(canonical_id=canonical_id, alias=alias, normalized=normalize_name(alias)))
+        db.commit()
+
+
+def backfill_canonical_ids(db: Session, index: "CanonicalIndex") -> int:
+    """
+    Assigns canonical ids to existing rows that have none, bumping the versions of
+    their sessions in the same transaction. Returns the number of rows updated.
+    """
+    BloodTest, TestSession = orm_models.BloodTest, orm_models.TestSession
+    names = [
+        name for (name,) in
+        db.query(BloodTest.test_name)
+        .filter(BloodTest.canonical_id.is_(None))
+        .distinct()
+    ]
+    if not names:
+        return 0
+    canonical_ids = index.resolve_many(names)
+    db.execute(
+        update(TestSession)
+        .where(TestSession.session_id.in_(
+            select(BloodTest.session_id).where(BloodTest.canonical_id.is_(None),
+                                               BloodTest.test_name.in_(list(canonical_ids)))
+        ))
+        .values(version=TestSession.version + 1)
+    )
+    updated = 0
+    for name, canonical_id in canonical_ids.items():
+        result = db.execute(
+            update(BloodTest)
+            .where(BloodTest.test_name == name, BloodTest.canonical_id.is_(None))
+            .values(canonical_id=canonical_id)
+        )
+        updated += result.rowcount
+    db.commit()
+    return updated
+
+
+# Shared index, loaded in main.py's lifespan
+canonical_index = CanonicalIndex()
+
+
+if __name__ == "__main__":
+    # One-off backfill for rows stored before canonicalization: `python -m utils.canonical`
+    db = SessionLocal()
+    try:
+        canonical_index.load(db)
+        print(f"Assigned canonical ids to {backfill_canonical_ids(db, canonical_index)} rows")
+    finally:
+        db.close()
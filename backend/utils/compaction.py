@@ -0,0 +1,123 @@
+import os
+import re
+from collections import Counter
+from functools import lru_cache
+from typing import List, NamedTuple, Optional, Pattern, Sequence
+from utils.openai_client import estimate_tokens
+
+# Deterministic clean-up of raw report text before it is sent for structuring
+COMPACT_ENABLED = os.getenv("COMPACT_ENABLED", "true").lower() in ("1", "true", "yes")
+# A text line seen this many times keeps only its first occurrence (page headers/footers)
+COMPACT_MIN_REPEATS = int(os.getenv("COMPACT_MIN_REPEATS", "2"))
+# Extra boilerplate regexes, one per line ("#" starts a comment); added to BOILERPLATE_PATTERNS
+COMPACT_PATTERNS_FILE = os.getenv("COMPACT_PATTERNS_FILE")
+
+# A line with a digit may hold a result and is never dropped or rewritten, except for
+# the page markers/counters below, which are matched against the whole line
+_DIGIT = re.compile(r"\d")
+VALUE_LINE = re.compile(r"^\s*[<>≤≥]?\s*\d")  # a bare value, e.g. "95 mg/dL" under its test name
+_PAGE_MARKER = re.compile(r"^Page \d+:$")  # added by extract_text_with_vision (matched on stripped lines)
+_PAGE_COUNTER = re.compile(r"^(?:page|σελίδα|σελ\.)\s*\d+\s*(?:/|of|από)\s*\d+$", re.IGNORECASE)
+
+# Lines without digits that carry nothing the structuring model needs
+BOILERPLATE_PATTERNS: List[Pattern] = [re.compile(pattern, re.IGNORECASE) for pattern in (
+    r"^(?:e-?mail|email|www\.|https?://)",
+    r"^(?:τα )?αποτελέσματα (?:αφορούν|ισχύουν|πρέπει να ερμηνεύονται)",
+    r"^(?:the )?results? (?:should|must) be interpreted",
+    r"^(?:this (?:report|document) (?:is|was) )?electronically (?:generated|signed)",
+    r"^ηλεκτρονικ[άή] (?:υπογεγραμμέν|παραγόμεν|έκδοση)",
+    r"^[-_=*.·•\s]+$",  # rules and dotted separators
+)]
+
+
+class CompactedText(NamedTuple):
+    text: str
+    raw_tokens: int  # estimate_tokens before and after compaction
+    tokens: int
+    dropped_lines: int
+
+
+@lru_cache(maxsize=None)
+def load_patterns(path: Optional[str] = COMPACT_PATTERNS_FILE) -> List[Pattern]:
+    """BOILERPLATE_PATTERNS plus the regexes in `path`, if given; read once per path."""
+    patterns = list(BOILERPLATE_PATTERNS)
+    if path:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    patterns.append(re.compile(line, re.IGNORECASE))
+    return patterns
+
+
+def is_protected(line: str) -> bool:
+    """True for lines that may hold a result: anything with a digit that isn't a page marker/counter."""
+    stripped = line.strip()
+    return bool(_DIGIT.search(stripped)) and not (_PAGE_MARKER.match(stripped) or _PAGE_COUNTER.match(stripped))
+
+
+def compact_text(raw_text: str, patterns: Optional[Sequence[Pattern]] = None,
+                 min_repeats: int = COMPACT_MIN_REPEATS, enabled: bool = COMPACT_ENABLED) -> CompactedText:
+    """
+    Shrinks the text sent for structuring without losing results:
+
+    - lines with digits are kept verbatim (only trailing whitespace is removed);
+    - "Page N:" markers become blank lines, so chunking still splits on pages;
+      page counters ("Σελίδα 2 από 3") and boilerplate pattern matches are dropped;
+    - a line occurring `min_repeats` times or more keeps only its first occurrence
+      when it is part of a header/footer block, i.e. next to another repeated,
+      boilerplate or page marker line. A lone repeated line ("Γλυκόζη" in both the
+      blood and the urine section) is kept, and so is any line directly above a bare
+      value line, which is that value's label;
+    - whitespace inside text lines is collapsed and runs of blank lines become one.
+
+    Deterministic, so the same raw text always produces the same prompt.
+    """
+    raw_tokens = estimate_tokens(raw_text)
+    if not enabled:
+        return CompactedText(raw_text, raw_tokens, raw_tokens, 0)
+    patterns = load_patterns() if patterns is None else patterns
+
+    lines = raw_text.splitlines()
+    texts = [" ".join(line.split()) for line in lines]
+    protected = [is_protected(line) for line in lines]
+    # Repeated lines with digits (an address, a lab licence number) are never dropped, but they
+    # still mark the header/footer block their neighbours belong to
+    counts = Counter(text.casefold() for text in texts if text)
+    nonblank = [index for index, text in enumerate(texts) if text]
+
+    def furniture(index: int) -> bool:
+        text = texts[index]
+        return not protected[index] and bool(
+            _PAGE_MARKER.match(text) or _PAGE_COUNTER.match(text) or any(pattern.search(text) for pattern in patterns))
+
+    def repeated(index: int) -> bool:
+        return counts[texts[index].casefold()] >= min_repeats
+
+    drop, seen = set(), set()
+    for position, index in enumerate(nonblank):
+        text = texts[index]
+        if protected[index] or _PAGE_MARKER.match(text):
+            continue
+        following = nonblank[position + 1] if position + 1 < len(nonblank) else None
+        if following is not None and VALUE_LINE.match(texts[following]):
+            continue
+        key = text.casefold()
+        if furniture(index):
+            drop.add(index)
+        elif key in seen and repeated(index) and any(
+                0 <= neighbour < len(nonblank) and (furniture(nonblank[neighbour]) or repeated(nonblank[neighbour]))
+                for neighbour in (position - 1, position + 1)):
+            drop.add(index)
+        seen.add(key)
+
+    kept: List[str] = []
+    for index, line in enumerate(lines):
+        if index in drop:
+            continue
+        if protected[index]:
+            kept.append(line.rstrip())
+        else:
+            kept.append("" if _PAGE_MARKER.match(texts[index]) else texts[index])
+    text = re.sub(r"\n{3,}", "\n\n", "\n".join(kept)).strip("\n")
+    return CompactedText(text, raw_tokens, estimate_tokens(text), len(drop))
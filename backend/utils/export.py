@@ -0,0 +1,148 @@
+import csv
+import io
+import json
+import os
+from datetime import date, datetime, time
+from typing import Iterator, List, Optional
+from sqlalchemy import select
+from database import SessionLocal
+from models import orm_models
+
+# Rows fetched per cursor batch; also the Parquet row group size
+EXPORT_BATCH_ROWS = int(os.getenv("EXPORT_BATCH_ROWS", "20000"))
+
+EXPORT_FORMATS = {
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+COLUMNS = ["user_id", "session_id", "test_date", "location", "test_id", "test_name", "canonical_name",
+           "value", "unit", "normal_range", "range_low", "range_high", "value_canonical", "unit_canonical",
+           "is_out_of_range"]
+
+
+def export_query(user_id: Optional[int] = None, start: Optional[date] = None, end: Optional[date] = None):
+    """Every test row with its session, oldest session first; the (session_id, test_id) index avoids a sort."""
+    BloodTest, TestSession, CanonicalTest = orm_models.BloodTest, orm_models.TestSession, orm_models.CanonicalTest
+    query = (
+        select(TestSession.user_id, TestSession.session_id, TestSession.test_date, TestSession.location,
+               BloodTest.test_id, BloodTest.test_name, CanonicalTest.name, BloodTest.value, BloodTest.unit,
+               BloodTest.normal_range, BloodTest.range_low, BloodTest.range_high, BloodTest.value_canonical,
+               BloodTest.unit_canonical, BloodTest.is_out_of_range)
+        .select_from(TestSession)
+        .join(BloodTest, BloodTest.session_id == TestSession.session_id)
+        .outerjoin(CanonicalTest, CanonicalTest.canonical_id == BloodTest.canonical_id)
+    )
+    if user_id is not None:
+        query = query.where(TestSession.user_id == user_id)
+    if start is not None:
+        query = query.where(TestSession.test_date >= datetime.combine(start, time.min))
+    if end is not None:
+        query = query.where(TestSession.test_date <= datetime.combine(end, time.max))
+    return query.order_by(TestSession.test_date, TestSession.session_id, BloodTest.test_id)
+
+
+def iter_batches(query, batch_size: int = EXPORT_BATCH_ROWS) -> Iterator[List[tuple]]:
+    """
+    Runs `query` with a server-side cursor (yield_per) and yields lists of at most
+    `batch_size` row tuples, so only one batch is in memory at a time. Opens its
+    own session because the response body is produced after the handler returns.
+    """
+    db = SessionLocal()
+    try:
+        result = db.execute(query.execution_options(yield_per=batch_size))
+        for partition in result.partitions():
+            yield [tuple(row) for row in partition]
+    finally:
+        db.close()
+
+
+def _text(value) -> str:
+    if value is None:
+        return ""
+    return value.isoformat() if isinstance(value, datetime) else str(value)
+
+
+def stream_csv(batches: Iterator[List[tuple]]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(COLUMNS)
+    for rows in batches:
+        writer.writerows([_text(value) for value in row] for row in rows)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def stream_ndjson(batches: Iterator[List[tuple]]) -> Iterator[bytes]:
+    for rows in batches:
+        yield "".join(
+            json.dumps(dict(zip(COLUMNS, row)), ensure_ascii=False, default=_text) + "\n" for row in rows
+        ).encode("utf-8")
+
+
+class _ChunkSink:
+    """Write-only file for ParquetWriter that hands out what was written since the last drain()."""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position  # the footer records absolute offsets, so count drained bytes too
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def stream_parquet(batches: Iterator[List[tuple]]) -> Iterator[bytes]:
+    """One row group per batch; each is yielded as soon as it is written, then the footer."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ("user_id", pa.int64()), ("session_id", pa.int64()), ("test_date", pa.timestamp("us")),
+        ("location", pa.string()), ("test_id", pa.int64()), ("test_name", pa.string()),
+        ("canonical_name", pa.string()), ("value", pa.float64()), ("unit", pa.string()),
+        ("normal_range", pa.string()), ("range_low", pa.float64()), ("range_high", pa.float64()),
+        ("value_canonical", pa.float64()), ("unit_canonical", pa.string()), ("is_out_of_range", pa.bool_()),
+    ])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(pa.PythonFile(sink, mode="w"), schema, compression="zstd")
+    try:
+        for rows in batches:
+            columns = list(zip(*rows))
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(column, type=field.type) for column, field in zip(columns, schema)], schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+STREAMERS = {"csv": stream_csv, "ndjson": stream_ndjson, "parquet": stream_parquet}
+
+
+def parquet_available() -> bool:
+    try:
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
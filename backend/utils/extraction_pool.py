@@ -0,0 +1,165 @@
+import base64
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+from typing import Callable, List, NamedTuple, Optional
+
+# CPU-bound extraction (pdfplumber text pass, page rasterize + JPEG/base64 encode)
+# runs in worker processes so it doesn't serialize on the GIL. 0 runs it inline.
+EXTRACT_WORKERS = int(os.getenv("EXTRACT_WORKERS", str(os.cpu_count() or 1)))
+# Replace each worker after this many tasks; pdfminer's memory use only grows
+EXTRACT_MAX_TASKS_PER_CHILD = int(os.getenv("EXTRACT_MAX_TASKS_PER_CHILD", "50"))
+EXTRACT_TASK_TIMEOUT = float(os.getenv("EXTRACT_TASK_TIMEOUT", "120"))  # seconds
+
+JPEG_QUALITY = int(os.getenv("JPEG_QUALITY", "85"))
+MAX_IMAGE_DIMENSION = int(os.getenv("MAX_IMAGE_DIMENSION", "2048"))
+
+
+def encode_image(pil_image, buffer: Optional[BytesIO] = None) -> str:
+    """
+    JPEG-encodes a page image and returns it base64-encoded. The image is downscaled
+    in place to MAX_IMAGE_DIMENSION; pass `buffer` to reuse one BytesIO across pages.
+    """
+    if max(pil_image.size) > MAX_IMAGE_DIMENSION:
+        pil_image.thumbnail((MAX_IMAGE_DIMENSION, MAX_IMAGE_DIMENSION))
+    if pil_image.mode not in ("RGB", "L"):
+        pil_image = pil_image.convert("RGB")
+
+    buffered = buffer if buffer is not None else BytesIO()
+    buffered.seek(0)
+    buffered.truncate()
+    pil_image.save(buffered, format="JPEG", quality=JPEG_QUALITY)
+    # Encode straight from the buffer's memory instead of copying it out first
+    with buffered.getbuffer() as view:
+        return base64.b64encode(view).decode("utf-8")
+
+
+# Task functions. They take a file path and return strings / small tuples, so only
+# small arguments and results cross the process boundary. pdfplumber and pdf2image are
+# imported inside them: in the pool workers, or in the API process only when it extracts.
+
+class PageText(NamedTuple):
+    """pdfplumber's view of one page, used to decide whether it needs OCR."""
+    number: int  # 1-based
+    text: str
+    chars: int  # non-whitespace characters in the text layer
+    area_sq_in: float
+    image_coverage: float  # fraction of the page covered by embedded images, 0..1
+
+
+def analyze_pages(pdf_path: str) -> List[PageText]:
+    """Text layer and image coverage of every page, in order."""
+    import pdfplumber
+
+    with pdfplumber.open(pdf_path) as pdf:
+        pages = []
+        for number, page in enumerate(pdf.pages, 1):
+            text = page.extract_text() or ""
+            area = float(page.width * page.height) or 1.0
+            covered = 0.0
+            for image in page.images:
+                # Clip to the page; overlapping images are counted twice, hence the cap below
+                width = min(image["x1"], page.width) - max(image["x0"], 0)
+                height = min(image["bottom"], page.height) - max(image["top"], 0)
+                covered += max(width, 0) * max(height, 0)
+            pages.append(PageText(
+                number=number,
+                text=text,
+                chars=len("".join(text.split())),
+                area_sq_in=area / 72 ** 2,
+                image_coverage=min(covered / area, 1.0),
+            ))
+            page.flush_cache()
+        return pages
+
+
+# JPEG buffer reused for every page a worker process renders (one per thread when running inline)
+_page_buffers = threading.local()
+
+
+def render_page(pdf_path: str, page_number: int, dpi: int) -> str:
+    """Rasterizes one page (1-based) and returns it as a base64 JPEG."""
+    from pdf2image import convert_from_path
+
+    buffer = getattr(_page_buffers, "jpeg", None)
+    if buffer is None:
+        buffer = _page_buffers.jpeg = BytesIO()
+    image = convert_from_path(pdf_path, dpi=dpi, first_page=page_number, last_page=page_number)[0]
+    try:
+        return encode_image(image, buffer)
+    finally:
+        image.close()
+
+
+class ExtractionPool:
+    """
+    Lazily started process pool for the CPU-bound extraction tasks above. At most
+    `workers` tasks are submitted at a time, so a submitted task starts right away
+    and `timeout` covers its run time, not its wait for a free worker. Tasks
+    that exceed `timeout` raise TimeoutError; since a running task can't be
+    cancelled, the pool is then torn down (its workers killed) and recreated on
+    next use. Tasks that were running in a pool torn down that way, or whose
+    worker died, are retried once on the fresh pool before BrokenProcessPool is raised.
+    """
+
+    def __init__(self, workers: int = EXTRACT_WORKERS, max_tasks_per_child: int = EXTRACT_MAX_TASKS_PER_CHILD,
+                 timeout: float = EXTRACT_TASK_TIMEOUT):
+        self.workers = workers
+        self.max_tasks_per_child = max_tasks_per_child
+        self.timeout = timeout
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        # Callers beyond the worker count wait here, untimed, instead of in the pool's queue
+        self._slots = threading.BoundedSemaphore(max(workers, 1))
+
+    def run(self, fn: Callable, *args):
+        """Runs `fn(*args)` in a worker process (inline when workers is 0) and returns its result."""
+        if self.workers <= 0:
+            return fn(*args)
+        with self._slots:
+            for attempt in range(2):
+                pool = self._get_pool()
+                try:
+                    return pool.submit(fn, *args).result(timeout=self.timeout)
+                except TimeoutError:
+                    self._reset(pool)
+                    raise TimeoutError(f"{fn.__name__} timed out after {self.timeout:.0f}s")
+                except BrokenProcessPool:
+                    # Another task timed out or a worker died (e.g. OOM-killed); start a fresh pool
+                    self._reset(pool)
+                    if attempt:
+                        raise
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True, cancel_futures=True)
+                self._pool = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # spawn: forking a process that runs threads and an event loop is unsafe,
+                # and max_tasks_per_child needs a non-fork context anyway
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    max_tasks_per_child=self.max_tasks_per_child or None,
+                )
+            return self._pool
+
+    def _reset(self, pool: ProcessPoolExecutor):
+        with self._lock:
+            if self._pool is not pool:
+                return  # already replaced by another thread
+            self._pool = None
+        for process in list((pool._processes or {}).values()):
+            process.terminate()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+# Shared pool used by text_processors; shut down in main.py's lifespan
+extraction_pool = ExtractionPool()
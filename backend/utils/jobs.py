@@ -0,0 +1,255 @@
+import asyncio
+import os
+import uuid
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Optional
+from fastapi.concurrency import run_in_threadpool
+from database import SessionLocal
+from models import orm_models
+from models.data_models import JobStage, JobStatus
+from utils.pipeline import STAGES, PipelineError, run_ingest
+from utils.telemetry import logger, request_id_var
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "20"))
+JOB_HISTORY = int(os.getenv("JOB_HISTORY", "1000"))
+JOB_PERSIST = os.getenv("JOB_PERSIST", "false").lower() in ("1", "true", "yes")
+
+
+class QueueFull(Exception):
+    """Raised by JobQueue.submit when the queue is at capacity."""
+
+
+class JobQueue:
+    """
+    In-process ingestion queue. Uploads are enqueued and a bounded pool of
+    asyncio workers runs the blocking pipeline in the threadpool, so the event
+    loop stays free. With `persist` enabled every state change is mirrored to
+    the `ingest_jobs` table and unfinished jobs are re-queued on startup; those
+    beyond the queue's capacity wait in a backlog and are queued as slots free,
+    ahead of new uploads.
+    """
+
+    def __init__(self, workers: int = JOB_WORKERS, maxsize: int = JOB_QUEUE_SIZE,
+                 persist: bool = JOB_PERSIST, history: int = JOB_HISTORY):
+        self.workers = workers
+        self.maxsize = maxsize
+        self.persist = persist
+        self.history = history
+        self.jobs: "OrderedDict[str, JobStatus]" = OrderedDict()
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks = []
+        self._reserved = 0  # queue slots held by submits still writing their ingest_jobs row
+        self._backlog: "deque[str]" = deque()  # re-queued jobs waiting for a queue slot
+
+    async def start(self):
+        self._queue = asyncio.Queue(maxsize=self.maxsize)
+        if self.persist:
+            jobs = await run_in_threadpool(self._load_unfinished)
+            for job in jobs:
+                self.jobs[job.job_id] = job
+                if self._queue.full():
+                    self._backlog.append(job.job_id)
+                else:
+                    self._queue.put_nowait(job.job_id)
+            if jobs:
+                logger.info("Re-queued %d unfinished jobs, %d waiting for a queue slot",
+                            len(jobs), len(self._backlog))
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, file_path: str, filename: str, use_cache: bool = True,
+                     file_hash: Optional[str] = None) -> JobStatus:
+        if self._queue is None:
+            raise RuntimeError("Job queue is not running")
+        if self.queued() >= self.maxsize:
+            raise QueueFull()
+
+        now = datetime.now()
+        job = JobStatus(
+            job_id=uuid.uuid4().hex,
+            filename=filename,
+            file_path=file_path,
+            file_hash=file_hash,
+            use_cache=use_cache,
+            request_id=request_id_var.get(),
+            stages=[JobStage(name=stage) for stage in STAGES],
+            created_at=now,
+            updated_at=now,
+        )
+        self.jobs[job.job_id] = job
+        self._trim_history()
+        # The row is written before the job is queued, so a worker's updates can't be overwritten
+        self._reserved += 1
+        try:
+            await run_in_threadpool(self._save, job)
+        except Exception:
+            del self.jobs[job.job_id]
+            raise
+        finally:
+            self._reserved -= 1
+        self._queue.put_nowait(job.job_id)
+        return job
+
+    def get(self, job_id: str) -> Optional[JobStatus]:
+        job = self.jobs.get(job_id)
+        if job is None and self.persist:
+            job = self._load(job_id)
+        return job
+
+    def queued(self) -> int:
+        return self._queue.qsize() + self._reserved + len(self._backlog) if self._queue else 0
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            # The slot just freed goes to the backlog first; submit refuses new jobs until it's empty
+            if self._backlog:
+                self._queue.put_nowait(self._backlog.popleft())
+            try:
+                job = self.jobs.get(job_id)
+                if job is not None:
+                    await self._run(job)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: JobStatus):
+        job.status = "running"
+        # Pipeline logs carry the id of the upload request that queued the job
+        token = request_id_var.set(job.request_id or job.job_id)
+        try:
+            result = await run_in_threadpool(run_ingest, job.file_path,
+                                             lambda stage: self._enter_stage(job, stage), job.use_cache,
+                                             job.file_hash)
+        except PipelineError as e:
+            self._fail(job, e.stage, str(e))
+        except Exception as e:
+            self._fail(job, self._current_stage(job), str(e))
+        else:
+            self._finish_stage(job, "done")
+            job.status = "done"
+            job.session_id = result["session_id"]
+            job.updated_at = datetime.now()
+        finally:
+            request_id_var.reset(token)
+        await run_in_threadpool(self._save, job)
+
+    def _current_stage(self, job: JobStatus) -> Optional[str]:
+        active = [stage.name for stage in job.stages if stage.status in ("running", "failed")]
+        return active[0] if active else None
+
+    def _enter_stage(self, job: JobStatus, name: str):
+        # Called from the pipeline's worker thread
+        self._finish_stage(job, "done")
+        now = datetime.now()
+        for stage in job.stages:
+            if stage.name == name:
+                stage.status = "running"
+                stage.started_at = now
+        job.updated_at = now
+        self._save(job)
+
+    def _finish_stage(self, job: JobStatus, status: str):
+        now = datetime.now()
+        for stage in job.stages:
+            if stage.status == "running":
+                stage.status = status
+                stage.finished_at = now
+
+    def _fail(self, job: JobStatus, stage_name: Optional[str], error: str):
+        logger.warning("Job %s failed at stage %s: %s", job.job_id, stage_name, error)
+        self._finish_stage(job, "failed")
+        job.status = "failed"
+        job.error = error
+        job.updated_at = datetime.now()
+
+    def _trim_history(self):
+        # Drop the oldest finished jobs once the in-memory history is full
+        for job_id in list(self.jobs):
+            if len(self.jobs) <= self.history:
+                break
+            if self.jobs[job_id].status in ("done", "failed"):
+                del self.jobs[job_id]
+
+    # ======= Durability (ingest_jobs table) =======
+
+    def _save(self, job: JobStatus):
+        if not self.persist:
+            return
+        db = SessionLocal()
+        try:
+            db.merge(orm_models.IngestJob(
+                job_id=job.job_id,
+                filename=job.filename,
+                file_path=job.file_path,
+                file_hash=job.file_hash,
+                use_cache=job.use_cache,
+                request_id=job.request_id,
+                status=job.status,
+                stage=self._current_stage(job),
+                session_id=job.session_id,
+                error=job.error,
+                created_at=job.created_at,
+                updated_at=job.updated_at,
+            ))
+            db.commit()
+        finally:
+            db.close()
+
+    def _load(self, job_id: str) -> Optional[JobStatus]:
+        db = SessionLocal()
+        try:
+            row = db.get(orm_models.IngestJob, job_id)
+            return self._from_row(row) if row else None
+        finally:
+            db.close()
+
+    def _load_unfinished(self):
+        db = SessionLocal()
+        try:
+            rows = (db.query(orm_models.IngestJob)
+                    .filter(orm_models.IngestJob.status.in_(["queued", "running"]))
+                    .order_by(orm_models.IngestJob.created_at)
+                    .all())
+            jobs = [self._from_row(row) for row in rows]
+        finally:
+            db.close()
+        # Interrupted jobs restart from the beginning of the pipeline
+        for job in jobs:
+            job.status = "queued"
+            job.stages = [JobStage(name=stage) for stage in STAGES]
+        return jobs
+
+    def _from_row(self, row: orm_models.IngestJob) -> JobStatus:
+        stages = [JobStage(name=name) for name in STAGES]
+        if row.status == "done":
+            for stage in stages:
+                stage.status = "done"
+        elif row.stage in STAGES:
+            current = STAGES.index(row.stage)
+            for stage in stages[:current]:
+                stage.status = "done"
+            stages[current].status = "failed" if row.status == "failed" else "running"
+        return JobStatus(
+            job_id=row.job_id,
+            filename=row.filename,
+            file_path=row.file_path,
+            file_hash=row.file_hash,
+            use_cache=row.use_cache,
+            request_id=row.request_id,
+            status=row.status,
+            stages=stages,
+            session_id=row.session_id,
+            error=row.error,
+            created_at=row.created_at,
+            updated_at=row.updated_at,
+        )
+
+# Shared queue used by the upload and jobs routers; started in main.py's lifespan
+ingest_queue = JobQueue()
@@ -0,0 +1,187 @@
+import os
+import re
+from typing import Dict, Optional, Tuple
+from sqlalchemy import and_, or_, update
+from sqlalchemy.orm import Session
+from database import SessionLocal
+from models import orm_models
+from utils.canonical import CanonicalIndex, canonical_index
+
+# Rows normalized per transaction by the backfill
+NORMALIZE_BATCH = int(os.getenv("NORMALIZE_BATCH", "1000"))
+
+_NUMBER = r"(\d+(?:[.,]\d+)?)"
+# "70-110", "3,5 - 5,1", "< 200", "> 40", "≤5", "έως 5"; Greek reports use decimal commas
+_RANGE = re.compile(rf"^\s*(?:(?P<op>[<>≤≥]=?|έως|up to)\s*{_NUMBER}|{_NUMBER}\s*[-–—]\s*{_NUMBER})")
+_UPPER_BOUND = {"<", "<=", "≤", "έως", "up to"}
+
+# Spellings seen on reports -> one spelling per unit (keys are lower-cased, without spaces, µ for micro)
+UNIT_SPELLINGS = {
+    "g/dl": "g/dL", "g/l": "g/L", "mg/dl": "mg/dL", "mg%": "mg/dL", "mg/l": "mg/L",
+    "µg/dl": "µg/dL", "µg/l": "µg/L", "ng/ml": "ng/mL", "ng/dl": "ng/dL", "pg/ml": "pg/mL",
+    "mmol/l": "mmol/L", "µmol/l": "µmol/L", "nmol/l": "nmol/L", "pmol/l": "pmol/L",
+    "u/l": "U/L", "iu/l": "U/L", "µiu/ml": "mIU/L", "miu/l": "mIU/L", "µu/ml": "mIU/L",
+    "fl": "fL", "pg": "pg", "%": "%",
+    # Cell counts: 10^9/L and 10^3/µL are the same quantity
+    "10^3/µl": "10^3/µL", "x10^3/µl": "10^3/µL", "10³/µl": "10^3/µL", "k/µl": "10^3/µL", "10^9/l": "10^3/µL",
+    "10^6/µl": "10^6/µL", "x10^6/µl": "10^6/µL", "10⁶/µl": "10^6/µL", "m/µl": "10^6/µL", "10^12/l": "10^6/µL",
+}
+
+# Concentration units in grams or moles per litre, for converting within and across the two families
+MASS_PER_LITRE = {"g/dL": 10.0, "g/L": 1.0, "mg/dL": 1e-2, "mg/L": 1e-3, "µg/dL": 1e-5, "µg/L": 1e-6,
+                  "ng/mL": 1e-6, "ng/dL": 1e-8, "pg/mL": 1e-9}
+MOLES_PER_LITRE = {"mmol/L": 1e-3, "µmol/L": 1e-6, "nmol/L": 1e-9, "pmol/L": 1e-12}
+
+# Canonical test -> (unit values are stored in, molar mass in g/mol for mass <-> molar conversion)
+ANALYTE_UNITS: Dict[str, Tuple[str, Optional[float]]] = {
+    "Glucose": ("mg/dL", 180.16),
+    "Total Cholesterol": ("mg/dL", 386.65),
+    "HDL": ("mg/dL", 386.65),
+    "LDL": ("mg/dL", 386.65),
+    "Triglycerides": ("mg/dL", 885.7),
+    "Creatinine": ("mg/dL", 113.12),
+    "Urea": ("mg/dL", 60.06),
+    "Uric Acid": ("mg/dL", 168.11),
+    "Calcium": ("mg/dL", 40.08),
+    "Iron": ("µg/dL", 55.85),
+    "Total Bilirubin": ("mg/dL", 584.66),
+    "Vitamin D": ("ng/mL", 400.64),
+    "Vitamin B12": ("pg/mL", 1355.37),
+    "Hemoglobin": ("g/dL", None),
+    "Ferritin": ("ng/mL", None),
+    "HbA1c": ("%", None),
+    "TSH": ("mIU/L", None),
+}
+
+
+def parse_range(normal_range: Optional[str]) -> Tuple[Optional[float], Optional[float]]:
+    """(low, high) bounds of a reference range string; either is None when open-ended or unparsed."""
+    match = _RANGE.match((normal_range or "").lower())
+    if not match:
+        return None, None
+    op, bound, low, high = (part.replace(",", ".") if part else part for part in match.groups())
+    if op is None:
+        return float(low), float(high)
+    return (None, float(bound)) if op in _UPPER_BOUND else (float(bound), None)
+
+
+def normalize_unit(unit: Optional[str]) -> Optional[str]:
+    """The standard spelling of a unit ("mg/dl", "MG/DL", "mg %" -> "mg/dL"); unknown units are returned stripped."""
+    if unit is None or not unit.strip():
+        return None
+    key = re.sub(r"\s+", "", unit).lower().replace("μ", "µ").replace("mcg", "µg")
+    key = re.sub(r"^u(?=[gm]|iu|u/)", "µ", key)  # "ug/dl", "umol/l", "uiu/ml"
+    return UNIT_SPELLINGS.get(key, unit.strip())
+
+
+def convert(value: float, unit: str, target: str, molar_mass: Optional[float] = None) -> Optional[float]:
+    """`value` in `unit` expressed in `target`, or None when the units can't be converted."""
+    if unit == target:
+        return value
+    if unit in MASS_PER_LITRE and target in MASS_PER_LITRE:
+        return value * MASS_PER_LITRE[unit] / MASS_PER_LITRE[target]
+    if unit in MOLES_PER_LITRE and target in MOLES_PER_LITRE:
+        return value * MOLES_PER_LITRE[unit] / MOLES_PER_LITRE[target]
+    if molar_mass and unit in MOLES_PER_LITRE and target in MASS_PER_LITRE:
+        return value * MOLES_PER_LITRE[unit] * molar_mass / MASS_PER_LITRE[target]
+    if molar_mass and unit in MASS_PER_LITRE and target in MOLES_PER_LITRE:
+        return value * MASS_PER_LITRE[unit] / molar_mass / MOLES_PER_LITRE[target]
+    return None
+
+
+def analyte_units(index: CanonicalIndex = canonical_index) -> Dict[int, Tuple[str, Optional[float]]]:
+    """ANALYTE_UNITS keyed by canonical id, for the analytes the index knows."""
+    units = {}
+    for name, spec in ANALYTE_UNITS.items():
+        canonical_id = index.lookup(name)
+        if canonical_id is not None:
+            units[canonical_id] = spec
+    return units
+
+
+def normalized_columns(value: Optional[float], unit: Optional[str], normal_range: Optional[str],
+                       analyte: Optional[Tuple[str, Optional[float]]] = None) -> dict:
+    """
+    The derived blood_tests columns for one result. Range bounds stay in the
+    reported unit (the one `value` is in) so `is_out_of_range` compares like
+    with like; `value_canonical`/`unit_canonical` hold the value in the
+    analyte's standard unit, or in the reported unit when there is no conversion.
+    """
+    low, high = parse_range(normal_range)
+    unit = normalize_unit(unit)
+    out_of_range = None
+    if value is not None and (low is not None or high is not None):
+        out_of_range = (low is not None and value < low) or (high is not None and value > high)
+
+    value_canonical, unit_canonical = value, unit
+    if value is not None and analyte is not None and unit is not None:
+        converted = convert(value, unit, analyte[0], analyte[1])
+        if converted is not None:
+            value_canonical, unit_canonical = round(converted, 6), analyte[0]
+    return {
+        "range_low": low,
+        "range_high": high,
+        "value_canonical": value_canonical,
+        "unit_canonical": unit_canonical,
+        "is_out_of_range": out_of_range,
+    }
+
+
+def backfill_normalized(db: Session, index: CanonicalIndex = canonical_index,
+                        batch_size: int = NORMALIZE_BATCH, only_missing: bool = True) -> int:
+    """
+    Fills the normalized columns of existing rows in test_id order, `batch_size`
+    rows per transaction, so a large table is never locked or loaded at once.
+    With `only_missing` only rows with a value, unit or range whose derived
+    column is still empty are read. Either way only rows whose derived columns
+    change are written, and the versions of their sessions are bumped in the
+    same transactions so their ETags change; re-running is a no-op. Returns the
+    number of rows updated.
+    """
+    BloodTest, TestSession = orm_models.BloodTest, orm_models.TestSession
+    units = analyte_units(index)
+    derived = ("range_low", "range_high", "value_canonical", "unit_canonical", "is_out_of_range")
+    updated, last_id = 0, 0
+    while True:
+        query = (db.query(BloodTest.test_id, BloodTest.session_id, BloodTest.canonical_id, BloodTest.value,
+                          BloodTest.unit, BloodTest.normal_range, *(getattr(BloodTest, name) for name in derived))
+                 .filter(BloodTest.test_id > last_id))
+        if only_missing:
+            query = query.filter(or_(
+                and_(BloodTest.value.is_not(None), BloodTest.value_canonical.is_(None)),
+                and_(BloodTest.unit.is_not(None), BloodTest.unit_canonical.is_(None)),
+                and_(BloodTest.normal_range.is_not(None), BloodTest.range_low.is_(None),
+                     BloodTest.range_high.is_(None)),
+            ))
+        rows = query.order_by(BloodTest.test_id).limit(batch_size).all()
+        if not rows:
+            break
+        last_id = rows[-1].test_id
+        # Rows that stay unfilled (no value, unparseable range, blank unit) match the filter
+        # above on every run; they are only written when something would change
+        changes = []
+        for row in rows:
+            columns = normalized_columns(row.value, row.unit, row.normal_range, units.get(row.canonical_id))
+            if any(columns[name] != getattr(row, name) for name in derived):
+                changes.append((row.session_id, {"test_id": row.test_id, **columns}))
+        if not changes:
+            continue
+        db.execute(update(BloodTest), [values for _, values in changes])
+        db.execute(update(TestSession)
+                   .where(TestSession.session_id.in_({session_id for session_id, _ in changes}))
+                   .values(version=TestSession.version + 1))
+        db.commit()
+        updated += len(changes)
+    return updated
+
+if __name__ == "__main__":
+    # Backfill for rows stored before normalization: `python -m utils.normalization [--all]`
+    import sys
+
+    db = SessionLocal()
+    try:
+        canonical_index.load(db)
+        count = backfill_normalized(db, only_missing="--all" not in sys.argv[1:])
+        print(f"Normalized {count} rows")
+    finally:
+        db.close()
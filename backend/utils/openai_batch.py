@@ -0,0 +1,287 @@
+import json
+import os
+import time
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Tuple
+from openai import OpenAI
+from openai.lib import type_to_response_format_param
+from sqlalchemy.orm import Session
+from database import SessionLocal
+from models import orm_models
+from models.data_models import BloodTestResults
+from utils.cache import extraction_cache
+from utils.persistence import persist_results
+from utils.compaction import compact_text
+from utils.templates import template_registry
+from utils.telemetry import logger
+from utils.text_processors import (
+    STRUCTURING_MODEL, STRUCTURING_PROMPT_CACHE_KEY, STRUCTURING_SYSTEM_PROMPT, merge_results, standardize_date,
+    structuring_messages,
+)
+
+BATCH_DIR = os.getenv("OPENAI_BATCH_DIR", "responses/batches")
+BATCH_POLL_SECONDS = float(os.getenv("OPENAI_BATCH_POLL_SECONDS", "60"))
+BATCH_COMPLETION_WINDOW = "24h"
+
+# Batch statuses after which polling stops
+TERMINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+
+def structuring_request(custom_id: str, content: str) -> dict:
+    """
+    One Batch API line: the same prompt and BloodTestResults schema as
+    process_pdf_with_openai, with `content` (one of structuring_messages) as the user message.
+    """
+    request = {
+        "custom_id": custom_id,
+        "method": "POST",
+        "url": "/v1/chat/completions",
+        "body": {
+            "model": STRUCTURING_MODEL,
+            "messages": [
+                {"role": "system", "content": STRUCTURING_SYSTEM_PROMPT},
+                {"role": "user", "content": content},
+            ],
+            # The strict json_schema format client.beta.chat.completions.parse sends for the model
+            "response_format": type_to_response_format_param(BloodTestResults),
+        },
+    }
+    if STRUCTURING_PROMPT_CACHE_KEY:
+        request["body"]["prompt_cache_key"] = STRUCTURING_PROMPT_CACHE_KEY
+    return request
+
+
+def find_persisted_session(db: Session, structured_data: BloodTestResults, exclude=()) -> Optional[int]:
+    """
+    The id of a stored session holding exactly this report (same patient, date, lab
+    and tests in order), skipping the ids in `exclude`; None if there is none.
+    """
+    metadata = structured_data.personal_info
+    test_date = datetime.strptime(standardize_date(metadata.test_date), "%d-%m-%Y")
+    expected = [(test.test_name, test.value) for test in structured_data.test_results]
+    candidates = (
+        db.query(orm_models.TestSession)
+        .join(orm_models.User)
+        .filter(orm_models.User.name == metadata.name,
+                orm_models.TestSession.test_date == test_date,
+                orm_models.TestSession.location.is_(None) if metadata.location is None
+                else orm_models.TestSession.location == metadata.location)
+        .order_by(orm_models.TestSession.session_id.desc())
+    )
+    for session in candidates:
+        if session.session_id not in exclude and \
+                [(test.test_name, test.value) for test in session.blood_tests] == expected:
+            return session.session_id
+    return None
+
+
+class BatchStructuringJob:
+    """
+    Structures many raw texts through the OpenAI Batch API (half price, no
+    interactive rate limits) and persists the results through the normal ORM path.
+    As in the pipeline, documents a lab template parses skip the LLM, and long
+    reports are compacted and sent as several chunk requests (`<id>#<part>`)
+    whose results are merged once all of them are back.
+
+    Every step records its outcome in `<BATCH_DIR>/<name>/state.json` before moving
+    on, so re-running a job after a crash resumes where it stopped: the input file
+    is not re-uploaded, the batch is not resubmitted and reports that were already
+    persisted are not stored twice (a report marked `persisting` when the run stopped
+    is looked up in the database before it is stored).
+    """
+
+    def __init__(self, name: str, client: OpenAI, root: str = BATCH_DIR):
+        self.name = name
+        self.client = client
+        self.directory = os.path.join(root, name)
+        self.state_path = os.path.join(self.directory, "state.json")
+        self.requests_path = os.path.join(self.directory, "requests.jsonl")
+        self.state = self._load_state()
+
+    def run(self, documents: Iterable[Tuple[str, str, Optional[str]]], wait: bool = True,
+            poll_seconds: float = BATCH_POLL_SECONDS) -> dict:
+        """
+        Runs (or resumes) the job for (custom_id, raw_text, pdf_path) documents; the
+        path is passed to the lab templates and may be None. With `wait` disabled it
+        returns right after submitting; run again later to collect. Returns the job state.
+        """
+        self.prepare(documents)
+        self.submit()
+        if not wait and self.state["status"] not in TERMINAL_STATUSES:
+            return self.state
+        self.wait(poll_seconds)
+        self.collect()
+        return self.state
+
+    def prepare(self, documents: Iterable[Tuple[str, str, Optional[str]]]):
+        if self.state["status"] != "new":
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        items, requests = {}, 0
+        with open(self.requests_path, "w", encoding="utf-8") as f:
+            for custom_id, raw_text, pdf_path in documents:
+                if custom_id in items:
+                    continue
+                item = items[custom_id] = {
+                    "results_key": extraction_cache.structured_key(raw_text, STRUCTURING_MODEL,
+                                                                   STRUCTURING_SYSTEM_PROMPT),
+                    "status": "pending",
+                    "session_id": None,
+                    "error": None,
+                    "parts": 0,
+                }
+                structured_data = template_registry.parse(raw_text, pdf_path)
+                if structured_data is not None:
+                    # Kept in the state until persisted, since the raw text isn't
+                    item["template_result"] = structured_data.model_dump_json()
+                    continue
+                messages = structuring_messages(compact_text(raw_text).text)
+                item["parts"] = len(messages)
+                for part, content in enumerate(messages, 1):
+                    request_id = custom_id if len(messages) == 1 else f"{custom_id}#{part}"
+                    f.write(json.dumps(structuring_request(request_id, content), ensure_ascii=False) + "\n")
+                requests += len(messages)
+        self.state.update(status="prepared", items=items, requests=requests)
+        self._save_state()
+
+    def submit(self):
+        # Nothing to send: every document was parsed by a template (or there were none)
+        if not self.state.get("requests", len(self.state["items"])):
+            self.state["status"] = "completed"
+            self._save_state()
+            return
+        if self.state["input_file_id"] is None:
+            with open(self.requests_path, "rb") as f:
+                self.state["input_file_id"] = self.client.files.create(file=f, purpose="batch").id
+            self._save_state()
+        if self.state["batch_id"] is None:
+            batch = self.client.batches.create(
+                input_file_id=self.state["input_file_id"],
+                endpoint="/v1/chat/completions",
+                completion_window=BATCH_COMPLETION_WINDOW,
+                metadata={"job": self.name},
+            )
+            self.state.update(batch_id=batch.id, status=batch.status)
+            self._save_state()
+
+    def wait(self, poll_seconds: float = BATCH_POLL_SECONDS):
+        while self.state["status"] not in TERMINAL_STATUSES:
+            batch = self.client.batches.retrieve(self.state["batch_id"])
+            self.state.update(
+                status=batch.status,
+                output_file_id=batch.output_file_id,
+                error_file_id=batch.error_file_id,
+            )
+            self._save_state()
+            if batch.status in TERMINAL_STATUSES:
+                break
+            counts = batch.request_counts
+            if counts:
+                logger.info("Batch %s: %s (%d/%d done)", batch.id, batch.status, counts.completed, counts.total)
+            else:
+                logger.info("Batch %s: %s", batch.id, batch.status)
+            time.sleep(poll_seconds)
+
+    def collect(self):
+        """
+        Validates every output line against BloodTestResults, merges the chunks of
+        each report and persists every report (template-parsed ones included) once.
+        """
+        responses: Dict[str, Dict[int, BloodTestResults]] = {}
+        for file_id in (self.state.get("output_file_id"), self.state.get("error_file_id")):
+            if not file_id:
+                continue
+            for line in self.client.files.content(file_id).text.splitlines():
+                if line.strip():
+                    self._handle_output(json.loads(line), responses)
+
+        for custom_id, item in self.state["items"].items():
+            if item["status"] not in ("pending", "persisting"):
+                continue
+            if "template_result" in item:
+                self._persist(item, BloodTestResults.model_validate_json(item["template_result"]))
+                continue
+            parts = responses.get(custom_id, {})
+            if len(parts) == item.get("parts", 1):
+                ordered = [parts[part] for part in sorted(parts)]
+                structured_data = ordered[0] if len(ordered) == 1 else merge_results(ordered)
+                extraction_cache.put_results(item["results_key"], structured_data)
+                self._persist(item, structured_data)
+
+        # Requests the batch never answered (expired/cancelled/failed batch)
+        for item in self.state["items"].values():
+            if item["status"] == "pending" and self.state["status"] in TERMINAL_STATUSES:
+                item.update(status="failed", error=item["error"] or f"batch {self.state['status']}")
+        self._save_state()
+
+    def summary(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for item in self.state["items"].values():
+            counts[item["status"]] = counts.get(item["status"], 0) + 1
+        return counts
+
+    def _handle_output(self, line: dict, responses: Dict[str, Dict[int, BloodTestResults]]):
+        """Collects one output line's result into `responses`; a failed line fails its whole report."""
+        custom_id, _, part = (line.get("custom_id") or "").partition("#")
+        item = self.state["items"].get(custom_id)
+        if item is None or item["status"] in ("persisted", "failed"):
+            return
+        response = line.get("response") or {}
+        if line.get("error") or response.get("status_code") != 200:
+            error = line.get("error") or response.get("body", {}).get("error")
+            item.update(status="failed", error=json.dumps(error))
+            self._save_state()
+            return
+
+        try:
+            content = response["body"]["choices"][0]["message"]["content"]
+            structured_data = BloodTestResults.model_validate_json(content)
+        except Exception as e:
+            item.update(status="failed", error=f"invalid response: {e}")
+            self._save_state()
+            return
+        responses.setdefault(custom_id, {})[int(part or 1)] = structured_data
+
+    def _persist(self, item: dict, structured_data: BloodTestResults):
+        db = SessionLocal()
+        try:
+            session_id = None
+            if item["status"] == "persisting":
+                # A previous run stopped between the commit and saving the state
+                claimed = {other["session_id"] for other in self.state["items"].values() if other is not item}
+                session_id = find_persisted_session(db, structured_data, exclude=claimed)
+            if session_id is None:
+                # Marked before the commit, so a crash leaves a trace the next run checks first
+                item.update(status="persisting")
+                self._save_state()
+                session_id = persist_results(db, structured_data)
+            item.update(status="persisted", session_id=session_id, error=None)
+            item.pop("template_result", None)
+        except Exception as e:
+            item.update(status="failed", error=f"persist: {e}")
+        finally:
+            db.close()
+        self._save_state()
+
+    def _load_state(self) -> dict:
+        if os.path.exists(self.state_path):
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        return {
+            "name": self.name,
+            "status": "new",
+            "created_at": datetime.now().isoformat(),
+            "input_file_id": None,
+            "batch_id": None,
+            "output_file_id": None,
+            "error_file_id": None,
+            "items": {},
+        }
+
+    def _save_state(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self.state["updated_at"] = datetime.now().isoformat()
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp_path, self.state_path)
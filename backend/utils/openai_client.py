@@ -0,0 +1,146 @@
+import os
+import threading
+import time
+from typing import TYPE_CHECKING, Optional
+from settings import get_settings
+from utils.telemetry import logger
+
+if TYPE_CHECKING:
+    from openai import OpenAI
+
+# Shared HTTP client settings: keep-alive pool, HTTP/2 and timeouts
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL")  # e.g. a local stub server in tests
+OPENAI_HTTP2 = os.getenv("OPENAI_HTTP2", "true").lower() in ("1", "true", "yes")
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "20"))
+OPENAI_MAX_KEEPALIVE = int(os.getenv("OPENAI_MAX_KEEPALIVE", "10"))
+OPENAI_KEEPALIVE_EXPIRY = float(os.getenv("OPENAI_KEEPALIVE_EXPIRY", "60"))
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "120"))
+OPENAI_CONNECT_TIMEOUT = float(os.getenv("OPENAI_CONNECT_TIMEOUT", "10"))
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "2"))
+
+# Client-side rate limits; keep them a little under the account's limits (0 disables).
+# Requests are charged their estimated prompt tokens up front and the rest of the
+# reported usage once they finish, so TPM bounds the tokens actually used per minute
+# (a Vision page with ~1k output tokens uses ~2.1k, so ~14 pages a minute at the default)
+OPENAI_RPM = int(os.getenv("OPENAI_RPM", "500"))
+OPENAI_TPM = int(os.getenv("OPENAI_TPM", "30000"))
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token), good enough for rate limiting."""
+    return len(text) // 4 + 1
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at `per_minute` units per minute."""
+
+    def __init__(self, per_minute: int):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.tokens = float(per_minute)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, amount: float = 1):
+        """Blocks until `amount` units are available, then takes them."""
+        if self.capacity <= 0:
+            return
+        # A single request larger than the bucket would never fit; let it through once the bucket is full
+        amount = min(amount, self.capacity)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                wait = (amount - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def charge(self, amount: float):
+        """Takes `amount` units without waiting (a negative amount refunds); later acquires wait off any debt."""
+        if self.capacity <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate - amount)
+            self.updated = now
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute buckets shared by every OpenAI call."""
+
+    def __init__(self, rpm: int = OPENAI_RPM, tpm: int = OPENAI_TPM):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+
+    def wait(self, tokens: int):
+        """Call before each request with its estimated prompt tokens."""
+        self.requests.acquire(1)
+        self.tokens.acquire(tokens)
+
+    def reconcile(self, estimated: int, usage):
+        """Call after a request with the estimate passed to `wait` and the response's `usage`."""
+        if usage is not None:
+            self.tokens.charge(usage.total_tokens - estimated)
+
+
+rate_limiter = RateLimiter()
+
+_client: Optional["OpenAI"] = None
+_client_lock = threading.Lock()
+
+
+def _http2_available() -> bool:
+    if not OPENAI_HTTP2:
+        return False
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        logger.warning("h2 is not installed; the OpenAI client falls back to HTTP/1.1")
+        return False
+
+
+def init_openai_client(api_key: Optional[str] = None) -> "OpenAI":
+    """
+    Creates the process-wide OpenAI client (one httpx connection pool, reused for
+    every page and document). Safe to call again. The openai SDK is imported here,
+    on the first call that needs OpenAI, so the API process starts without it.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            import httpx
+            from openai import OpenAI
+
+            http_client = httpx.Client(
+                http2=_http2_available(),
+                limits=httpx.Limits(
+                    max_connections=OPENAI_MAX_CONNECTIONS,
+                    max_keepalive_connections=OPENAI_MAX_KEEPALIVE,
+                    keepalive_expiry=OPENAI_KEEPALIVE_EXPIRY,
+                ),
+                timeout=httpx.Timeout(OPENAI_TIMEOUT, connect=OPENAI_CONNECT_TIMEOUT),
+            )
+            _client = OpenAI(
+                api_key=api_key or get_settings().openai_api_key,
+                base_url=OPENAI_BASE_URL,
+                max_retries=OPENAI_MAX_RETRIES,
+                http_client=http_client,
+            )
+    return _client
+
+
+def get_openai_client(api_key: Optional[str] = None) -> "OpenAI":
+    """Returns the shared client, creating it on first use."""
+    return _client or init_openai_client(api_key)
+
+
+def close_openai_client():
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
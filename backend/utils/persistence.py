@@ -0,0 +1,86 @@
+from datetime import datetime
+from typing import Dict, List
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from models import orm_models
+from models.data_models import BloodTestResults
+from utils.text_processors import standardize_date
+from utils.canonical import canonical_index
+from utils.analytics import analytics_cache
+from utils.normalization import analyte_units, normalized_columns
+
+
+def _get_or_create_user(db: Session, metadata, users: Dict[str, orm_models.User]) -> orm_models.User:
+    user = users.get(metadata.name)
+    if user is None:
+        user = db.query(orm_models.User).filter(orm_models.User.name == metadata.name).first()
+    if user is None:
+        user = orm_models.User(name=metadata.name, height=metadata.height)
+        db.add(user)
+        db.flush()  # assigns user_id without committing
+    users[metadata.name] = user
+    return user
+
+
+def _add_report(db: Session, structured_data: BloodTestResults, users: Dict[str, orm_models.User],
+                canonical_ids: Dict[str, int], units: Dict[int, tuple]) -> int:
+    metadata = structured_data.personal_info
+    user = _get_or_create_user(db, metadata, users)
+
+    standardized_date_string = standardize_date(metadata.test_date)
+    session = orm_models.TestSession(
+        user_id=user.user_id,
+        test_date=datetime.strptime(standardized_date_string, "%d-%m-%Y"),
+        location=metadata.location,
+        weight=metadata.weight
+    )
+    db.add(session)
+    db.flush()
+
+    rows = [
+        {
+            "session_id": session.session_id,
+            "test_name": test.test_name,
+            "value": test.value,
+            "unit": test.unit,
+            "normal_range": test.normal_range,
+            "canonical_id": canonical_ids.get(test.test_name),
+            **normalized_columns(test.value, test.unit, test.normal_range,
+                                 units.get(canonical_ids.get(test.test_name))),
+        }
+        for test in structured_data.test_results
+    ]
+    if rows:
+        # One executemany INSERT for all rows instead of an ORM object per row
+        db.execute(insert(orm_models.BloodTest), rows)
+    return session.session_id
+
+
+def persist_results(db: Session, structured_data: BloodTestResults) -> int:
+    """
+    Stores parsed results as a new test session in a single transaction:
+    user lookup-or-create, the session and all of its test rows.
+    Returns the new session id; nothing is written if any step fails.
+    """
+    return persist_many(db, [structured_data])[0]
+
+
+def persist_many(db: Session, reports: List[BloodTestResults]) -> List[int]:
+    """
+    Stores many parsed reports (e.g. a backfill) in a single transaction and
+    returns their session ids in input order.
+    """
+    # Resolved (and any new canonical tests committed) before the report transaction opens
+    canonical_ids = canonical_index.resolve_many(
+        test.test_name for report in reports for test in report.test_results
+    )
+    units = analyte_units()
+    users: Dict[str, orm_models.User] = {}
+    try:
+        session_ids = [_add_report(db, report, users, canonical_ids, units) for report in reports]
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    analytics_cache.invalidate(*(user.user_id for user in users.values()))
+    return session_ids
@@ -0,0 +1,96 @@
+from typing import Callable, Optional
+from database import SessionLocal
+from models.data_models import BloodTestResults
+from utils.text_processors import (extract_text_from_pdf, process_pdf_with_openai,
+                                   STRUCTURING_MODEL, STRUCTURING_SYSTEM_PROMPT)
+from utils.persistence import persist_results
+from utils.cache import extraction_cache, hash_file
+from utils.templates import template_registry
+from utils.telemetry import span
+from settings import get_settings
+import time
+
+# Ordered stages of the ingestion pipeline, reported through the job status endpoint
+STAGES = ["extract", "structure", "persist"]
+
+
+class PipelineError(Exception):
+    """Raised when a pipeline stage fails; `stage` names the stage that failed."""
+
+    def __init__(self, stage: str, message: str):
+        super().__init__(message)
+        self.stage = stage
+
+
+def extract_raw_text(file_path: str, use_cache: bool = True, file_hash: Optional[str] = None) -> str:
+    """Extract stage: raw text of a PDF, looked up in / stored to the extraction cache."""
+    file_hash = file_hash or hash_file(file_path)
+    raw_text = extraction_cache.get_text(file_hash) if use_cache else None
+    if raw_text is None:
+        with span("extract"):
+            # Text-layer PDFs never call OpenAI, so the key is only needed for OCR'd pages
+            raw_text = extract_text_from_pdf(file_path, get_settings().openai_api_key)
+        if not raw_text:
+            raise PipelineError("extract", "Failed to extract text")
+        extraction_cache.put_text(file_hash, raw_text)
+    return raw_text
+
+
+def structure_raw_text(raw_text: str, use_cache: bool = True) -> BloodTestResults:
+    """Structure stage: parsed results for raw text, looked up in / stored to the extraction cache."""
+    results_key = extraction_cache.structured_key(raw_text, STRUCTURING_MODEL, STRUCTURING_SYSTEM_PROMPT)
+    structured_data = extraction_cache.get_results(results_key) if use_cache else None
+    if structured_data is None:
+        api_key = get_settings().openai_api_key
+        if not api_key:
+            raise PipelineError("structure", "OPENAI_API_KEY is not set")
+        started = time.perf_counter()
+        structured_data = process_pdf_with_openai(raw_text, api_key)
+        template_registry.record_llm(time.perf_counter() - started)
+        if not structured_data:
+            raise PipelineError("structure", "LLM failed")
+        extraction_cache.put_results(results_key, structured_data)
+    return structured_data
+
+
+def extract_and_structure(file_path: str, on_stage: Optional[Callable[[str], None]] = None,
+                          use_cache: bool = True, file_hash: Optional[str] = None) -> BloodTestResults:
+    """
+    Runs the extract and structure stages for a PDF and returns the parsed results.
+    Known lab layouts are parsed by a lab template; only documents no template
+    handles go to the LLM. Pass `file_hash` if it is already known.
+    """
+    if on_stage:
+        on_stage("extract")
+    raw_text = extract_raw_text(file_path, use_cache, file_hash)
+    if on_stage:
+        on_stage("structure")
+    with span("template"):
+        structured_data = template_registry.parse(raw_text, file_path)
+    if structured_data is not None:
+        return structured_data
+    return structure_raw_text(raw_text, use_cache)
+
+
+def run_ingest(file_path: str, on_stage: Optional[Callable[[str], None]] = None,
+               use_cache: bool = True, file_hash: Optional[str] = None) -> dict:
+    """
+    Runs the extract -> structure -> persist pipeline for an uploaded PDF.
+    Blocking; meant to be called from a worker thread, never from the event loop.
+    `on_stage` is called with the stage name before each stage starts; `file_hash`
+    is the SHA-256 computed while the upload was written, if known.
+    """
+    structured_data = extract_and_structure(file_path, on_stage, use_cache, file_hash)
+
+    if on_stage:
+        on_stage("persist")
+    db = SessionLocal()
+    try:
+        with span("persist"):
+            session_id = persist_results(db, structured_data)
+    except Exception as e:
+        raise PipelineError("persist", str(e))
+    finally:
+        db.close()
+
+    return {"session_id": session_id, "structured_data": structured_data.model_dump()}
@@ -0,0 +1,162 @@
+import contextvars
+import logging
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Optional
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Histogram, generate_latest
+from sqlalchemy import event
+
+# Stage latencies range from sub-millisecond DB calls to minute-long LLM calls
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+
+STAGE_SECONDS = Histogram(
+    "bloodpanel_stage_seconds", "Duration of pipeline and upload stages", ["stage", "outcome"],
+    buckets=LATENCY_BUCKETS,
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "bloodpanel_http_request_seconds", "HTTP request duration", ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+DB_SECONDS = Histogram(
+    "bloodpanel_db_seconds", "Time spent in database statements per HTTP request", ["route"],
+    buckets=LATENCY_BUCKETS,
+)
+OPENAI_TOKENS = Counter(
+    "bloodpanel_openai_tokens_total", "OpenAI tokens used", ["operation", "model", "kind"],
+)
+OPENAI_REQUESTS = Counter(
+    "bloodpanel_openai_requests_total", "OpenAI API calls", ["operation", "model", "outcome"],
+)
+STRUCTURING_INPUT_TOKENS = Counter(
+    "bloodpanel_structuring_input_tokens_total", "Estimated tokens of report text sent for structuring", ["text"],
+)
+
+request_id_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("request_id", default=None)
+# Seconds spent in DB statements by the current request; None outside requests
+_db_time: contextvars.ContextVar[Optional[list]] = contextvars.ContextVar("db_time", default=None)
+
+logger = logging.getLogger("bloodpanel")
+
+
+class RequestIdFilter(logging.Filter):
+    """Adds the current request id (or "-") to every log record as `request_id`."""
+
+    def filter(self, record):
+        record.request_id = request_id_var.get() or "-"
+        return True
+
+
+def configure_logging(level: int = logging.INFO):
+    """Sets up the request-id aware handler; calling it again replaces the handler instead of adding one."""
+    handler = logging.StreamHandler()
+    handler.addFilter(RequestIdFilter())
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s"))
+    logger.handlers = [handler]
+    logger.setLevel(level)
+    logger.propagate = False
+
+
+@contextmanager
+def span(stage: str):
+    """Times a block into bloodpanel_stage_seconds{stage, outcome} and logs it with the request id."""
+    started = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.labels(stage, outcome).observe(elapsed)
+        logger.info("stage=%s outcome=%s seconds=%.3f", stage, outcome, elapsed)
+
+
+def record_usage(operation: str, model: str, response=None, outcome: str = "ok"):
+    """Counts an OpenAI call and, when the response carries usage, its prompt/completion tokens."""
+    OPENAI_REQUESTS.labels(operation, model, outcome).inc()
+    usage = getattr(response, "usage", None)
+    if usage is not None:
+        OPENAI_TOKENS.labels(operation, model, "prompt").inc(usage.prompt_tokens or 0)
+        OPENAI_TOKENS.labels(operation, model, "completion").inc(usage.completion_tokens or 0)
+        # Prompt tokens served from the provider's prompt cache (billed at a discount)
+        details = getattr(usage, "prompt_tokens_details", None)
+        OPENAI_TOKENS.labels(operation, model, "cached_prompt").inc(getattr(details, "cached_tokens", None) or 0)
+
+
+def record_compaction(raw_tokens: int, tokens: int):
+    """Counts a document's structuring input before (`raw`) and after (`compacted`) compaction."""
+    STRUCTURING_INPUT_TOKENS.labels("raw").inc(raw_tokens)
+    STRUCTURING_INPUT_TOKENS.labels("compacted").inc(tokens)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    timer = _db_time.get()
+    if timer is not None:
+        timer[0] += elapsed
+
+
+def instrument_engine(sync_engine):
+    """
+    Accumulates statement time into the current request's DB timer (pass
+    async_engine.sync_engine for async). Safe to call again for the same engine.
+    """
+    if not event.contains(sync_engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class TelemetryMiddleware:
+    """
+    ASGI middleware: assigns each request an id (honouring an incoming X-Request-ID),
+    echoes it in the response and records request duration and DB time. Plain ASGI
+    rather than BaseHTTPMiddleware to keep per-request overhead small.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope.get("headers", []):
+            if name == b"x-request-id":
+                request_id = value.decode("latin-1")[:64]
+                break
+        request_id = request_id or uuid.uuid4().hex
+        id_token = request_id_var.set(request_id)
+        timer = [0.0]
+        db_token = _db_time.set(timer)
+        status = {"code": 500}
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(b"x-request-id", request_id.encode("latin-1"))]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            # Label by route template, not raw path, to keep label cardinality bounded
+            route = getattr(scope.get("route"), "path", "unmatched")
+            HTTP_REQUEST_SECONDS.labels(scope["method"], route, str(status["code"])).observe(
+                time.perf_counter() - started)
+            DB_SECONDS.labels(route).observe(timer[0])
+            _db_time.reset(db_token)
+            request_id_var.reset(id_token)
+
+
+def metrics_response():
+    """Body and content type for the Prometheus scrape endpoint."""
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,217 @@
+import json
+import os
+import re
+import threading
+import time
+from typing import Dict, List, Optional
+from models.data_models import BloodTest, BloodTestResults, PersonalMetadata
+from utils.telemetry import logger
+
+LAB_TEMPLATE_DIR = os.getenv("LAB_TEMPLATE_DIR", os.path.join(os.path.dirname(__file__), "..", "lab_templates"))
+LAB_TEMPLATES_ENABLED = os.getenv("LAB_TEMPLATES_ENABLED", "true").lower() in ("1", "true", "yes")
+
+_NUMBER = re.compile(r"^-?(?:\d{1,3}(?:\.\d{3})+,\d+|\d+(?:[.,]\d+)?)$")
+_DIGIT = re.compile(r"\d")
+
+
+def parse_number(text: Optional[str]) -> Optional[float]:
+    """
+    Parses '4,5' / '4.5' / '1.234,5' style numbers; None if not numeric. Qualified
+    values ('<5', '>90') are not numbers either, so such rows go to the LLM.
+    """
+    if text is None:
+        return None
+    text = text.strip()
+    if not _NUMBER.match(text):
+        return None
+    if "," in text and "." in text:
+        text = text.replace(".", "").replace(",", ".")
+    return float(text.replace(",", "."))
+
+
+class LabTemplate:
+    """
+    Deterministic parser for one lab's report layout, loaded from a JSON file in
+    lab_templates/ (see the README there for the format).
+
+    A template applies when every `fingerprint` regex matches the raw text. Rows
+    come either from `row_pattern` (a regex with `name`, `value` and optional
+    `unit`/`range` groups, applied per line) or, with `"source": "tables"`, from
+    pdfplumber's `page.extract_tables()` using the `columns` index mapping.
+    """
+
+    def __init__(self, config: dict):
+        self.name = config["name"]
+        self.fingerprint = [re.compile(p, re.IGNORECASE | re.MULTILINE) for p in config["fingerprint"]]
+        self.source = config.get("source", "lines")
+        self.row_pattern = re.compile(config["row_pattern"]) if config.get("row_pattern") else None
+        self.columns = config.get("columns", {"name": 0, "value": 1, "unit": 2, "range": 3})
+        self.metadata = {key: re.compile(p, re.IGNORECASE | re.MULTILINE)
+                         for key, p in config.get("metadata", {}).items()}
+        self.date_format = config.get("date_format")
+        self.names = config.get("names", {})
+        self.keep_unmapped = config.get("keep_unmapped", False)
+        self.min_tests = config.get("min_tests", 3)
+        self.location = config.get("location")
+
+    def matches(self, raw_text: str) -> bool:
+        return all(pattern.search(raw_text) for pattern in self.fingerprint)
+
+    def parse(self, raw_text: str, pdf_path: Optional[str] = None) -> Optional[BloodTestResults]:
+        """Returns the parsed results, or None when they don't pass validation."""
+        rows = self._table_rows(pdf_path) if self.source == "tables" else self._line_rows(raw_text)
+        if rows is None:
+            return None
+
+        tests = []
+        for row in rows:
+            name = self.names.get(row["name"].strip())
+            if name is None:
+                if not self.keep_unmapped:
+                    return None  # unknown test: let the LLM translate and standardize it
+                name = row["name"].strip()
+            value = parse_number(row.get("value"))
+            if value is None:
+                return None
+            tests.append(BloodTest(
+                test_name=name,
+                value=value,
+                unit=(row.get("unit") or "").strip() or None,
+                normal_range=(row.get("range") or "").strip() or None,
+            ))
+
+        metadata = self._metadata(raw_text)
+        if len(tests) < self.min_tests or not metadata.name or not metadata.test_date:
+            return None
+        return BloodTestResults(personal_info=metadata, test_results=tests)
+
+    def _line_rows(self, raw_text: str) -> Optional[List[Dict[str, str]]]:
+        """
+        Rows matched by `row_pattern`, or None when a line starting with a test name
+        from `names` doesn't match it (a qualitative result, a value wrapped onto the
+        next line): that result would otherwise be dropped silently.
+        """
+        if self.row_pattern is None:
+            return []
+        rows = []
+        for line in raw_text.splitlines():
+            line = line.strip()
+            match = self.row_pattern.match(line)
+            if match:
+                rows.append(match.groupdict())
+            elif any(line == name or line.startswith(name + " ") for name in self.names):
+                return None
+        return rows
+
+    def _table_rows(self, pdf_path: Optional[str]) -> List[Dict[str, str]]:
+        if not pdf_path:
+            return []
+        import pdfplumber
+
+        rows = []
+        with pdfplumber.open(pdf_path) as pdf:
+            for page in pdf.pages:
+                for table in page.extract_tables():
+                    for cells in table:
+                        row = {key: cells[index] if index < len(cells) else None
+                               for key, index in self.columns.items()}
+                        # Header and spacer rows have no digits in the value column; skip them.
+                        # Rows with an unparseable value ("<5") are kept, so parse() rejects them
+                        if row.get("name") and _DIGIT.search(row.get("value") or ""):
+                            rows.append(row)
+        return rows
+
+    def _metadata(self, raw_text: str) -> PersonalMetadata:
+        values = {}
+        for key, pattern in self.metadata.items():
+            match = pattern.search(raw_text)
+            if match:
+                values[key] = match.group(1).strip()
+
+        test_date = values.get("test_date")
+        if test_date and self.date_format:
+            try:
+                test_date = time.strftime("%d-%m-%Y", time.strptime(test_date, self.date_format))
+            except ValueError:
+                test_date = None
+        return PersonalMetadata(
+            name=values.get("name"),
+            age=int(values["age"]) if values.get("age", "").isdigit() else None,
+            weight=parse_number(values.get("weight")),
+            height=parse_number(values.get("height")),
+            location=values.get("location") or self.location,
+            test_date=test_date,
+        )
+
+
+class TemplateRegistry:
+    """Loaded lab templates plus hit-rate and latency counters for the template stage."""
+
+    def __init__(self, directory: str = LAB_TEMPLATE_DIR, enabled: bool = LAB_TEMPLATES_ENABLED):
+        self.directory = directory
+        self.enabled = enabled
+        self.templates: List[LabTemplate] = []
+        self.counters = {"attempts": 0, "hits": 0, "no_match": 0, "validation_failures": 0, "seconds": 0.0,
+                         "llm_calls": 0, "llm_seconds": 0.0}
+        self.hits_by_template: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        templates = []
+        if os.path.isdir(self.directory):
+            for filename in sorted(os.listdir(self.directory)):
+                if filename.endswith(".json"):
+                    with open(os.path.join(self.directory, filename), "r", encoding="utf-8") as f:
+                        templates.append(LabTemplate(json.load(f)))
+        self.templates = templates
+
+    def parse(self, raw_text: str, pdf_path: Optional[str] = None) -> Optional[BloodTestResults]:
+        """Tries every matching template in order; None means fall back to the LLM."""
+        if not self.enabled or not self.templates:
+            return None
+
+        started = time.perf_counter()
+        outcome, result, template_name = "no_match", None, None
+        for template in self.templates:
+            if not template.matches(raw_text):
+                continue
+            try:
+                result = template.parse(raw_text, pdf_path)
+            except Exception:
+                logger.warning("Lab template %s failed", template.name, exc_info=True)
+                result = None
+            if result is not None:
+                outcome, template_name = "hits", template.name
+                break
+            outcome = "validation_failures"
+
+        with self._lock:
+            self.counters["attempts"] += 1
+            self.counters[outcome] += 1
+            self.counters["seconds"] += time.perf_counter() - started
+            if template_name:
+                self.hits_by_template[template_name] = self.hits_by_template.get(template_name, 0) + 1
+        return result
+
+    def record_llm(self, seconds: float):
+        """Records a structuring call made because no template handled the document."""
+        with self._lock:
+            self.counters["llm_calls"] += 1
+            self.counters["llm_seconds"] += seconds
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self.counters)
+            stats["hits_by_template"] = dict(self.hits_by_template)
+        attempts, llm_calls = stats["attempts"], stats["llm_calls"]
+        seconds, llm_seconds = stats.pop("seconds"), stats.pop("llm_seconds")
+        stats["hit_rate"] = stats["hits"] / attempts if attempts else 0.0
+        stats["template_avg_ms"] = 1000 * seconds / attempts if attempts else 0.0
+        stats["llm_avg_ms"] = 1000 * llm_seconds / llm_calls if llm_calls else 0.0
+        stats["templates"] = [template.name for template in self.templates]
+        return stats
+
+
+# Shared registry used by the ingestion pipeline
+template_registry = TemplateRegistry()
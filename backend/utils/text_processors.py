@@ -1,52 +1,38 @@
-import pdfplumber
-from typing import List, Optional
+from typing import TYPE_CHECKING, List, Optional
 from models.data_models import BloodTestResults
-from openai import OpenAI
+from utils.openai_client import estimate_tokens, get_openai_client, rate_limiter
+from utils.telemetry import logger, record_compaction, record_usage, span
+from utils.compaction import compact_text
+from utils.extraction_pool import PageText, analyze_pages, encode_image, extraction_pool, render_page  # noqa: F401
 from datetime import datetime
-import base64
-from pdf2image import convert_from_path
-import base64
-from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+import contextvars, os, random, re, time
 
-def encode_image(pil_image):
-    buffered = BytesIO()
-    pil_image.save(buffered, format="JPEG")
-    return base64.b64encode(buffered.getvalue()).decode("utf-8")
+# openai and pdf2image are imported inside the functions that need them (pdfplumber in
+# utils.extraction_pool), so read-only API traffic never loads the extraction stack
+if TYPE_CHECKING:
+    from openai import OpenAI
 
-def extract_text_from_pdf(pdf_path, api_key: str):
-    """
-    Attempts to extract text from a PDF using pdfplumber first.
-    If that fails (likely due to scanned/image PDF), falls back to OpenAI Vision.
-    Returns the extracted text as a string.
-    """
-    # First try with pdfplumber
-    try:
-        with pdfplumber.open(pdf_path) as pdf:
-            print("Attempting text extraction with pdfplumber...")
-            text = ""
-            for page in pdf.pages:
-                page_text = page.extract_text()
-                if page_text:
-                    text += page_text + "\n"
-            
-            if text.strip():  # If we got meaningful text
-                return text.strip()
-            else:
-                raise Exception("No text extracted - might be scanned/image PDF")
-                
-    except Exception as e:
-        print(f"pdfplumber extraction failed: {e}")
-        print("Falling back to OpenAI Vision API...")
-        return extract_text_with_vision(pdf_path, api_key)
+# Max Vision OCR requests in flight per document
+VISION_CONCURRENCY = int(os.getenv("VISION_CONCURRENCY", "4"))
+# Retries per page on rate limits / transient connection errors
+VISION_MAX_RETRIES = int(os.getenv("VISION_MAX_RETRIES", "4"))
+VISION_BACKOFF_SECONDS = float(os.getenv("VISION_BACKOFF_SECONDS", "1.0"))
 
-def extract_text_with_vision(pdf_path: str, api_key: str) -> str:
-    """
-    Uses OpenAI's Vision model to extract text from every page of a scanned/image-based PDF.
-    """
-    client = OpenAI(api_key=api_key)
-    images = convert_from_path(pdf_path, dpi=300)
-    
-    system_prompt = """
+# Rasterization policy for the OCR fallback. GPT-4o scales high-detail images to
+# fit 2048px anyway, so larger renders only cost memory and upload bandwidth.
+# JPEG_QUALITY / MAX_IMAGE_DIMENSION live with encode_image in utils.extraction_pool.
+RASTER_DPI = int(os.getenv("RASTER_DPI", "300"))
+
+# Per-page OCR decision for mixed PDFs: a page is OCR'd unless its text layer has at
+# least PAGE_MIN_CHARS characters. Pages mostly covered by an image (a scan with a
+# printed footer or a partial OCR layer) also need PAGE_IMAGE_MIN_DENSITY chars/in².
+PAGE_MIN_CHARS = int(os.getenv("PAGE_MIN_CHARS", "40"))
+PAGE_IMAGE_COVERAGE = float(os.getenv("PAGE_IMAGE_COVERAGE", "0.5"))
+PAGE_IMAGE_MIN_DENSITY = float(os.getenv("PAGE_IMAGE_MIN_DENSITY", "5.0"))
+
+VISION_SYSTEM_PROMPT = """
     You are a precise OCR system. Your task is to:
     1. Extract ALL text visible in the document exactly as it appears
     2. Preserve the exact formatting, numbers, and units as they appear
@@ -60,52 +46,31 @@ def extract_text_with_vision(pdf_path: str, api_key: str) -> str:
     Output the raw text exactly as you see it, with no additional commentary or formatting.
     """
 
-    all_extracted_text = []
-    
-    for idx, image in enumerate(images):
-        image_b64 = encode_image(image)
-        try:
-            response = client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": system_prompt
-                    },
-                    {
-                        "role": "user",
-                        "content": [
-                            { "type": "text", "text": "Extract text from this image precisely." },
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:image/jpeg;base64,{image_b64}",
-                                    "detail": "high"
-                                }
-                            }
-                        ]
-                    }
-                ],
-                max_tokens=4096
-            )
-            extracted_text = response.choices[0].message.content.strip()
-            all_extracted_text.append(f"Page {idx+1}:\n{extracted_text}")
-        except Exception as e:
-            print(f"Error processing page {idx+1}: {e}")
-            all_extracted_text.append(f"Page {idx+1}: [Error extracting text]")
-    
-    return "\n\n".join(all_extracted_text)
+# Prompt token estimates charged against the client-side TPM limiter before each call
+# (output tokens are charged from the reported usage afterwards). A high-detail page
+# scaled to 2048px costs ~1105 input tokens.
+VISION_MAX_TOKENS = 4096
+VISION_PAGE_TOKENS = 1105
 
-def process_pdf_with_openai(raw_text: str, api_key: str) -> Optional[BloodTestResults]:
-    """
-    Extracts text from a PDF and uses OpenAI to structure it into a BloodTestResults object.
-    Translates to standardized English if needed.
-    """
-    # 1) Initialize the OpenAI client
-    client = OpenAI(api_key=api_key)
+STRUCTURING_MODEL = "gpt-4o"
+# The system prompt and response schema are the same on every structuring call and come
+# first, so providers can cache that prefix; everything document-specific goes in the last
+# user message. The key routes all structuring calls to the same cache (empty to omit it).
+STRUCTURING_PROMPT_CACHE_KEY = os.getenv("STRUCTURING_PROMPT_CACHE_KEY", "bloodpanel-structuring")
+
+# Chunked structuring for long reports: text over STRUCTURING_CHUNK_CHARS (0 = never)
+# is split on page/section boundaries and the chunks are structured in parallel.
+STRUCTURING_CHUNK_CHARS = int(os.getenv("STRUCTURING_CHUNK_CHARS", "12000"))
+STRUCTURING_CHUNK_OVERLAP = int(os.getenv("STRUCTURING_CHUNK_OVERLAP", "2"))  # lines repeated across chunks
+STRUCTURING_CONCURRENCY = int(os.getenv("STRUCTURING_CONCURRENCY", "4"))
+STRUCTURING_CONTINUATION_NOTE = (
+    "[Continuation of the same report, part {part} of {total}. Extract only the blood test "
+    "results; leave every personal_info field null.]\n\n"
+)
+_PAGE_MARKER = re.compile(r"^Page \d+:")
 
-    # 2) System prompt
-    system_prompt = ("""
+# System prompt for process_pdf_with_openai; also part of the structured-results cache key
+STRUCTURING_SYSTEM_PROMPT = ("""
         You are an expert in extracting structured data from unstructured raw text, specifically blood test reports. Follow these instructions *exactly* to ensure consistent naming, units, and structured output. Note that the units used in Greek medical labs often default to mg/dL for many tests (e.g., Glucose, Cholesterol, etc.), so preserve or convert to mg/dL wherever possible.
 
         1. **Parse & Structure**:
@@ -150,28 +115,288 @@ def process_pdf_with_openai(raw_text: str, api_key: str) -> Optional[BloodTestRe
         - Ensure correct date format, standardized naming, and mg/dL (or other suitable units) where appropriate.
     """)
 
+def needs_ocr(page: PageText) -> bool:
+    """True when a page has no usable text layer and must go through Vision OCR."""
+    if page.chars < PAGE_MIN_CHARS:
+        return True
+    density = page.chars / page.area_sq_in if page.area_sq_in else 0.0
+    return page.image_coverage >= PAGE_IMAGE_COVERAGE and density < PAGE_IMAGE_MIN_DENSITY
+
+def pages_to_ocr(pages: List[PageText]) -> List[int]:
+    """Numbers of the pages that need Vision OCR."""
+    scanned = [page.number for page in pages if needs_ocr(page)]
+    # Sparse pages without any image are covers or blanks, not scans. Only when pdfplumber
+    # sees neither text nor images anywhere is everything OCR'd, as before.
+    if any(page.image_coverage > 0 or not needs_ocr(page) for page in pages):
+        scanned = [number for number in scanned if pages[number - 1].image_coverage > 0]
+    return scanned
+
+def extract_text_from_pdf(pdf_path, api_key: str):
+    """
+    Extracts text from a PDF page by page: pages with a usable text layer are read
+    with pdfplumber, the rest (scanned pages) are OCR'd with OpenAI Vision, and the
+    results are merged in page order. If pdfplumber can't parse the file at all,
+    every page goes to Vision; a timeout or broken extraction pool is raised instead.
+    Returns the extracted text as a string.
+    """
+    # First try with pdfplumber, in the extraction process pool
+    try:
+        logger.info("Attempting text extraction with pdfplumber...")
+        with span("pdfplumber"):
+            pages = extraction_pool.run(analyze_pages, pdf_path)
+    except (TimeoutError, BrokenProcessPool):
+        raise  # the pool failed, not the parse; OCR'ing every page would only add cost
+    except Exception as e:
+        logger.info("pdfplumber extraction failed: %s", e)
+        logger.info("Falling back to OpenAI Vision API...")
+        with span("vision"):
+            return extract_text_with_vision(pdf_path, api_key)
+
+    scanned = pages_to_ocr(pages)
+    ocr_texts = {}
+    if scanned:
+        logger.info("OCR'ing %d of %d pages with OpenAI Vision: %s", len(scanned), len(pages), scanned)
+        with span("vision"):
+            ocr_texts = dict(zip(scanned, ocr_pdf_pages(pdf_path, api_key, scanned)))
+    if scanned and len(scanned) == len(pages):
+        # Fully scanned: same output as extract_text_with_vision
+        return "\n\n".join(ocr_texts[number] for number in scanned)
+
+    parts = [ocr_texts.get(page.number, page.text) for page in pages]
+    return "\n".join(part for part in parts if part).strip()
+
+def ocr_page(client: "OpenAI", image_b64: str, page_number: int) -> str:
+    """
+    Runs Vision OCR on a single encoded page, retrying with exponential backoff
+    on rate limits and transient connection errors.
+    """
+    from openai import APIConnectionError, APITimeoutError, RateLimitError
+
+    for attempt in range(VISION_MAX_RETRIES + 1):
+        rate_limiter.wait(VISION_PAGE_TOKENS)
+        try:
+            with span("vision_page"):
+                response = client.chat.completions.create(
+                    model="gpt-4o",
+                    messages=[
+                        {
+                            "role": "system",
+                            "content": VISION_SYSTEM_PROMPT
+                        },
+                        {
+                            "role": "user",
+                            "content": [
+                                { "type": "text", "text": "Extract text from this image precisely." },
+                                {
+                                    "type": "image_url",
+                                    "image_url": {
+                                        "url": f"data:image/jpeg;base64,{image_b64}",
+                                        "detail": "high"
+                                    }
+                                }
+                            ]
+                        }
+                    ],
+                    max_tokens=VISION_MAX_TOKENS
+                )
+            rate_limiter.reconcile(VISION_PAGE_TOKENS, response.usage)
+            record_usage("vision", "gpt-4o", response)
+            extracted_text = response.choices[0].message.content.strip()
+            return f"Page {page_number}:\n{extracted_text}"
+        except (RateLimitError, APIConnectionError, APITimeoutError) as e:
+            record_usage("vision", "gpt-4o", outcome="retryable_error")
+            if attempt == VISION_MAX_RETRIES:
+                logger.warning("Error processing page %s: %s", page_number, e)
+                break
+            delay = VISION_BACKOFF_SECONDS * (2 ** attempt) * (1 + random.random())
+            logger.info("Page %s throttled, retrying in %.1fs", page_number, delay)
+            time.sleep(delay)
+        except Exception as e:
+            record_usage("vision", "gpt-4o", outcome="error")
+            logger.warning("Error processing page %s: %s", page_number, e)
+            break
+    return f"Page {page_number}: [Error extracting text]"
+
+def ocr_pdf_page(client: "OpenAI", pdf_path: str, page_number: int, dpi: int = RASTER_DPI) -> str:
+    """Rasterizes and encodes one page in the extraction pool, then OCRs it."""
+    with span("render"):
+        image_b64 = extraction_pool.run(render_page, pdf_path, page_number, dpi)
+    return ocr_page(client, image_b64, page_number)
+
+def ocr_pdf_pages(pdf_path: str, api_key: str, page_numbers: List[int], concurrency: int = VISION_CONCURRENCY,
+                  client: Optional["OpenAI"] = None) -> List[str]:
+    """
+    OCRs the given pages (1-based) with Vision and returns their texts in the same order.
+    Up to `concurrency` pages are in flight at once, each rendered in the extraction
+    process pool and then OCR'd, so at most `concurrency` encoded pages are held in memory.
+    """
+    client = client or get_openai_client(api_key)
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        # Run each page in a copy of this context so its spans log the caller's request id
+        futures = [
+            pool.submit(contextvars.copy_context().run, ocr_pdf_page, client, pdf_path, page_number)
+            for page_number in page_numbers
+        ]
+        return [future.result() for future in futures]
+
+def extract_text_with_vision(pdf_path: str, api_key: str, concurrency: int = VISION_CONCURRENCY,
+                             client: Optional["OpenAI"] = None) -> str:
+    """
+    Uses OpenAI's Vision model to extract text from every page of a scanned/image-based PDF,
+    keeping the original page order.
+    """
+    from pdf2image import pdfinfo_from_path
+
+    page_count = pdfinfo_from_path(pdf_path)["Pages"]
+    return "\n\n".join(ocr_pdf_pages(pdf_path, api_key, list(range(1, page_count + 1)), concurrency, client))
+
+def structure_text(client: "OpenAI", raw_text: str) -> Optional[BloodTestResults]:
+    """One structuring completion for `raw_text`; None if the call fails."""
+    prompt_tokens = estimate_tokens(STRUCTURING_SYSTEM_PROMPT + raw_text)
+    rate_limiter.wait(prompt_tokens)
+    cache_options = {"prompt_cache_key": STRUCTURING_PROMPT_CACHE_KEY} if STRUCTURING_PROMPT_CACHE_KEY else {}
 
-    # 3) Call the beta `parse` method with the model + messages
+    # Call the beta `parse` method with the model + messages
     try:
-        completion = client.beta.chat.completions.parse(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": raw_text},
-            ],
-            response_format=BloodTestResults,
-        )
-
-        # 5) Extract parsed data
-        #    The library automatically converts the raw response into
-        #    an instance of BloodTestResults
-        structured_data = completion.choices[0].message.parsed
-        return structured_data
+        with span("structure_llm"):
+            completion = client.beta.chat.completions.parse(
+                model=STRUCTURING_MODEL,
+                messages=[
+                    {"role": "system", "content": STRUCTURING_SYSTEM_PROMPT},
+                    {"role": "user", "content": raw_text},
+                ],
+                response_format=BloodTestResults,
+                **cache_options,
+            )
+        rate_limiter.reconcile(prompt_tokens, completion.usage)
+        record_usage("structure", STRUCTURING_MODEL, completion)
+
+        # The library automatically converts the raw response into
+        # an instance of BloodTestResults
+        return completion.choices[0].message.parsed
 
     except Exception as e:
-        print(f"Error processing with OpenAI: {e}")
+        record_usage("structure", STRUCTURING_MODEL, outcome="error")
+        logger.warning("Error processing with OpenAI: %s", e)
         return None
-    
+
+def split_raw_text(raw_text: str, max_chars: int = STRUCTURING_CHUNK_CHARS,
+                   overlap: int = STRUCTURING_CHUNK_OVERLAP) -> List[str]:
+    """
+    Splits raw text into chunks of about `max_chars` on page and section boundaries
+    ("Page N:" lines and blank lines); sections longer than that are split between lines.
+    Each chunk repeats the last `overlap` lines of the previous one, so a table row cut
+    at a boundary is whole in one of them. Text within the limit is returned as is.
+    """
+    if max_chars <= 0 or len(raw_text) <= max_chars:
+        return [raw_text]
+    # Aim for evenly sized chunks (the slowest chunk sets the latency), with some slack for boundaries
+    chunk_count = -(-len(raw_text) // max_chars)
+    limit = min(max_chars, int(len(raw_text) / chunk_count * 1.15))
+
+    sections: List[List[str]] = [[]]
+    for line in raw_text.splitlines():
+        if sections[-1] and (not line.strip() or _PAGE_MARKER.match(line)):
+            sections.append([])
+        sections[-1].append(line)
+
+    chunks: List[List[str]] = []
+    lines: List[str] = []
+    size = 0
+    for section in sections:
+        section_size = sum(len(line) + 1 for line in section)
+        # An oversized section is packed line by line, anything else as a whole
+        pieces = [[line] for line in section] if section_size > limit else [section]
+        for piece in pieces:
+            piece_size = sum(len(line) + 1 for line in piece)
+            if lines and size + piece_size > limit:
+                chunks.append(lines)
+                lines = lines[-overlap:] if overlap > 0 else []
+                size = sum(len(line) + 1 for line in lines)
+            lines = lines + piece
+            size += piece_size
+    if lines:
+        chunks.append(lines)
+    return ["\n".join(chunk) for chunk in chunks]
+
+def merge_results(parts: List[BloodTestResults], overlap: int = STRUCTURING_CHUNK_OVERLAP) -> BloodTestResults:
+    """
+    Merges per-chunk results in chunk order: personal info from the first chunk (gaps
+    filled from later ones), tests and errors. Only the overlap between adjacent chunks
+    is deduplicated: one of the first `overlap` tests of a chunk that matches one of the
+    last `overlap` tests of the previous chunk came from the repeated lines. The same
+    test reported again elsewhere (a re-test, a urine and a blood value) is kept.
+    """
+    personal_info = parts[0].personal_info.model_copy()
+    for part in parts[1:]:
+        for field, value in part.personal_info:
+            if getattr(personal_info, field) is None and value is not None:
+                setattr(personal_info, field, value)
+
+    def key(test):
+        return test.test_name.strip().lower(), test.value, (test.unit or "").strip().lower()
+
+    test_results, previous = [], []
+    errors, seen_errors = [], set()
+    for part in parts:
+        boundary = [key(test) for test in previous[-overlap:]] if overlap > 0 else []
+        for position, test in enumerate(part.test_results):
+            if position < overlap and key(test) in boundary:
+                boundary.remove(key(test))  # each repeated test matches once
+                continue
+            test_results.append(test)
+        previous = part.test_results
+        for error in part.errors or []:
+            if (error.error, error.description) not in seen_errors:
+                seen_errors.add((error.error, error.description))
+                errors.append(error)
+
+    return BloodTestResults(personal_info=personal_info, test_results=test_results, errors=errors or None)
+
+def structuring_messages(raw_text: str, chunk_chars: int = STRUCTURING_CHUNK_CHARS) -> List[str]:
+    """
+    The user messages that structure (compacted) raw text: the text itself, or its
+    chunks when longer than `chunk_chars`, each after the first prefixed with
+    STRUCTURING_CONTINUATION_NOTE. Their results are combined with merge_results.
+    """
+    chunks = split_raw_text(raw_text, chunk_chars)
+    # The note goes in the user message, so every chunk shares the cacheable system prompt
+    return [chunks[0]] + [
+        STRUCTURING_CONTINUATION_NOTE.format(part=part, total=len(chunks)) + chunk
+        for part, chunk in enumerate(chunks[1:], 2)
+    ]
+
+def process_pdf_with_openai(raw_text: str, api_key: str,
+                            chunk_chars: int = STRUCTURING_CHUNK_CHARS) -> Optional[BloodTestResults]:
+    """
+    Uses OpenAI to structure extracted raw text into a BloodTestResults object.
+    Translates to standardized English if needed. The text is compacted first
+    (repeated headers/footers and boilerplate removed, result lines untouched).
+    Text still longer than `chunk_chars` is split into chunks that are structured
+    concurrently and merged; personal metadata is only requested from the first
+    chunk. Returns None if any call fails.
+    """
+    compacted = compact_text(raw_text)
+    record_compaction(compacted.raw_tokens, compacted.tokens)
+    logger.info("Structuring input: ~%d tokens, ~%d after compaction (%d lines dropped)",
+                compacted.raw_tokens, compacted.tokens, compacted.dropped_lines)
+    raw_text = compacted.text
+
+    # Reuse the shared, pooled OpenAI client
+    client = get_openai_client(api_key)
+    texts = structuring_messages(raw_text, chunk_chars)
+    if len(texts) == 1:
+        return structure_text(client, raw_text)
+
+    logger.info("Structuring a %d-character report in %d chunks", len(raw_text), len(texts))
+    with ThreadPoolExecutor(max_workers=max(1, min(STRUCTURING_CONCURRENCY, len(texts)))) as pool:
+        futures = [pool.submit(contextvars.copy_context().run, structure_text, client, text) for text in texts]
+        parts = [future.result() for future in futures]
+
+    if any(part is None for part in parts):
+        return None  # a partial report would silently drop tests
+    return merge_results(parts)
+
 def standardize_date(date_str: str) -> str:
     """Standardizes a date string to DD-MM-YYYY format."""
     try:
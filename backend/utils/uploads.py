@@ -0,0 +1,116 @@
+import hashlib
+import json
+import os
+import re
+import uuid
+from datetime import datetime
+from typing import BinaryIO, NamedTuple
+from fastapi import UploadFile
+from fastapi.concurrency import run_in_threadpool
+from settings import get_settings
+
+UPLOAD_DIR = get_settings().upload_dir  # created by the app lifespan and again on first write
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(50 * 1024 * 1024)))
+UPLOAD_CHUNK = 1024 * 1024
+# Multipart framing around the file part (boundaries, headers, other fields)
+MULTIPART_OVERHEAD = 64 * 1024
+
+PDF_MAGIC = b"%PDF"
+
+_UNSAFE = re.compile(r"[^\w.\-]+")
+
+
+class UploadRejected(Exception):
+    """Raised while streaming an upload that can't be accepted; `status_code` is the HTTP status to return."""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class StoredUpload(NamedTuple):
+    path: str
+    sha256: str
+    size: int
+
+
+def sanitize_filename(filename: str, max_length: int = 100) -> str:
+    """Base name without directories or unsafe characters (letters in any script are kept)."""
+    name = os.path.basename((filename or "").replace("\\", "/"))
+    name = _UNSAFE.sub("_", name).strip("._") or "upload"
+    stem, ext = os.path.splitext(name)
+    return stem[:max_length - len(ext)] + ext
+
+
+def storage_name(filename: str) -> str:
+    """Collision-free name for a stored file: timestamp, random id, then the sanitized original name."""
+    return f"{datetime.now().strftime('%Y%m%d-%H%M%S')}_{uuid.uuid4().hex[:12]}_{sanitize_filename(filename)}"
+
+
+def store_pdf(stream: BinaryIO, filename: str, directory: str = UPLOAD_DIR,
+              max_bytes: int = MAX_UPLOAD_BYTES) -> StoredUpload:
+    """
+    Copies a PDF stream to a new file in `directory` chunk by chunk, hashing it on
+    the way. The PDF magic bytes are checked on the first chunk and the size on
+    every chunk, so a bad upload is rejected (UploadRejected) without writing the
+    rest of it; the partial file is removed. Blocking: call it from a thread.
+    """
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, storage_name(filename))
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "xb") as out:  # exclusive create: never overwrite
+        try:
+            head = b""
+            for chunk in iter(lambda: stream.read(UPLOAD_CHUNK), b""):
+                if len(head) < len(PDF_MAGIC):
+                    head += chunk[:len(PDF_MAGIC)]
+                    if len(head) >= len(PDF_MAGIC) and not head.startswith(PDF_MAGIC):
+                        raise UploadRejected("Only PDF files are allowed")
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadRejected(f"File exceeds the {max_bytes // (1024 * 1024)} MB upload limit", 413)
+                digest.update(chunk)
+                out.write(chunk)
+            if size == 0:
+                raise UploadRejected("Empty file")
+            if not head.startswith(PDF_MAGIC):
+                raise UploadRejected("Only PDF files are allowed")
+        except BaseException:
+            out.close()
+            os.remove(path)
+            raise
+    return StoredUpload(path=path, sha256=digest.hexdigest(), size=size)
+
+
+async def save_upload(file: UploadFile, directory: str = UPLOAD_DIR,
+                      max_bytes: int = MAX_UPLOAD_BYTES) -> StoredUpload:
+    """store_pdf for an uploaded file, run in the threadpool."""
+    return await run_in_threadpool(store_pdf, file.file, file.filename, directory, max_bytes)
+
+
+class UploadSizeLimitMiddleware:
+    """
+    Rejects single-file uploads whose declared Content-Length is over the limit with
+    413 before the body is read. The multipart body is otherwise parsed and spooled
+    in full before the handler runs; save_upload still enforces the limit on the bytes.
+    """
+
+    def __init__(self, app, path: str = "/upload/", max_bytes: int = MAX_UPLOAD_BYTES):
+        self.app = app
+        self.path = path
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["method"] == "POST" and scope["path"] == self.path:
+            for name, value in scope.get("headers", []):
+                if name == b"content-length" and value.isdigit() and int(value) > self.max_bytes + MULTIPART_OVERHEAD:
+                    body = json.dumps(
+                        {"error": f"File exceeds the {self.max_bytes // (1024 * 1024)} MB upload limit"}).encode()
+                    await send({"type": "http.response.start", "status": 413, "headers": [
+                        (b"content-type", b"application/json"), (b"content-length", str(len(body)).encode()),
+                        (b"connection", b"close"),
+                    ]})
+                    await send({"type": "http.response.body", "body": body})
+                    return
+        await self.app(scope, receive, send)
@@ -0,0 +1,144 @@
+"""
+Resumable OpenAI Batch API structuring (utils.openai_batch) against the stub server.
+
+Runs a BatchStructuringJob over synthetic reports and checks (exit code 1 otherwise)
+that:
+
+  * prepare + submit uploads the input file once and creates one batch, and
+    returns before the batch is done when not waiting
+  * a new job object with the same name resumes: it polls, collects and persists
+    every report, with the test rows the stub parsed
+  * running the finished job again uploads, submits and persists nothing
+  * a report left `persisting` after its commit is matched to its stored session
+    instead of being stored twice, and one left `persisting` before its commit
+    (its session is missing) is stored
+  * a report a lab template parses is stored without a batch request, and a long
+    report is sent as several chunk requests whose results are merged into one
+    session with every test
+
+    python benchmarks/batch_structuring.py --reports 5
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from harness import setup_backend  # noqa: E402
+from stub_openai import start_stub  # noqa: E402
+import synthetic  # noqa: E402
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reports", type=int, default=5)
+    parser.add_argument("--pages", type=int, default=2, help="pages per synthetic report")
+    parser.add_argument("--long-pages", type=int, default=40, help="pages of the report that is chunked")
+    args = parser.parse_args()
+
+    server, base_url = start_stub()
+    failures = []
+
+    def expect(ok: bool, description: str):
+        print(f"{'ok  ' if ok else 'FAIL'} {description}")
+        if not ok:
+            failures.append(description)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        setup_backend(tmp, base_url)
+        from openai import OpenAI
+        from database import SessionLocal
+        from models import orm_models
+        from utils.openai_batch import BatchStructuringJob
+
+        def sessions():
+            db = SessionLocal()
+            try:
+                return {session.session_id: len(session.blood_tests)
+                        for session in db.query(orm_models.TestSession)}
+            finally:
+                db.close()
+
+        client = OpenAI(api_key="benchmark", base_url=base_url)
+        root = os.path.join(tmp, "batches")
+        documents = [
+            (f"report-{i}", "\n".join(line for page in range(1, args.pages + 1)
+                                      for line in synthetic.report_lines(page)), None)
+            for i in range(args.reports)
+        ]
+        rows = args.pages * synthetic.ROWS_PER_PAGE
+
+        state = BatchStructuringJob("check", client, root).run(documents, wait=False, poll_seconds=0)
+        expect(state["status"] not in ("completed", "failed") and server.uploads == 1 and len(server.batches) == 1,
+               f"submitted without waiting: {state['status']}, {server.uploads} file(s) uploaded, "
+               f"{len(server.batches)} batch(es)")
+
+        job = BatchStructuringJob("check", client, root)
+        state = job.run([], poll_seconds=0)
+        stored = sessions()
+        expect(state["status"] == "completed" and job.summary() == {"persisted": args.reports}
+               and len(stored) == args.reports and set(stored.values()) == {rows},
+               f"resumed and collected: {state['status']} {job.summary()}, {len(stored)} sessions")
+
+        job = BatchStructuringJob("check", client, root)
+        job.run([], poll_seconds=0)
+        expect(sessions() == stored and server.uploads == 1 and len(server.batches) == 1,
+               "re-running the finished job changes nothing")
+
+        # Crash simulation: "report-0" committed but the state was not saved yet;
+        # "report-1" marked before a commit that never happened
+        with open(job.state_path, encoding="utf-8") as f:
+            saved = json.load(f)
+        committed, lost = saved["items"]["report-0"], saved["items"]["report-1"]
+        committed_id, lost_id = committed["session_id"], lost["session_id"]
+        for item in (committed, lost):
+            item.update(status="persisting", session_id=None)
+        with open(job.state_path, "w", encoding="utf-8") as f:
+            json.dump(saved, f)
+        db = SessionLocal()
+        try:
+            db.delete(db.get(orm_models.TestSession, lost_id))
+            db.commit()
+        finally:
+            db.close()
+
+        job = BatchStructuringJob("check", client, root)
+        job.run([], poll_seconds=0)
+        items = job.state["items"]
+        after = sessions()
+        expect(items["report-0"]["session_id"] == committed_id and items["report-1"]["session_id"] in after
+               and lost_id not in after and len(after) == args.reports and job.summary() == {"persisted": args.reports},
+               f"resumed from 'persisting': {len(after)} sessions, report-0 kept session {committed_id}, "
+               f"report-1 stored as session {items['report-1']['session_id']}")
+
+        # A sample the lab's template parses into 14 tests (see lab_templates.py)
+        with open(os.path.join(FIXTURE_DIR, "lab_templates", "diagnostiko_thessalonikis.txt"), encoding="utf-8") as f:
+            template_text = f.read()
+        long_text = "\n".join(line for page in range(1, args.long_pages + 1) for line in synthetic.report_lines(page))
+        uploads = server.uploads
+        job = BatchStructuringJob("mixed", client, root)
+        job.run([("template", template_text, None), ("long", long_text, None)], poll_seconds=0)
+        items = job.state["items"]
+        with open(job.requests_path, encoding="utf-8") as f:
+            request_ids = [json.loads(line)["custom_id"] for line in f]
+        stored = sessions()
+        expect(job.summary() == {"persisted": 2} and items["template"]["parts"] == 0
+               and items["long"]["parts"] > 1 and request_ids == [f"long#{part}" for part in
+                                                                   range(1, items["long"]["parts"] + 1)]
+               and server.uploads == uploads + 1
+               and stored.get(items["template"]["session_id"]) == 14
+               and stored.get(items["long"]["session_id"]) == args.long_pages * synthetic.ROWS_PER_PAGE,
+               f"template report stored without a request, long report in {items['long']['parts']} chunks: "
+               f"{job.summary()}, requests {request_ids}, "
+               f"tests {stored.get(items['template']['session_id'])} / {stored.get(items['long']['session_id'])}")
+
+    server.shutdown()
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Chunked vs single-call structuring on long synthetic reports.
+
+For reports of increasing page counts, structures the same raw text once with a
+single completion and once in chunks (STRUCTURING_CHUNK_CHARS), against the stub
+OpenAI server with per-token output latency. Checks that the merged result has
+the same personal info and the same tests as the single call, including a result
+repeated on the last page (exit code 1 otherwise), and prints both latencies.
+
+    python benchmarks/chunked_structuring.py --pages 5 20 50 --chunk-chars 12000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from harness import setup_backend  # noqa: E402
+from stub_openai import start_stub  # noqa: E402
+import synthetic  # noqa: E402
+
+
+def test_set(results):
+    return sorted((test.test_name, test.value, test.unit, test.normal_range) for test in results.test_results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, nargs="+", default=[5, 20, 50])
+    parser.add_argument("--chunk-chars", type=int, default=12000)
+    parser.add_argument("--latency", type=float, default=0.3, help="stub seconds per response")
+    parser.add_argument("--token-latency", type=float, default=0.001, help="stub seconds per output token")
+    args = parser.parse_args()
+
+    server, base_url = start_stub(args.latency, token_latency=args.token_latency)
+    failures = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        setup_backend(tmp, base_url)
+        from utils.text_processors import process_pdf_with_openai, split_raw_text
+
+        for pages in args.pages:
+            # Pages as the text pass joins them, with Vision-style markers on every other page
+            page_lines = [synthetic.report_lines(page) for page in range(1, pages + 1)]
+            # A re-test: the first result reported again on the last page, which merging must keep
+            page_lines[-1].append(page_lines[0][3])
+            raw_text = "\n".join(
+                (f"Page {page}:\n" if page % 2 else "") + "\n".join(lines)
+                for page, lines in enumerate(page_lines, 1)
+            )
+            started = time.perf_counter()
+            single = process_pdf_with_openai(raw_text, "benchmark", chunk_chars=0)
+            single_seconds = time.perf_counter() - started
+
+            started = time.perf_counter()
+            chunked = process_pdf_with_openai(raw_text, "benchmark", chunk_chars=args.chunk_chars)
+            chunked_seconds = time.perf_counter() - started
+
+            chunks = len(split_raw_text(raw_text, args.chunk_chars))
+            ok = (single is not None and chunked is not None
+                  and single.personal_info == chunked.personal_info
+                  and test_set(single) == test_set(chunked))
+            failures += not ok
+            print(f"{'ok  ' if ok else 'FAIL'} {pages:3d} pages {len(raw_text):7d} chars  "
+                  f"single {single_seconds:6.2f}s  chunked ({chunks} chunks) {chunked_seconds:6.2f}s  "
+                  f"tests {len(single.test_results) if single else '-'} / {len(chunked.test_results) if chunked else '-'}")
+    server.shutdown()
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Raw-text compaction before structuring: token savings and no lost results.
+
+Compacts the report fixtures in benchmarks/fixtures/compaction plus synthetic
+text-layer and Vision-style reports, prints the estimated tokens before and after
+for each document and checks (exit code 1 otherwise) that:
+
+  * every line with a digit survives verbatim and in order (only trailing
+    whitespace may go), except "Page N:" markers and page counters
+  * every label line directly above a bare value line is kept
+  * the qualitative results listed in QUALITATIVE_RESULTS are kept
+  * for the synthetic reports (rows in the stub's format), the stub OpenAI parser
+    finds the same tests in the compacted text as in the raw text
+  * compacting the output again changes nothing
+
+    python benchmarks/compaction.py --pages 5 20
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from harness import BACKEND_DIR  # noqa: E402
+from stub_openai import structured_content  # noqa: E402
+import synthetic  # noqa: E402
+
+sys.path.insert(0, BACKEND_DIR)
+
+from utils.compaction import VALUE_LINE, compact_text, is_protected  # noqa: E402
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "compaction")
+
+# Results without digits, which compaction may not lose either (compared whitespace-collapsed)
+QUALITATIVE_RESULTS = {
+    "greek_text_layer.txt": ["TSH", "Χρώμα Κίτρινο", "Γλυκόζη Αρνητικό", "Λευκώματα Ίχνη", "Κετόνες", "Αρνητικό"],
+    "vision_ocr.txt": ["Vitamin D", "Vitamin B12", "Colour Yellow", "Protein Negative", "Glucose Negative"],
+}
+
+
+def synthetic_reports(pages: int):
+    """(name, raw text, stub-parsable) for a text-layer and a Vision-style report of `pages` pages."""
+    text_layer = "\n".join("\n".join(synthetic.report_lines(page)) for page in range(1, pages + 1))
+    vision = "\n\n".join(f"Page {page}:\n" + "\n".join(synthetic.report_lines(page)) for page in range(1, pages + 1))
+    return [(f"synthetic text layer, {pages} pages", text_layer, True),
+            (f"synthetic vision, {pages} pages", vision, True)]
+
+
+def is_subsequence(needles, haystack) -> bool:
+    remaining = iter(haystack)
+    return all(any(needle == line for line in remaining) for needle in needles)
+
+
+def check(name: str, raw_text: str, stub_parsable: bool):
+    """Compacts one document; returns (CompactedText, list of failed checks)."""
+    compacted = compact_text(raw_text, enabled=True)
+    out_lines = compacted.text.splitlines()
+    collapsed = [" ".join(line.split()) for line in out_lines]
+    failures = []
+
+    results = [line.rstrip() for line in raw_text.splitlines() if is_protected(line)]
+    if not is_subsequence(results, out_lines):
+        missing = [line for line in results if line not in out_lines]
+        failures.append(f"result lines lost or reordered: {missing[:3]}")
+
+    raw_lines = [line for line in raw_text.splitlines() if line.strip()]
+    labels = [" ".join(line.split()) for line, following in zip(raw_lines, raw_lines[1:])
+              if not is_protected(line) and VALUE_LINE.match(following)]
+    if not is_subsequence(labels, collapsed):
+        failures.append(f"value labels lost: {[label for label in labels if label not in collapsed][:3]}")
+
+    qualitative = QUALITATIVE_RESULTS.get(name, [])
+    if not is_subsequence(qualitative, collapsed):
+        failures.append(f"qualitative results lost: {[line for line in qualitative if line not in collapsed]}")
+
+    if stub_parsable and json.loads(structured_content(raw_text))["test_results"] != json.loads(
+            structured_content(compacted.text))["test_results"]:
+        failures.append("stub parser finds different tests after compaction")
+
+    if compact_text(compacted.text, enabled=True).text != compacted.text:
+        failures.append("compaction is not idempotent")
+    return compacted, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, nargs="+", default=[5, 20], help="synthetic report lengths")
+    parser.add_argument("--show", action="store_true", help="print the compacted fixture texts")
+    args = parser.parse_args()
+
+    documents = []
+    for path in sorted(glob.glob(os.path.join(FIXTURE_DIR, "*.txt"))):
+        with open(path, encoding="utf-8") as f:
+            documents.append((os.path.basename(path), f.read(), False))
+    for pages in args.pages:
+        documents.extend(synthetic_reports(pages))
+
+    failed = 0
+    raw_total = compacted_total = 0
+    for name, raw_text, stub_parsable in documents:
+        compacted, failures = check(name, raw_text, stub_parsable)
+        raw_total += compacted.raw_tokens
+        compacted_total += compacted.tokens
+        saved = 1 - compacted.tokens / compacted.raw_tokens
+        print(f"{'ok  ' if not failures else 'FAIL'} {name:<32} ~{compacted.raw_tokens:6d} -> "
+              f"~{compacted.tokens:6d} tokens ({saved:5.1%} saved, {compacted.dropped_lines} lines dropped)")
+        for failure in failures:
+            print(f"       {failure}")
+        if args.show and name.endswith(".txt"):
+            print("\n".join(f"       | {line}" for line in compacted.text.splitlines()))
+        failed += bool(failures)
+
+    print(f"total ~{raw_total} -> ~{compacted_total} tokens ({1 - compacted_total / raw_total:.1%} saved)")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Throughput of the CPU-bound extraction step as the extraction pool grows.
+
+Runs many concurrent extract_text_from_pdf calls on synthetic text PDFs with
+EXTRACT_WORKERS = 0 (inline, GIL-bound threads) and then 1, 2, 4, ... worker
+processes up to the number of cores, and prints pages/s for each. With poppler
+installed it does the same for page rasterize + encode (the Vision fallback's CPU work).
+
+    python benchmarks/extraction_scaling.py --documents 32 --pages 10
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from harness import measure, save_baseline, setup_backend  # noqa: E402
+import synthetic  # noqa: E402
+
+
+def worker_counts():
+    counts, n = [0, 1], 2
+    cores = os.cpu_count() or 1
+    while n < cores:
+        counts.append(n)
+        n *= 2
+    if cores > 1:
+        counts.append(cores)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=32, help="PDFs extracted per measurement")
+    parser.add_argument("--pages", type=int, default=10, help="pages per PDF")
+    parser.add_argument("--save", metavar="PATH", help="write results as a JSON baseline")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        setup_backend(tmp, "http://127.0.0.1:9/v1")  # no OpenAI calls are made
+        import utils.text_processors as text_processors
+        from utils.extraction_pool import ExtractionPool, render_page
+
+        path = os.path.join(tmp, "report.pdf")
+        with open(path, "wb") as f:
+            f.write(synthetic.text_pdf(args.pages))
+        scanned_path = os.path.join(tmp, "scanned.pdf")
+        has_poppler = shutil.which("pdftoppm") is not None
+        if has_poppler:
+            with open(scanned_path, "wb") as f:
+                f.write(synthetic.scanned_pdf(4))
+
+        for workers in worker_counts():
+            pool = ExtractionPool(workers=workers)
+            text_processors.extraction_pool = pool
+            concurrency = max(2, 2 * workers)
+            results.append(measure(
+                f"pdfplumber_workers_{workers}", lambda i: text_processors.extract_text_from_pdf(path, "benchmark"),
+                args.documents, concurrency=concurrency, units_per_call=args.pages, unit="pages",
+            ))
+            if has_poppler:
+                results.append(measure(
+                    f"render_encode_workers_{workers}", lambda i: pool.run(render_page, scanned_path, i % 4 + 1, 300),
+                    args.documents, concurrency=concurrency, unit="pages",
+                ))
+            pool.shutdown()
+        if not has_poppler:
+            print("render_encode: skipped (poppler's pdftoppm is not installed)")
+
+    if args.save:
+        save_baseline(args.save, results, vars(args))
+        print(f"Baseline written to {args.save}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""Timing, memory sampling and baseline comparison shared by the benchmark scripts."""
+import json
+import os
+import platform
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+import psutil
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend")
+
+
+def setup_backend(tmp: str, openai_base_url: str):
+    """
+    Points the backend at a throwaway SQLite database, cache directory and the stub
+    OpenAI server, then makes its modules importable. Call before importing any of them.
+    """
+    os.environ.update({
+        "DATABASE_URL": f"sqlite:///{os.path.join(tmp, 'bench.sqlite')}",
+        "OPENAI_API_KEY": "benchmark",
+        "OPENAI_BASE_URL": openai_base_url,
+        "OPENAI_RPM": "0",  # the stub has no rate limits; measure the pipeline, not the limiter
+        "OPENAI_TPM": "0",
+        "OPENAI_HTTP2": "false",
+        "CACHE_DIR": os.path.join(tmp, "cache"),
+        "CACHE_BYPASS": "true",
+        "LOG_LEVEL": "WARNING",
+    })
+    sys.path.insert(0, BACKEND_DIR)
+
+    from database import engine
+    from models import orm_models
+    orm_models.Base.metadata.create_all(bind=engine)
+
+
+class PeakRSS:
+    """
+    Samples the RSS of this process plus its children (extraction pool workers) in a
+    background thread; `peak_mb` is the growth over the starting RSS.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.process = psutil.Process()
+        self.peak_mb = 0.0
+
+    def __enter__(self):
+        self._stop = threading.Event()
+        self._start = self._peak = self._rss()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def _rss(self) -> int:
+        total = self.process.memory_info().rss
+        for child in self.process.children(recursive=True):
+            try:
+                total += child.memory_info().rss
+            except psutil.Error:
+                pass  # exited between listing and sampling
+        return total
+
+    def _sample(self):
+        while not self._stop.is_set():
+            self._peak = max(self._peak, self._rss())
+            self._stop.wait(self.interval)
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self._peak = max(self._peak, self._rss())
+        self.peak_mb = (self._peak - self._start) / 2 ** 20
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Linear-interpolated percentile, q in [0, 100]."""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    position = (len(ordered) - 1) * q / 100
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+def measure(name: str, fn: Callable[[int], object], iterations: int, concurrency: int = 1,
+            warmup: int = 1, units_per_call: int = 1, unit: str = "calls") -> dict:
+    """
+    Calls `fn(i)` `iterations` times (on `concurrency` threads) after `warmup`
+    untimed calls and returns throughput, latency percentiles and peak RSS growth.
+    `units_per_call` scales throughput, e.g. rows inserted per call.
+    """
+    for i in range(warmup):
+        fn(-1 - i)
+
+    latencies: List[float] = []
+
+    def timed(i):
+        started = time.perf_counter()
+        fn(i)
+        latencies.append(time.perf_counter() - started)
+
+    with PeakRSS() as memory:
+        started = time.perf_counter()
+        if concurrency > 1:
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                list(pool.map(timed, range(iterations)))
+        else:
+            for i in range(iterations):
+                timed(i)
+        elapsed = time.perf_counter() - started
+
+    result = {
+        "name": name,
+        "iterations": iterations,
+        "concurrency": concurrency,
+        "throughput": iterations * units_per_call / elapsed,
+        "throughput_unit": f"{unit}/s",
+        "p50_ms": 1000 * percentile(latencies, 50),
+        "p95_ms": 1000 * percentile(latencies, 95),
+        "p99_ms": 1000 * percentile(latencies, 99),
+        "mean_ms": 1000 * sum(latencies) / len(latencies),
+        "peak_rss_mb": memory.peak_mb,
+    }
+    print(f"{name:<34} {result['throughput']:10.1f} {result['throughput_unit']:<10} "
+          f"p50 {result['p50_ms']:8.1f}ms  p95 {result['p95_ms']:8.1f}ms  p99 {result['p99_ms']:8.1f}ms  "
+          f"peak +{result['peak_rss_mb']:6.1f}MB")
+    return result
+
+
+def save_baseline(path: str, results: List[dict], settings: dict):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({
+            "created_at": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "settings": settings,
+            "results": {result["name"]: result for result in results},
+        }, f, indent=2)
+
+
+def compare_baseline(path: str, results: List[dict], tolerance: float) -> List[str]:
+    """
+    Compares results with a saved baseline; returns a description of every metric
+    that got worse by more than `tolerance` (0.2 = 20%). Memory growth below 5 MB is ignored as noise.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        baseline: Dict[str, dict] = json.load(f)["results"]
+
+    regressions = []
+    for result in results:
+        before: Optional[dict] = baseline.get(result["name"])
+        if before is None:
+            continue
+        if result["throughput"] < before["throughput"] * (1 - tolerance):
+            regressions.append(f"{result['name']}: throughput {before['throughput']:.1f} -> {result['throughput']:.1f}")
+        for key in ("p50_ms", "p95_ms"):
+            if result[key] > before[key] * (1 + tolerance):
+                regressions.append(f"{result['name']}: {key} {before[key]:.1f} -> {result[key]:.1f}")
+        if result["peak_rss_mb"] > max(before["peak_rss_mb"] * (1 + tolerance), before["peak_rss_mb"] + 5):
+            regressions.append(f"{result['name']}: peak_rss_mb {before['peak_rss_mb']:.1f} -> {result['peak_rss_mb']:.1f}")
+    return regressions
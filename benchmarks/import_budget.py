@@ -0,0 +1,101 @@
+"""
+Import-time budget for the API process.
+
+Imports backend `main` in fresh interpreters under `python -X importtime` with no
+OPENAI_API_KEY and a database URL that doesn't exist yet, and checks that:
+
+  * the median cumulative import time of `main` stays under `--budget-ms`
+  * none of the heavy extraction / analytics modules (openai, pdfplumber, pdf2image,
+    PIL, pandas, numpy, pyarrow) are loaded; they must be imported on first use
+  * importing has no side effects: the database file and upload directory are not created
+
+Prints the heaviest imports under `main` and exits with code 1 when a check fails.
+
+    python benchmarks/import_budget.py --budget-ms 1500 --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend")
+
+LAZY_MODULES = ["openai", "pdfplumber", "pdf2image", "PIL", "pandas", "numpy", "pyarrow"]
+
+# Runs inside the measured interpreter; reports which lazy modules the import pulled in
+PROBE = f"import json, sys; import main; print(json.dumps([m for m in {LAZY_MODULES!r} if m in sys.modules]))"
+
+
+def import_once(tmp: str):
+    """One fresh `import main`: (cumulative µs of main and of each of its imports, lazy modules loaded)."""
+    env = {key: value for key, value in os.environ.items() if key != "OPENAI_API_KEY"}
+    env.update({
+        "DATABASE_URL": f"sqlite:///{os.path.join(tmp, 'never-created.sqlite')}",
+        "UPLOAD_DIR": os.path.join(tmp, "uploads"),
+        "PYTHONPATH": os.path.abspath(BACKEND_DIR),
+    })
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", PROBE], cwd=tmp, env=env,
+                            capture_output=True, text=True)
+    if result.returncode:
+        errors = [line for line in result.stderr.splitlines() if not line.startswith("import time:")]
+        sys.exit("import main failed:\n" + "\n".join(errors[-20:]))
+
+    entries = []  # (depth, module, cumulative µs), children listed before their parent
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        entries.append(((len(name) - len(name.lstrip()) - 1) // 2, name.strip(), int(cumulative)))
+    position = max(i for i, (depth, name, _) in enumerate(entries) if depth == 0 and name == "main")
+    timings = {"main": entries[position][2]}
+    # main's direct imports are the depth-1 entries between the previous top-level import and main
+    for depth, name, cumulative in reversed(entries[:position]):
+        if depth == 0:
+            break
+        if depth == 1:
+            timings[name] = cumulative
+    return timings, json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget-ms", type=float, default=1500, help="allowed median import time of main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=8, help="heaviest imports to list")
+    args = parser.parse_args()
+
+    failures = []
+    with tempfile.TemporaryDirectory() as tmp:
+        import_once(tmp)  # warm-up, so byte-compiling isn't measured
+        runs = [import_once(tmp) for _ in range(args.runs)]
+        created = sorted(os.listdir(tmp))
+
+    totals = [timings["main"] / 1000 for timings, _ in runs]
+    median = statistics.median(totals)
+    timings, loaded = runs[totals.index(sorted(totals)[len(totals) // 2])]
+
+    print(f"import main: median {median:.0f} ms over {args.runs} runs "
+          f"(min {min(totals):.0f}, max {max(totals):.0f}), budget {args.budget_ms:.0f} ms")
+    heaviest = sorted(((us, name) for name, us in timings.items() if name != "main"), reverse=True)[:args.top]
+    for us, name in heaviest:
+        print(f"  {us / 1000:8.1f} ms  {name}")
+
+    if median > args.budget_ms:
+        failures.append(f"import time {median:.0f} ms is over the {args.budget_ms:.0f} ms budget")
+    if loaded:
+        failures.append(f"heavy modules loaded at import: {', '.join(loaded)}")
+    if created:
+        failures.append(f"importing created files: {', '.join(created)}")
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    if not failures:
+        print("ok   no heavy modules loaded, no files created")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
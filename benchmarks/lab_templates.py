@@ -0,0 +1,99 @@
+"""
+Lab templates against sample report text.
+
+Runs the templates in backend/lab_templates on the reports in
+benchmarks/fixtures/lab_templates and checks (exit code 1 otherwise) that:
+
+  * each sample is parsed by the expected template into exactly the expected tests
+    and patient details, without the LLM
+  * a sample with a qualified value ("< 5") is not parsed, so it goes to the LLM
+  * the compaction fixture of the same lab is not parsed either: its urine section has
+    qualitative results and its TSH value is wrapped onto the next line, which the
+    template's row pattern can't read
+
+    python benchmarks/lab_templates.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from harness import BACKEND_DIR  # noqa: E402
+
+sys.path.insert(0, BACKEND_DIR)
+
+from utils.templates import TemplateRegistry, parse_number  # noqa: E402
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# sample -> (template, patient name, age, test date, [(test, value, unit, range)])
+EXPECTED = {
+    "diagnostiko_thessalonikis.txt": ("diagnostiko-thessalonikis", "ΙΩΑΝΝΙΔΟΥ ΜΑΡΙΑ", 38, "05-09-2024", [
+        ("Glucose", 91.0, "mg/dl", "70 - 110"),
+        ("Urea", 28.0, "mg/dl", "10 - 50"),
+        ("Creatinine", 0.7, "mg/dl", "0,5 - 1,1"),
+        ("Total Cholesterol", 186.0, "mg/dl", "< 200"),
+        ("HDL", 62.0, "mg/dl", "> 40"),
+        ("LDL", 104.0, "mg/dl", "< 130"),
+        ("Triglycerides", 98.0, "mg/dl", "< 150"),
+        ("Iron", 71.0, "µg/dl", "50 - 170"),
+        ("Ferritin", 38.0, "ng/ml", "13 - 150"),
+        ("Hemoglobin", 13.2, "g/dl", "12,0 - 16,0"),
+        ("Hematocrit", 39.8, "%", "36 - 46"),
+        ("WBC", 7.15, "10^3/µl", "4,0 - 10,5"),
+        ("Platelets", 268.0, "10^3/µl", "150 - 400"),
+        ("TSH", 1.8, "µIU/ml", "0,4 - 4,0"),
+    ]),
+}
+
+NUMBERS = {"4,5": 4.5, "4.5": 4.5, "1.234,5": 1234.5, "-2": -2.0, "< 5": None, ">90": None, "Αρνητικό": None}
+
+
+def read(*parts: str) -> str:
+    with open(os.path.join(FIXTURE_DIR, *parts), encoding="utf-8") as f:
+        return f.read()
+
+
+def main():
+    registry = TemplateRegistry(enabled=True)
+    failures = []
+
+    for text, expected in NUMBERS.items():
+        if parse_number(text) != expected:
+            failures.append(f"parse_number({text!r}) = {parse_number(text)!r}, expected {expected!r}")
+
+    for sample, (template, name, age, test_date, tests) in EXPECTED.items():
+        raw_text = read("lab_templates", sample)
+        hits = dict(registry.hits_by_template)
+        result = registry.parse(raw_text)
+        if result is None:
+            failures.append(f"{sample}: not parsed by any template")
+            continue
+        if registry.hits_by_template.get(template, 0) != hits.get(template, 0) + 1:
+            failures.append(f"{sample}: not parsed by {template}")
+        info = result.personal_info
+        if (info.name, info.age, info.test_date) != (name, age, test_date):
+            failures.append(f"{sample}: patient {(info.name, info.age, info.test_date)}")
+        parsed = [(test.test_name, test.value, test.unit, test.normal_range) for test in result.test_results]
+        if parsed != tests:
+            failures.append(f"{sample}: tests differ, missing {[t for t in tests if t not in parsed]}, "
+                            f"unexpected {[t for t in parsed if t not in tests]}")
+        print(f"{sample}: {len(parsed)} tests for {info.name}, {info.test_date}")
+
+        qualified = raw_text.replace("Φερριτίνη                            38", "Φερριτίνη                           < 5")
+        if qualified == raw_text or registry.parse(qualified) is not None:
+            failures.append(f"{sample}: a qualified value (< 5) was parsed instead of going to the LLM")
+
+    if registry.parse(read("compaction", "greek_text_layer.txt")) is not None:
+        failures.append("greek_text_layer.txt: parsed although rows the template can't read would be lost")
+
+    print(f"template stats: {registry.stats()}")
+    for failure in failures:
+        print(f"FAIL {failure}")
+    if not failures:
+        print("ok   samples parsed as expected; qualified values and unreadable rows go to the LLM")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Load test for the session read endpoints against SQLite.
+
+Compares the async request path (AsyncSession via `get_db`) with the previous
+sync path (a plain Session per request, run in FastAPI's threadpool) under
+concurrent clients, and prints requests/sec for each.
+
+    python benchmarks/load_sessions.py --sessions 2000 --requests 2000 --concurrency 50
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend")
+
+
+def setup_database(path: str, sessions: int, tests_per_session: int):
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+    sys.path.insert(0, BACKEND_DIR)
+
+    from database import engine, SessionLocal
+    from models import orm_models
+    orm_models.Base.metadata.create_all(bind=engine)
+
+    db = SessionLocal()
+    user = orm_models.User(name="Benchmark User")
+    db.add(user)
+    db.flush()
+    start = datetime(2015, 1, 1)
+    for i in range(sessions):
+        session = orm_models.TestSession(user_id=user.user_id, test_date=start + timedelta(days=i))
+        db.add(session)
+        db.flush()
+        db.add_all(orm_models.BloodTest(session_id=session.session_id, test_name=f"Test {j}", value=j, unit="mg/dL")
+                   for j in range(tests_per_session))
+    db.commit()
+    db.close()
+
+
+def sync_app():
+    """The pre-async handlers: a sync Session per request, run in the threadpool."""
+    from fastapi import Depends, FastAPI
+    from sqlalchemy.orm import Session
+    from database import SessionLocal
+    from models import orm_models
+
+    def get_sync_db():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app = FastAPI()
+
+    @app.get("/sessions/")
+    def get_sessions(limit: int = 50, db: Session = Depends(get_sync_db)):
+        return db.query(orm_models.TestSession).order_by(orm_models.TestSession.test_date.desc()).limit(limit).all()
+
+    @app.get("/sessions/{session_id}")
+    def get_session_details(session_id: int, db: Session = Depends(get_sync_db)):
+        session = db.query(orm_models.TestSession).filter_by(session_id=session_id).first()
+        tests = db.query(orm_models.BloodTest).filter_by(session_id=session_id).all()
+        return {"session_id": session.session_id, "test_date": session.test_date, "blood_tests": tests}
+
+    return app
+
+
+def async_app():
+    from fastapi import FastAPI
+    from routers import sessions
+    app = FastAPI()
+    app.include_router(sessions.router)
+    return app
+
+
+async def run_load(app, total: int, concurrency: int, session_count: int) -> float:
+    import httpx
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        counter = iter(range(total))
+
+        async def client_loop():
+            for i in counter:
+                url = "/sessions/?limit=50" if i % 2 else f"/sessions/{i % session_count + 1}"
+                response = await client.get(url)
+                response.raise_for_status()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+        return total / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=2000)
+    parser.add_argument("--tests-per-session", type=int, default=30)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        setup_database(os.path.join(tmp, "bench.sqlite"), args.sessions, args.tests_per_session)
+        for name, app in (("sync (threadpool)", sync_app()), ("async (AsyncSession)", async_app())):
+            rps = asyncio.run(run_load(app, args.requests, args.concurrency, args.sessions))
+            print(f"{name:<22} {rps:8.1f} req/s  ({args.requests} requests, concurrency {args.concurrency})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Corpus of mixed digital/scanned PDFs for the per-page OCR decision.
+
+Writes one PDF per layout in synthetic.MIXED_LAYOUTS (T = text page, S = scan,
+F = scan with a printed footer, C = sparse cover, B = blank) plus expected.json,
+and checks that pages_to_ocr picks exactly the scanned pages (exit code 1 on a
+mismatch). With poppler installed it also runs extract_text_from_pdf against the
+stub OpenAI server and compares Vision calls and latency with OCR'ing every page.
+
+    python benchmarks/mixed_corpus.py [--out DIR] [--latency 0.2]
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from harness import setup_backend  # noqa: E402
+from stub_openai import start_stub  # noqa: E402
+import synthetic  # noqa: E402
+
+
+def write_corpus(directory: str) -> dict:
+    os.makedirs(directory, exist_ok=True)
+    expected = {}
+    for layout in synthetic.MIXED_LAYOUTS:
+        filename = f"mixed_{layout}.pdf"
+        with open(os.path.join(directory, filename), "wb") as f:
+            f.write(synthetic.layout_pdf(layout))
+        expected[filename] = [page for page, kind in enumerate(layout, 1) if synthetic.PAGE_KINDS[kind]]
+    with open(os.path.join(directory, "expected.json"), "w", encoding="utf-8") as f:
+        json.dump(expected, f, indent=2)
+    return expected
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", help="keep the corpus in this directory")
+    parser.add_argument("--latency", type=float, default=0.2, help="stub OpenAI seconds per response")
+    args = parser.parse_args()
+
+    server, base_url = start_stub(args.latency)
+    failures = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        setup_backend(tmp, base_url)
+        from utils.extraction_pool import analyze_pages
+        from utils.text_processors import extract_text_from_pdf, extract_text_with_vision, pages_to_ocr
+
+        directory = args.out or os.path.join(tmp, "corpus")
+        expected = write_corpus(directory)
+        has_poppler = shutil.which("pdftoppm") is not None
+
+        for filename, expected_pages in expected.items():
+            path = os.path.join(directory, filename)
+            chosen = pages_to_ocr(analyze_pages(path))
+            ok = chosen == expected_pages
+            failures += not ok
+            line = f"{'ok  ' if ok else 'FAIL'} {filename:<18} OCR pages {chosen} (expected {expected_pages})"
+
+            if has_poppler:
+                calls, started = server.calls, time.perf_counter()
+                extract_text_from_pdf(path, "benchmark")
+                per_page = (server.calls - calls, time.perf_counter() - started)
+                calls, started = server.calls, time.perf_counter()
+                extract_text_with_vision(path, "benchmark")
+                every_page = (server.calls - calls, time.perf_counter() - started)
+                line += (f"  vision calls {per_page[0]} vs {every_page[0]}, "
+                         f"{per_page[1]:.2f}s vs {every_page[1]:.2f}s")
+            print(line)
+
+        if not has_poppler:
+            print("Vision comparison skipped (poppler's pdftoppm is not installed)")
+    server.shutdown()
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
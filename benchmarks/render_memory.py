@@ -0,0 +1,106 @@
+"""
+Peak memory of the Vision path as the page count grows, without poppler or the network.
+
+Runs ocr_pdf_pages over documents of increasing page counts with the real
+render_page / encode_image (pdf2image's rasterizer replaced by copies of a noisy
+full-size page, the extraction pool inline) and a stub client passed through
+`client=`. At most `--concurrency` pages are in flight, so peak RSS must not grow
+with the page count: the largest document may peak at most `--slack-mb` above the
+smallest (exit code 1 otherwise). The default slack is what one page adds at its
+peak, since whether concurrent pages peak together depends on timing; keeping
+anything per page (an encoded page is a few MB) exceeds it.
+
+Page peaks last milliseconds, so it reads the kernel's peak RSS (VmHWM, reset
+through /proc/self/clear_refs; Linux only) instead of sampling, and OCRs smaller
+documents repeatedly so every measurement covers the same number of pages. It
+re-runs itself with glibc's mmap threshold fixed at 128 KiB so freed page buffers
+go back to the OS and the peak reflects live memory, not heap fragmentation.
+
+    python benchmarks/render_memory.py --pages 4 16 64 --concurrency 4 --dpi 200
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from harness import setup_backend  # noqa: E402
+from vision_concurrency import DelayedClient  # noqa: E402
+
+
+def status_mb(field: str) -> float:
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith(field + ":"):
+                return int(line.split()[1]) / 1024
+    raise KeyError(field)
+
+
+def reset_peak_rss():
+    with open("/proc/self/clear_refs", "w") as clear_refs:
+        clear_refs.write("5")  # resets VmHWM to the current RSS
+
+
+def main():
+    if "MALLOC_MMAP_THRESHOLD_" not in os.environ:
+        os.environ["MALLOC_MMAP_THRESHOLD_"] = "131072"
+        os.execv(sys.executable, [sys.executable] + sys.argv)
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, nargs="+", default=[4, 16, 64])
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--dpi", type=int, default=200)
+    parser.add_argument("--slack-mb", type=float,
+                        help="allowed peak growth over the smallest document (default: one page's peak)")
+    args = parser.parse_args()
+    size = (int(8.5 * args.dpi), int(11 * args.dpi))  # a letter page
+
+    with tempfile.TemporaryDirectory() as tmp:
+        setup_backend(tmp, "http://127.0.0.1:9")  # never contacted: the client is passed in
+        import pdf2image
+        from PIL import Image
+        from utils import text_processors
+        from utils.extraction_pool import ExtractionPool
+
+        noise = Image.merge("RGB", [Image.effect_noise(size, sigma) for sigma in (40, 60, 80)])
+
+        def convert_from_path(pdf_path, dpi, first_page, last_page):
+            return [noise.copy()]
+
+        pdf2image.convert_from_path = convert_from_path
+        text_processors.extraction_pool = ExtractionPool(workers=0)
+
+        def ocr(pages):
+            texts = text_processors.ocr_pdf_pages("scan.pdf", "benchmark", list(range(1, pages + 1)),
+                                                  args.concurrency, client=DelayedClient(0.01))
+            assert len(texts) == pages
+
+        # Peaks are measured from the RSS before any page, not from each run's start, which
+        # depends on how much the allocator kept from the previous run
+        baseline = status_mb("VmRSS")
+        # Warm up at the largest size so allocator arenas and imports are in place before measuring
+        ocr(max(args.pages))
+        reset_peak_rss()
+        start = status_mb("VmRSS")
+        ocr(1)
+        slack_mb = args.slack_mb if args.slack_mb is not None else status_mb("VmHWM") - start
+        peaks = {}
+        for pages in sorted(args.pages):
+            reset_peak_rss()
+            for _ in range(-(-max(args.pages) // pages)):
+                ocr(pages)
+            peaks[pages] = status_mb("VmHWM") - baseline
+
+    smallest = peaks[min(peaks)]
+    failures = 0
+    for pages, peak in peaks.items():
+        ok = peak <= smallest + slack_mb
+        failures += not ok
+        print(f"{'ok  ' if ok else 'FAIL'} {pages:4d} pages  peak RSS +{peak:6.1f}MB  "
+              f"(smallest +{smallest:.1f}MB, slack {slack_mb:.0f}MB)")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
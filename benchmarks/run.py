@@ -0,0 +1,274 @@
+"""
+Benchmark suite for the ingestion pipeline and the read API.
+
+Generates synthetic text-layer and scanned PDFs, starts a stub OpenAI server
+with configurable latency and drives the real code against a throwaway SQLite
+database. For each benchmark it reports throughput, p50/p95/p99 latency and
+peak RSS growth:
+
+  extract    extract_text_from_pdf on text PDFs of 1/5/20 pages
+  vision     extract_text_with_vision on scanned PDFs (rasterize + encode + OCR; needs poppler)
+  structure  process_pdf_with_openai through the pooled client
+  upload     POST /upload/ until the job is done, via TestClient
+  sessions   GET /sessions/ (first and deep keyset pages) and /sessions/{id} (200 and 304)
+  metrics    GET /metrics/{name}/series vs the old one-request-per-session fan-out
+  analytics  GET /users/{id}/analytics for 500 sessions x 60 tests, computed and cached
+  persist    persist_results per report vs persist_many in one transaction (rows/s)
+
+The analytics group also fails the run (exit code 1) when the computed p50 is
+over --analytics-budget-ms.
+
+Save a baseline, then compare later runs against it (exit code 1 on regression):
+
+    python benchmarks/run.py --quick --save benchmarks/baseline.json
+    python benchmarks/run.py --quick --compare benchmarks/baseline.json --tolerance 0.25
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from harness import compare_baseline, measure, save_baseline, setup_backend  # noqa: E402
+from stub_openai import start_stub  # noqa: E402
+import synthetic  # noqa: E402
+
+GROUPS = ["extract", "vision", "structure", "upload", "sessions", "metrics", "analytics", "persist"]
+
+
+def write_pdf(directory: str, name: str, data: bytes) -> str:
+    path = os.path.join(directory, name)
+    with open(path, "wb") as f:
+        f.write(data)
+    return path
+
+
+def bench_extract(args, tmp):
+    from utils.text_processors import extract_text_from_pdf
+    results = []
+    for pages in args.page_counts:
+        path = write_pdf(tmp, f"text_{pages}.pdf", synthetic.text_pdf(pages))
+        results.append(measure(f"extract_text_pdf_{pages}p", lambda i: extract_text_from_pdf(path, "benchmark"),
+                               args.iterations, units_per_call=pages, unit="pages"))
+    return results
+
+
+def bench_vision(args, tmp):
+    if shutil.which("pdftoppm") is None:
+        print("vision: skipped (poppler's pdftoppm is not installed)")
+        return []
+    from utils.text_processors import extract_text_with_vision
+    results = []
+    for pages in args.page_counts[:2]:
+        path = write_pdf(tmp, f"scanned_{pages}.pdf", synthetic.scanned_pdf(pages))
+        results.append(measure(f"vision_extract_{pages}p", lambda i: extract_text_with_vision(path, "benchmark"),
+                               max(2, args.iterations // 4), units_per_call=pages, unit="pages"))
+    return results
+
+
+def bench_structure(args, tmp):
+    from utils.text_processors import process_pdf_with_openai
+    raw_text = "\n".join(line for page in range(1, 3) for line in synthetic.report_lines(page))
+    return [
+        measure(f"structure_llm_c{concurrency}", lambda i: process_pdf_with_openai(raw_text, "benchmark"),
+                args.iterations, concurrency=concurrency)
+        for concurrency in (1, args.concurrency)
+    ]
+
+
+def bench_upload(args, tmp, client):
+    data = synthetic.text_pdf(2)
+
+    def upload(i):
+        response = client.post("/upload/", files={"file": ("report.pdf", data, "application/pdf")})
+        response.raise_for_status()
+        job_id = response.json()["job_id"]
+        while True:
+            status = client.get(f"/jobs/{job_id}").json()["status"]
+            if status in ("done", "failed"):
+                if status == "failed":
+                    raise RuntimeError(f"upload job {job_id} failed")
+                return
+            time.sleep(0.005)
+
+    return [measure("upload_to_persisted", upload, args.iterations, concurrency=min(args.concurrency, 4))]
+
+
+def bench_sessions(args, tmp, client, user_id):
+    from routers.sessions import encode_cursor
+    first = client.get(f"/sessions/?user_id={user_id}&limit=1").json()["items"][0]
+    newest_id = first["session_id"]
+    # Keyset cursor near the oldest sessions: the page an OFFSET query would have to scan the most for
+    deep_cursor = encode_cursor(datetime(2000, 1, 1) + timedelta(days=100), newest_id - args.sessions + 101)
+    etags = {}
+
+    def detail(i):
+        session_id = newest_id - random.randrange(args.sessions)
+        client.get(f"/sessions/{session_id}").raise_for_status()
+
+    def detail_cached(i):
+        session_id = newest_id - (i % 100)
+        headers = {"If-None-Match": etags[session_id]} if session_id in etags else {}
+        response = client.get(f"/sessions/{session_id}", headers=headers)
+        etags[session_id] = response.headers["etag"]
+
+    return [
+        measure(f"sessions_first_page_{args.sessions}",
+                lambda i: client.get(f"/sessions/?user_id={user_id}&limit=50").raise_for_status(),
+                args.requests, concurrency=args.concurrency),
+        measure(f"sessions_deep_page_{args.sessions}",
+                lambda i: client.get(f"/sessions/?user_id={user_id}&limit=50&cursor={deep_cursor}").raise_for_status(),
+                args.requests, concurrency=args.concurrency),
+        measure("session_detail", detail, args.requests, concurrency=args.concurrency),
+        measure("session_detail_etag_304", detail_cached, args.requests),
+    ]
+
+
+def bench_metrics(args, tmp, client, user_id):
+    start = (datetime(2000, 1, 1) + timedelta(days=args.sessions - 100)).date()
+
+    def series(i):
+        client.get(f"/metrics/Glucose/series?user_id={user_id}&start={start}").raise_for_status()
+
+    def fan_out(i):
+        # What the trend view did before the series endpoint: list, then fetch every session
+        items = client.get(f"/sessions/?user_id={user_id}&limit=100").json()["items"]
+        for item in items:
+            client.get(f"/sessions/{item['session_id']}").raise_for_status()
+
+    return [
+        measure("metric_series_100_points", series, args.requests // 4),
+        measure("metric_fan_out_100_sessions", fan_out, max(2, args.requests // 40)),
+    ]
+
+
+def bench_analytics(args, tmp, client):
+    from utils.analytics import analytics_cache
+    user_id = synthetic.seed_sessions(500, tests_per_session=60)
+
+    def computed(i):
+        analytics_cache.invalidate(user_id)
+        client.get(f"/users/{user_id}/analytics").raise_for_status()
+
+    def cached(i):
+        client.get(f"/users/{user_id}/analytics").raise_for_status()
+
+    return [
+        measure("user_analytics_500x60", computed, max(10, args.requests // 10)),
+        measure("user_analytics_500x60_cached", cached, args.requests, concurrency=args.concurrency),
+    ]
+
+
+def bench_persist(args, tmp):
+    from database import SessionLocal
+    from models.data_models import BloodTest, BloodTestResults, PersonalMetadata
+    from utils.persistence import persist_many, persist_results
+
+    def report(i):
+        return BloodTestResults(
+            personal_info=PersonalMetadata(name=f"Persist User {i % 10}", test_date="01-01-2024"),
+            test_results=[BloodTest(test_name=f"Analyte {j}", value=j, unit="mg/dL", normal_range="70-110")
+                          for j in range(30)],
+        )
+
+    reports = [report(i) for i in range(50)]
+
+    def one(i):
+        db = SessionLocal()
+        try:
+            persist_results(db, reports[i % len(reports)])
+        finally:
+            db.close()
+
+    def many(i):
+        db = SessionLocal()
+        try:
+            persist_many(db, reports)
+        finally:
+            db.close()
+
+    return [
+        measure("persist_results_per_report", one, args.iterations * 5, units_per_call=30, unit="rows"),
+        measure("persist_many_50_reports", many, args.iterations, units_per_call=50 * 30, unit="rows"),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", nargs="+", choices=GROUPS, default=GROUPS)
+    parser.add_argument("--quick", action="store_true", help="small sizes, for CI and local checks")
+    parser.add_argument("--latency", type=float, default=0.05, help="stub OpenAI seconds per response")
+    parser.add_argument("--iterations", type=int, help="calls per pipeline benchmark")
+    parser.add_argument("--requests", type=int, help="HTTP requests per read benchmark")
+    parser.add_argument("--sessions", type=int, help="sessions seeded for the read benchmarks")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--save", metavar="PATH", help="write results as a JSON baseline")
+    parser.add_argument("--compare", metavar="PATH", help="compare with a JSON baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative regression")
+    parser.add_argument("--analytics-budget-ms", type=float, default=100.0,
+                        help="p50 budget for computed user analytics (500 sessions x 60 tests)")
+    args = parser.parse_args()
+    args.iterations = args.iterations or (8 if args.quick else 40)
+    args.requests = args.requests or (200 if args.quick else 2000)
+    args.sessions = args.sessions or (1000 if args.quick else 10000)
+    args.page_counts = [1, 5] if args.quick else [1, 5, 20]
+    random.seed(0)
+
+    server, base_url = start_stub(args.latency)
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        setup_backend(tmp, base_url)
+        for group, bench in (("extract", bench_extract), ("vision", bench_vision),
+                             ("structure", bench_structure), ("persist", bench_persist)):
+            if group in args.only:
+                results += bench(args, tmp)
+
+        if {"upload", "sessions", "metrics", "analytics"} & set(args.only):
+            from fastapi.testclient import TestClient
+            import main as app_module
+            from routers import upload
+            upload.UPLOAD_DIR = os.path.join(tmp, "uploads")
+            os.makedirs(upload.UPLOAD_DIR, exist_ok=True)
+            with TestClient(app_module.app) as client:
+                if "upload" in args.only:
+                    results += bench_upload(args, tmp, client)
+                if {"sessions", "metrics"} & set(args.only):
+                    user_id = synthetic.seed_sessions(args.sessions)
+                    if "sessions" in args.only:
+                        results += bench_sessions(args, tmp, client, user_id)
+                    if "metrics" in args.only:
+                        results += bench_metrics(args, tmp, client, user_id)
+                if "analytics" in args.only:
+                    results += bench_analytics(args, tmp, client)
+    server.shutdown()
+
+    failed = False
+    for result in results:
+        if result["name"] == "user_analytics_500x60" and result["p50_ms"] > args.analytics_budget_ms:
+            print(f"OVER BUDGET user_analytics_500x60 p50 {result['p50_ms']:.1f} ms "
+                  f"> {args.analytics_budget_ms:.0f} ms")
+            failed = True
+
+    settings = {key: value for key, value in vars(args).items() if key not in ("save", "compare")}
+    if args.save:
+        save_baseline(args.save, results, settings)
+        print(f"Baseline written to {args.save}")
+    if args.compare:
+        regressions = compare_baseline(args.compare, results, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            failed = True
+        else:
+            print(f"No regressions beyond {args.tolerance:.0%} against {args.compare}")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
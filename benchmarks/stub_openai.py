@@ -0,0 +1,189 @@
+"""
+Minimal stand-in for the OpenAI chat completions endpoint, for benchmarks.
+
+Answers Vision OCR requests with synthetic page text and structuring requests
+(those with a `response_format`) with a BloodTestResults JSON built from the
+"<name> <value> <unit> <range>" rows of the prompt, after a configurable delay
+(fixed per response plus, optionally, per generated token).
+Point the backend at it with OPENAI_BASE_URL=<url>.
+
+Also implements enough of the Files and Batch APIs for utils.openai_batch: uploaded
+"batch" files are kept in memory, a batch answers every request of its input file
+without delay and reports "in_progress" once before "completed".
+
+    python benchmarks/stub_openai.py --port 8765 --latency 0.5
+"""
+import argparse
+import email.parser
+import email.policy
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROW = re.compile(r"^(?P<name>[A-Za-z][\w\- ]*?) (?P<value>\d+(?:\.\d+)?) (?P<unit>\S+) (?P<range>\d\S*)$")
+
+OCR_PAGE_TEXT = "\n".join(f"Analyte {i} {90 + i}.0 mg/dL 70-110" for i in range(25))
+
+
+def structured_content(prompt: str) -> str:
+    tests = [
+        {"test_name": m["name"], "value": float(m["value"]), "unit": m["unit"], "normal_range": m["range"]}
+        for m in (ROW.match(line.strip()) for line in prompt.splitlines()) if m
+    ]
+    return json.dumps({
+        "personal_info": {"name": "Benchmark Patient", "age": 40, "weight": None, "height": None,
+                          "location": "Benchmark Lab", "test_date": "01-01-2024"},
+        "test_results": tests,
+        "errors": None,
+    })
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+    latency = 0.0
+    jitter = 0.0
+    token_latency = 0.0
+
+    def do_POST(self):
+        data = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.path.endswith("/files"):
+            self._upload_file(data)
+            return
+        body = json.loads(data or b"{}")
+        if self.path.endswith("/batches"):
+            self._create_batch(body)
+            return
+        if not self.path.endswith("/chat/completions"):
+            self._send(404, {"error": {"message": f"stub does not implement {self.path}"}})
+            return
+
+        with self.server.lock:
+            self.server.calls += 1
+        content, completion = self._completion(body)
+        time.sleep(self.latency + random.uniform(0, self.jitter) + self.token_latency * (len(content) // 4))
+        self._send(200, completion)
+
+    def do_GET(self):
+        parts = self.path.rstrip("/").split("/")
+        if parts[-2:-1] == ["batches"] and parts[-1] in self.server.batches:
+            with self.server.lock:
+                batch = self.server.batches[parts[-1]]
+                reported = dict(batch)
+                if batch["status"] == "in_progress":
+                    batch["status"] = "completed"  # one "in_progress" poll, then done
+            self._send(200, reported)
+        elif parts[-1] == "content" and parts[-2] in self.server.files:
+            self._send_bytes(200, self.server.files[parts[-2]], "application/octet-stream")
+        else:
+            self._send(404, {"error": {"message": f"stub does not implement {self.path}"}})
+
+    @staticmethod
+    def _completion(body: dict):
+        """(content, chat.completion response) for a chat completions request body."""
+        user_content = body["messages"][-1]["content"]
+        if "response_format" in body:
+            content = structured_content(user_content)
+        else:
+            content = OCR_PAGE_TEXT
+        prompt_tokens = len(json.dumps(body["messages"])) // 4
+        return content, {
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "gpt-4o"),
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": content}}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": len(content) // 4,
+                      "total_tokens": prompt_tokens + len(content) // 4},
+        }
+
+    def _upload_file(self, data: bytes):
+        message = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(
+            f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode("utf-8") + data)
+        content = next(part.get_payload(decode=True) for part in message.iter_parts()
+                       if part.get_param("name", header="Content-Disposition") == "file")
+        with self.server.lock:
+            file_id = f"file-stub-{len(self.server.files) + 1}"
+            self.server.files[file_id] = content
+            self.server.uploads += 1
+        self._send(200, {"id": file_id, "object": "file", "bytes": len(content), "created_at": int(time.time()),
+                         "filename": "input.jsonl", "purpose": "batch", "status": "processed"})
+
+    def _create_batch(self, body: dict):
+        lines = []
+        for line in self.server.files[body["input_file_id"]].decode("utf-8").splitlines():
+            if line.strip():
+                request = json.loads(line)
+                lines.append(json.dumps({
+                    "id": f"batch-req-{len(lines) + 1}",
+                    "custom_id": request["custom_id"],
+                    "response": {"status_code": 200, "request_id": f"req-{len(lines) + 1}",
+                                 "body": self._completion(request["body"])[1]},
+                    "error": None,
+                }))
+        with self.server.lock:
+            batch_id = f"batch-stub-{len(self.server.batches) + 1}"
+            output_file_id = f"file-stub-{len(self.server.files) + 1}"
+            self.server.files[output_file_id] = "\n".join(lines).encode("utf-8")
+            self.server.batches[batch_id] = {
+                "id": batch_id, "object": "batch", "endpoint": body["endpoint"],
+                "input_file_id": body["input_file_id"], "completion_window": body["completion_window"],
+                "status": "in_progress", "created_at": int(time.time()), "metadata": body.get("metadata"),
+                "output_file_id": output_file_id, "error_file_id": None,
+                "request_counts": {"total": len(lines), "completed": len(lines), "failed": 0},
+            }
+            reported = dict(self.server.batches[batch_id], status="validating")
+        self._send(200, reported)
+
+    def _send(self, status: int, payload: dict):
+        self._send_bytes(status, json.dumps(payload).encode("utf-8"), "application/json")
+
+    def _send_bytes(self, status: int, data: bytes, content_type: str):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub(latency: float = 0.0, jitter: float = 0.0, port: int = 0, token_latency: float = 0.0):
+    """
+    Starts the stub in a daemon thread; returns (server, base_url). `server.calls`
+    counts chat completion requests and `server.uploads` file uploads; `server.files`
+    (uploaded and batch output files) and `server.batches` are keyed by id. Call server.shutdown() when done.
+    """
+    handler = type("Handler", (StubHandler,), {"latency": latency, "jitter": jitter, "token_latency": token_latency})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    server.calls = 0  # chat completion requests received, for counting OCR/LLM calls
+    server.uploads = 0
+    server.files = {}
+    server.batches = {}
+    server.lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds per response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random seconds per response")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="seconds per generated token")
+    args = parser.parse_args()
+    server, url = start_stub(args.latency, args.jitter, args.port, args.token_latency)
+    print(f"Stub OpenAI API on {url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""Synthetic inputs for the benchmarks: text-layer, scanned and mixed PDFs, and seeded databases."""
+import random
+from datetime import datetime, timedelta
+from typing import List, Tuple
+
+ROWS_PER_PAGE = 25
+
+
+def report_lines(page: int, rows: int = ROWS_PER_PAGE) -> List[str]:
+    """One page of a lab report; rows use the "<name> <value> <unit> <range>" layout the stub OpenAI parses."""
+    lines = ["Synthetic Diagnostic Laboratory", f"Patient: Benchmark Patient    Date: 01/01/2024    Page {page}", ""]
+    for i in range(rows):
+        lines.append(f"Analyte-{page}-{i} {random.uniform(10, 200):.1f} mg/dL 70-110")
+    return lines
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _text_ops(lines: List[str], y: int = 800) -> str:
+    text = " ".join(f"({_escape(line)}) Tj T*" for line in lines)
+    return f"BT /F1 10 Tf 40 {y} Td 14 TL {text} ET"
+
+
+def _scan_jpeg(page: int, dpi: int) -> Tuple[bytes, int, int]:
+    """A rendered report page as a grayscale JPEG, like a scanner produces."""
+    from io import BytesIO
+    from PIL import Image, ImageDraw
+
+    size = (int(8.27 * dpi), int(11.69 * dpi))
+    image = Image.new("L", size, 255)
+    draw = ImageDraw.Draw(image)
+    for i, line in enumerate(report_lines(page)):
+        draw.text((dpi // 2, dpi // 2 + i * dpi // 6), line, fill=0)
+    # A little noise so rasterizing and JPEG encoding do representative work
+    for _ in range(2000):
+        draw.point((random.randrange(size[0]), random.randrange(size[1])), fill=random.randrange(256))
+    buffer = BytesIO()
+    image.save(buffer, format="JPEG", quality=80)
+    return buffer.getvalue(), size[0], size[1]
+
+
+# Page kinds for layout_pdf, and whether a page of that kind should be OCR'd in a mixed document
+PAGE_KINDS = {
+    "T": False,  # digital page with a full text layer
+    "S": True,   # scanned page: a full-page image, no text layer
+    "F": True,   # scanned page with a small printed footer in its text layer
+    "C": False,  # sparse digital cover page (a title, no image)
+    "B": False,  # blank page
+}
+
+
+def layout_pdf(layout: str, dpi: int = 150) -> bytes:
+    """
+    A PDF whose pages follow `layout`, one PAGE_KINDS letter per page, e.g. "CTSS"
+    for a cover, a digital page and two scans. Written by hand so no PDF library is needed.
+    """
+    objects: List[bytes] = [b"<< /Type /Catalog /Pages 2 0 R >>", b"",
+                            b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for page, kind in enumerate(layout, 1):
+        resources = "/Font << /F1 3 0 R >>"
+        ops = ""
+        if kind == "T":
+            ops = _text_ops(report_lines(page))
+        elif kind == "C":
+            ops = _text_ops(["Laboratory Results"], y=600)
+        elif kind in ("S", "F"):
+            jpeg, width, height = _scan_jpeg(page, dpi)
+            objects.append(f"<< /Type /XObject /Subtype /Image /Width {width} /Height {height} "
+                           f"/ColorSpace /DeviceGray /BitsPerComponent 8 /Filter /DCTDecode "
+                           f"/Length {len(jpeg)} >>\nstream\n".encode("latin-1") + jpeg + b"\nendstream")
+            resources += f" /XObject << /Im1 {len(objects)} 0 R >>"
+            ops = "q 595 0 0 842 0 0 cm /Im1 Do Q"
+            if kind == "F":
+                ops += " " + _text_ops([f"Page {page} of {len(layout)} - Synthetic Diagnostic Laboratory"], y=20)
+        elif kind != "B":
+            raise ValueError(f"unknown page kind {kind!r}")
+        objects.append(f"<< /Length {len(ops)} >>\nstream\n{ops}\nendstream".encode("latin-1"))
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Contents {len(objects)} 0 R "
+                       f"/Resources << {resources} >> >>".encode("latin-1"))
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(layout)} >>".encode("latin-1")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n".encode("latin-1") + body + b"\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    out += b"".join(f"{offset:010d} 00000 n \n".encode("latin-1") for offset in offsets)
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("latin-1")
+    return bytes(out)
+
+
+def text_pdf(pages: int) -> bytes:
+    """A PDF with a real text layer on every page (what pdfplumber reads)."""
+    return layout_pdf("T" * pages)
+
+
+def scanned_pdf(pages: int, dpi: int = 200) -> bytes:
+    """An image-only PDF with no text layer, so extraction falls back to Vision OCR."""
+    return layout_pdf("S" * pages, dpi)
+
+
+# Mixed documents: lab bundles often pair a digital cover/summary with scanned result pages
+MIXED_LAYOUTS = ["TS", "CSS", "TSTS", "CTFF", "TBS", "STTT", "FT"]
+
+
+def seed_sessions(sessions: int, tests_per_session: int = 30, test_name: str = "Glucose") -> int:
+    """
+    Bulk-inserts `sessions` test sessions for one user, each with `tests_per_session`
+    rows (the first named `test_name`, canonicalized). Returns the user id.
+    Backend modules must already be importable (see harness.setup_backend).
+    """
+    from sqlalchemy import insert
+    from database import SessionLocal
+    from models import orm_models
+    from utils.canonical import canonical_index
+    from utils.normalization import normalized_columns
+
+    db = SessionLocal()
+    try:
+        canonical_index.load(db)
+        names = [test_name] + [f"Analyte {j}" for j in range(1, tests_per_session)]
+        canonical_ids = canonical_index.resolve_many(names)
+        user = orm_models.User(name="Benchmark User")
+        db.add(user)
+        db.flush()
+        start = datetime(2000, 1, 1)
+        first_id = (db.query(orm_models.TestSession.session_id)
+                    .order_by(orm_models.TestSession.session_id.desc()).limit(1).scalar() or 0) + 1
+        for chunk_start in range(0, sessions, 1000):
+            chunk = range(chunk_start, min(chunk_start + 1000, sessions))
+            db.execute(insert(orm_models.TestSession), [
+                {"session_id": first_id + i, "user_id": user.user_id, "test_date": start + timedelta(days=i),
+                 "location": "Benchmark Lab"} for i in chunk
+            ])
+            db.execute(insert(orm_models.BloodTest), [
+                {"session_id": first_id + i, "test_name": name, "value": value,
+                 "unit": "mg/dL", "normal_range": "70-110", "canonical_id": canonical_ids[name],
+                 **normalized_columns(value, "mg/dL", "70-110")}
+                for i in chunk for name in names for value in (random.uniform(60, 140),)
+            ])
+        db.commit()
+        return user.user_id
+    finally:
+        db.close()
@@ -0,0 +1,96 @@
+"""
+Vision OCR concurrency check, without poppler or the network.
+
+Runs ocr_pdf_pages over prebuilt page images (the render step is replaced, the
+extraction pool runs inline) with a stub client passed through `client=` whose
+completions take a fixed delay. At each concurrency the wall time must be about
+ceil(pages / concurrency) x delay, the most calls in flight must be
+min(concurrency, pages) and the texts must come back in page order (exit code 1
+otherwise).
+
+    python benchmarks/vision_concurrency.py --pages 12 --concurrency 1 4 12 --delay 0.2
+"""
+import argparse
+import math
+import os
+import sys
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from harness import setup_backend  # noqa: E402
+
+
+class DelayedClient:
+    """Stands in for the OpenAI client: every completion sleeps `delay` and echoes its page marker."""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.in_flight = self.max_in_flight = 0
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, model, messages, **kwargs):
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(self.delay)
+            url = messages[1]["content"][1]["image_url"]["url"]
+            message = SimpleNamespace(content=f"text of image {url[-16:]}")
+            return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=12)
+    parser.add_argument("--concurrency", type=int, nargs="+", help="default: 1, 4 and --pages")
+    parser.add_argument("--delay", type=float, default=0.2, help="stub seconds per completion")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown over the ideal wall time")
+    args = parser.parse_args()
+    concurrencies = args.concurrency or [1, 4, args.pages]
+
+    failures = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        setup_backend(tmp, "http://127.0.0.1:9")  # never contacted: the client is passed in
+        from PIL import Image
+        from utils import text_processors
+        from utils.extraction_pool import ExtractionPool, encode_image
+
+        # One distinct prebuilt page per page number, so the order of the results can be checked
+        images = {
+            page: encode_image(Image.new("RGB", (600, 800), ((page * 37) % 256, (page * 91) % 256, 128)))
+            for page in range(1, args.pages + 1)
+        }
+        text_processors.render_page = lambda pdf_path, page_number, dpi: images[page_number]
+        text_processors.extraction_pool = ExtractionPool(workers=0)
+        expected_texts = [f"Page {page}:\ntext of image {images[page][-16:]}" for page in images]
+        # Warm up: the first call imports the openai package
+        text_processors.ocr_pdf_pages("scan.pdf", "benchmark", [1], 1, client=DelayedClient(0))
+
+        for concurrency in concurrencies:
+            client = DelayedClient(args.delay)
+            started = time.perf_counter()
+            texts = text_processors.ocr_pdf_pages("scan.pdf", "benchmark", list(images), concurrency, client=client)
+            seconds = time.perf_counter() - started
+
+            rounds = math.ceil(args.pages / concurrency)
+            ideal = rounds * args.delay
+            ok = (ideal <= seconds <= ideal * (1 + args.tolerance) + 0.05
+                  and client.max_in_flight == min(concurrency, args.pages)
+                  and texts == expected_texts)
+            failures += not ok
+            print(f"{'ok  ' if ok else 'FAIL'} concurrency {concurrency:3d}  {args.pages} pages in {seconds:5.2f}s  "
+                  f"ideal {rounds} x {args.delay:.2f}s = {ideal:5.2f}s  max in flight {client.max_in_flight}  "
+                  f"order {'ok' if texts == expected_texts else 'WRONG'}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
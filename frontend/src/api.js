@@ -12,8 +12,16 @@ export async function uploadFile(file) {
   return response.json();
 }
 
-export async function fetchSessions() {
-  const response = await fetch(`${API_URL}/sessions`);
+export async function fetchJobStatus(jobId) {
+  const response = await fetch(`${API_URL}/jobs/${jobId}`);
+  return response.json();
+}
+
+// Returns one page of sessions: { items, next_cursor }
+export async function fetchSessions(cursor = null, limit = 50) {
+  const params = new URLSearchParams({ limit });
+  if (cursor) params.append('cursor', cursor);
+  const response = await fetch(`${API_URL}/sessions?${params}`);
   return response.json();
 }
 
@@ -22,6 +30,15 @@ export async function fetchSessionDetails(sessionId) {
   return response.json();
 }
 
+export async function fetchMetricSeries(testName, params = {}) {
+  const query = new URLSearchParams(params).toString();
+  const response = await fetch(`${API_URL}/metrics/${encodeURIComponent(testName)}/series${query ? `?${query}` : ''}`);
+  if (!response.ok) {
+    throw new Error(`HTTP error! status: ${response.status}`);
+  }
+  return response.json();
+}
+
 export async function deleteSession(sessionId) {
   const response = await fetch(`${API_URL}/sessions/${sessionId}`, {
     method: 'DELETE',
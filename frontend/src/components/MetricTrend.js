@@ -1,6 +1,5 @@
 import React, { useEffect, useState } from 'react';
-import { fetchSessions } from '../api';
-import { areTestNamesSimilar } from '../utils/stringUtils';
+import { fetchMetricSeries } from '../api';
 
 const MetricTrend = ({ testName, onClose }) => {
   const [trendData, setTrendData] = useState([]);
@@ -13,49 +12,15 @@ const MetricTrend = ({ testName, onClose }) => {
         setLoading(true);
         setError(null);
         
-        // Fetch all sessions
-        const sessions = await fetchSessions();
-        
-        // For each session, fetch details and find matching test
-        const detailsPromises = sessions.map(async session => {
-          try {
-            const response = await fetch(`http://localhost:8000/sessions/${session.session_id}`);
-            if (!response.ok) {
-              throw new Error(`HTTP error! status: ${response.status}`);
-            }
-            return response.json();
-          } catch (e) {
-            console.error(`Failed to fetch session ${session.session_id}:`, e);
-            return null;
-          }
-        });
-        
-        const allSessionDetails = await Promise.all(detailsPromises);
-        
-        // Extract matching tests using fuzzy matching
-        const matchingTests = allSessionDetails
-          .filter(Boolean) // Remove failed requests
-          .map((session, index) => {
-            if (!session || !session.blood_tests) return null;
-            
-            const matchingTest = session.blood_tests.find(test => 
-              areTestNamesSimilar(test.test_name, testName)
-            );
-            
-            if (matchingTest) {
-              return {
-                date: new Date(sessions[index].test_date),
-                value: parseFloat(matchingTest.value),
-                unit: matchingTest.unit
-              };
-            }
-            return null;
-          })
-          .filter(Boolean);
+        // One request for the whole series instead of fetching every session
+        const series = await fetchMetricSeries(testName);
+        const points = series.points.map(point => ({
+          date: new Date(point.date),
+          value: point.value,
+          unit: point.unit
+        }));
 
-        // Sort by date
-        matchingTests.sort((a, b) => a.date - b.date);
-        setTrendData(matchingTests);
+        setTrendData(points);
       } catch (error) {
         console.error('Error fetching trend data:', error);
         setError('Failed to load trend data. Please try again later.');
@@ -6,12 +6,15 @@ const SessionList = ({ onSelectSession, onSessionDeleted, refreshTrigger }) => {
   const [sessions, setSessions] = useState([]);
   const [isDeleting, setIsDeleting] = useState(false);
   const [isLoading, setIsLoading] = useState(false);
+  const [nextCursor, setNextCursor] = useState(null);
 
-  const loadSessions = async () => {
+  // Reloads from the first page, or appends the next page when `cursor` is given
+  const loadSessions = async (cursor = null) => {
     setIsLoading(true);
     try {
-      const data = await fetchSessions();
-      setSessions(data);
+      const data = await fetchSessions(cursor);
+      setSessions(prev => cursor ? [...prev, ...data.items] : data.items);
+      setNextCursor(data.next_cursor);
     } catch (error) {
       console.error('Error loading sessions:', error);
     } finally {
@@ -46,7 +49,7 @@ const SessionList = ({ onSelectSession, onSessionDeleted, refreshTrigger }) => {
       <div style={{ display: 'flex', justifyContent: 'space-between', alignItems: 'center', marginBottom: '15px' }}>
         <h3 style={{ margin: 0 }}>Previous Sessions</h3>
         <button
-          onClick={loadSessions}
+          onClick={() => loadSessions()}
           disabled={isLoading}
           style={{
             padding: '6px 12px',
@@ -103,6 +106,22 @@ const SessionList = ({ onSelectSession, onSessionDeleted, refreshTrigger }) => {
           </li>
         ))}
       </ul>
+      {nextCursor && (
+        <button
+          onClick={() => loadSessions(nextCursor)}
+          disabled={isLoading}
+          style={{
+            width: '100%',
+            padding: '6px 12px',
+            backgroundColor: '#f8f9fa',
+            border: '1px solid #ddd',
+            borderRadius: '4px',
+            cursor: isLoading ? 'not-allowed' : 'pointer'
+          }}
+        >
+          {isLoading ? 'Loading...' : 'Load more'}
+        </button>
+      )}
     </div>
   );
 };
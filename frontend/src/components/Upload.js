@@ -1,9 +1,25 @@
 import React, { useCallback, useState } from "react";
 import { useDropzone } from "react-dropzone";
+import { fetchJobStatus } from "../api";
+
+const JOB_POLL_INTERVAL_MS = 1500;
+
+// Polls the ingestion job until it finishes, reporting the running stage
+const waitForJob = async (jobId, onStage) => {
+    while (true) {
+        const job = await fetchJobStatus(jobId);
+        if (job.status === "done") return job;
+        if (job.status === "failed") throw new Error(job.error || 'Processing failed');
+        const running = job.stages.find(stage => stage.status === "running");
+        onStage(running ? running.name : job.status);
+        await new Promise(resolve => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+    }
+};
 
 const Upload = ({ onFileUpload }) => {
     const [errorMessage, setErrorMessage] = useState("");
     const [uploading, setUploading] = useState(false);
+    const [stage, setStage] = useState("");
     
     // define handleFileUpload with useCallback to avoid ESLint warnings
     const handleFileUpload = useCallback(async (file) => {
@@ -19,18 +35,25 @@ const Upload = ({ onFileUpload }) => {
                 body: formData,
             });
             
+            if (response.status === 429) {
+                setErrorMessage("The server is busy processing other uploads. Please try again shortly.");
+                return;
+            }
             if (!response.ok) {
                 throw new Error('Upload failed');
             }
             
-            await response.json();
+            // The upload is processed in the background; wait for its job to finish
+            const { job_id } = await response.json();
+            await waitForJob(job_id, setStage);
             onFileUpload(); // Call the callback after successful upload
         } catch (error) {
-            setErrorMessage("Error connecting to server. Please try again.");
+            setErrorMessage("Error processing upload. Please try again.");
             console.error("Error uploading file:", error);
             alert('Failed to upload file');
         } finally {
             setUploading(false);
+            setStage("");
         }
     }, [onFileUpload]);
     
@@ -78,7 +101,7 @@ const Upload = ({ onFileUpload }) => {
             >
                 <input {...getInputProps()} />
                 {uploading ? (
-                    <p>Uploading...</p>
+                    <p>{stage ? `Processing (${stage})...` : "Uploading..."}</p>
                 ) : (
                     <p>{isDragActive ? "Drop the PDF here" : "Drag & Drop a PDF here, or click to browse"}</p>
                 )}